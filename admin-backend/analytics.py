@@ -0,0 +1,325 @@
+"""
+Time-series analytics over chat logs, on NumPy columns.
+
+load() reads every chat once into four parallel arrays, one row per chat,
+sorted by time so that any time window is a slice:
+
+  timestamp  int64  milliseconds since the epoch
+  category   int16  index into `categories` (category_key names)
+  user       int32  index into `user_ids`
+  response   int32  response length in characters
+
+i.e. 18 bytes per chat, 18 MB for a million. Each aggregation is then a
+few vectorized passes (bucketing by integer division, np.bincount,
+np.unique, one sort) instead of a Python loop over chat dicts:
+
+  volume()            queries and distinct active users per hour/day/week
+  category_trends()   queries per category per bucket
+  retention()         cohorts by first chat, share of them active N periods later
+  response_lengths()  response length percentiles, overall and per category
+
+Buckets are UTC calendar hours/days/weeks (weeks start on Monday), shifted
+by `tz_offset` minutes east of UTC when given. main.py caches the columns
+for ANALYTICS_TTL seconds and loads them from the live mirror when it is
+running (no database reads), otherwise page by page from the database.
+"""
+import time
+from array import array
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+
+import exports
+from dashboard_stats import as_millis, category_key
+from firebase_mirror import FirebaseMirror
+
+HOUR = 3600 * 1000
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+BUCKETS = {"hour": HOUR, "day": DAY, "week": WEEK}
+# 1970-01-05, the first Monday after the epoch
+WEEK_ORIGIN = 4 * DAY
+
+MAX_BUCKETS = 10000
+PERCENTILES = (50, 90, 95, 99)
+
+
+class ChatColumns:
+    """Parallel arrays, one row per chat, sorted by timestamp"""
+
+    def __init__(self, timestamp: np.ndarray, category: np.ndarray, user: np.ndarray, response: np.ndarray,
+                 categories: list, user_ids: list, loaded_at: Optional[float] = None):
+        self.timestamp = timestamp
+        self.category = category
+        self.user = user
+        self.response = response
+        self.categories = categories
+        self.user_ids = user_ids
+        self.loaded_at = loaded_at if loaded_at is not None else time.time()
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.timestamp, self.category, self.user, self.response))
+
+    def age(self) -> float:
+        return time.time() - self.loaded_at
+
+
+class ColumnBuilder:
+    """Accumulates chats in compact arrays (no per-chat Python objects are kept)"""
+
+    def __init__(self):
+        self.timestamp = array("q")
+        self.category = array("h")
+        self.user = array("i")
+        self.response = array("i")
+        self._category_codes = {}  # raw category -> code
+        self._category_names = {}  # category_key name -> code
+        self._user_codes = {}
+        self._user_ids = []
+
+    def add(self, user_id: str, timestamp_ms: int, category: Optional[str], response_chars: int):
+        code = self._category_codes.get(category)
+        if code is None:
+            name = category_key(category if isinstance(category, str) else None)
+            code = self._category_names.setdefault(name, len(self._category_names))
+            self._category_codes[category] = code
+        user = self._user_codes.get(user_id)
+        if user is None:
+            user = self._user_codes[user_id] = len(self._user_ids)
+            self._user_ids.append(user_id)
+        self.timestamp.append(timestamp_ms)
+        self.category.append(code)
+        self.user.append(user)
+        self.response.append(response_chars)
+
+    def build(self) -> ChatColumns:
+        timestamp = np.array(self.timestamp, dtype=np.int64)
+        order = np.argsort(timestamp, kind="stable")
+        return ChatColumns(
+            timestamp[order],
+            np.array(self.category, dtype=np.int16)[order],
+            np.array(self.user, dtype=np.int32)[order],
+            np.array(self.response, dtype=np.int32)[order],
+            list(self._category_names), list(self._user_ids),
+        )
+
+
+def _chat_rows(source) -> Iterable[tuple]:
+    """(user_id, timestamp_ms, category, response_chars) for every chat"""
+    if isinstance(source, FirebaseMirror):
+        yield from source.chat_rows()
+        return
+    for user_id in source.reference("chats").get(shallow=True) or {}:
+        for page in exports.key_pages(source, f"chats/{user_id}"):
+            for _, chat in page:
+                if isinstance(chat, dict):
+                    yield user_id, as_millis(chat.get("timestamp")), chat.get("category"), len(chat.get("response") or "")
+
+
+def load(source) -> ChatColumns:
+    """Columns for every chat in `source` (the database or a FirebaseMirror)"""
+    start = time.perf_counter()
+    builder = ColumnBuilder()
+    for row in _chat_rows(source):
+        builder.add(*row)
+    columns = builder.build()
+    print(f"Loaded analytics columns: {len(columns)} chats, {len(columns.user_ids)} users, "
+          f"{columns.nbytes / 1e6:.1f} MB in {time.perf_counter() - start:.2f}s")
+    return columns
+
+
+# ---------- Buckets ----------
+def bucket_index(timestamp, bucket: str, tz_offset_ms: int = 0):
+    """Bucket number of each timestamp (works on arrays and scalars)"""
+    origin = WEEK_ORIGIN if bucket == "week" else 0
+    return (timestamp + tz_offset_ms - origin) // BUCKETS[bucket]
+
+
+def bucket_start(index, bucket: str, tz_offset_ms: int = 0):
+    origin = WEEK_ORIGIN if bucket == "week" else 0
+    return index * BUCKETS[bucket] + origin - tz_offset_ms
+
+
+def _window(columns: ChatColumns, since: int, until: int) -> slice:
+    """Rows with since <= timestamp < until (the columns are sorted by time)"""
+    start, stop = np.searchsorted(columns.timestamp, (since, until))
+    return slice(int(start), int(stop))
+
+
+def _buckets(bucket: str, since: int, until: int, tz_offset_ms: int) -> tuple[int, int]:
+    """First bucket number and count of buckets covering [since, until)"""
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unsupported bucket '{bucket}'; use one of: {', '.join(BUCKETS)}")
+    first = int(bucket_index(since, bucket, tz_offset_ms))
+    count = int(bucket_index(until - 1, bucket, tz_offset_ms)) - first + 1
+    if count > MAX_BUCKETS:
+        raise ValueError(f"Too many {bucket} buckets ({count}); use a coarser bucket or a shorter range")
+    return first, count
+
+
+def _distinct(values: np.ndarray) -> np.ndarray:
+    """Sorted distinct values (one sort; faster than np.unique on nearly sorted keys)"""
+    ordered = np.sort(values)
+    if not len(ordered):
+        return ordered
+    return ordered[np.concatenate(([True], ordered[1:] != ordered[:-1]))]
+
+
+# ---------- Aggregations ----------
+def volume(columns: ChatColumns, bucket: str, since: int, until: int, tz_offset_ms: int = 0) -> list[dict]:
+    """Queries and distinct active users per bucket"""
+    first, count = _buckets(bucket, since, until, tz_offset_ms)
+    window = _window(columns, since, until)
+    relative = bucket_index(columns.timestamp[window], bucket, tz_offset_ms) - first
+    queries = np.bincount(relative, minlength=count)
+    # Distinct (bucket, user) pairs, counted per bucket
+    pairs = _distinct(relative * len(columns.user_ids) + columns.user[window])
+    active = np.bincount(pairs // max(1, len(columns.user_ids)), minlength=count)
+    starts = bucket_start(np.arange(first, first + count, dtype=np.int64), bucket, tz_offset_ms)
+    return [
+        {"start": int(s), "queries": int(q), "active_users": int(a)}
+        for s, q, a in zip(starts.tolist(), queries.tolist(), active.tolist())
+    ]
+
+
+def category_trends(columns: ChatColumns, bucket: str, since: int, until: int, tz_offset_ms: int = 0) -> dict:
+    """Queries per category per bucket, busiest categories first"""
+    first, count = _buckets(bucket, since, until, tz_offset_ms)
+    window = _window(columns, since, until)
+    relative = bucket_index(columns.timestamp[window], bucket, tz_offset_ms) - first
+    n_categories = len(columns.categories)
+    counts = np.bincount(
+        relative * n_categories + columns.category[window], minlength=count * n_categories
+    ).reshape(count, n_categories)
+    totals = counts.sum(axis=0)
+    starts = bucket_start(np.arange(first, first + count, dtype=np.int64), bucket, tz_offset_ms)
+    return {
+        "starts": starts.tolist(),
+        "categories": {
+            columns.categories[c]: counts[:, c].tolist()
+            for c in np.argsort(-totals, kind="stable") if totals[c] > 0
+        },
+    }
+
+
+def retention(columns: ChatColumns, cohort: str, periods: int, since: int, until: int,
+              tz_offset_ms: int = 0, now_ms: Optional[int] = None) -> list[dict]:
+    """
+    Users grouped by the bucket of their first chat (cohorts starting in
+    [since, until)), and how many of them chatted 0..periods-1 buckets
+    later. Periods that have not started yet are None.
+    """
+    first_cohort, count = _buckets(cohort, since, until, tz_offset_ms)
+    # Each user's cohort is the bucket of their first chat ever, in or before the window
+    buckets = bucket_index(columns.timestamp, cohort, tz_offset_ms)
+    first_seen = np.full(len(columns.user_ids), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first_seen, columns.user, buckets)
+
+    # Chats of users whose cohort starts in the window can only be in the window too
+    window = _window(columns, since, until)
+    user = columns.user[window]
+    offset = buckets[window] - first_seen[user]
+    user_cohort = first_seen[user] - first_cohort
+    keep = (offset < periods) & (user_cohort >= 0) & (user_cohort < count)
+    # Distinct (user, period) pairs, counted per (cohort, period)
+    pairs = _distinct(user[keep].astype(np.int64) * periods + offset[keep])
+    users, period = pairs // periods, pairs % periods
+    active = np.bincount(
+        (first_seen[users] - first_cohort) * periods + period, minlength=count * periods
+    ).reshape(count, periods)
+
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    current = int(bucket_index(now_ms, cohort, tz_offset_ms))
+    cohorts = []
+    for i, row in enumerate(active.tolist()):
+        size = row[0]
+        if not size:
+            continue
+        started = current - (first_cohort + i) + 1  # periods begun so far
+        cohorts.append({
+            "start": int(bucket_start(first_cohort + i, cohort, tz_offset_ms)),
+            "users": size,
+            "active": [n if k < started else None for k, n in enumerate(row)],
+            "retention": [round(n / size, 4) if k < started else None for k, n in enumerate(row)],
+        })
+    return cohorts
+
+
+def _percentile_dict(values: np.ndarray, percentiles: tuple) -> dict:
+    return {f"p{q:g}": round(float(v), 1) for q, v in zip(percentiles, values)}
+
+
+def response_lengths(columns: ChatColumns, since: int, until: int, percentiles: tuple = PERCENTILES) -> dict:
+    """Response length percentiles (characters, linear interpolation), overall and per category"""
+    window = _window(columns, since, until)
+    lengths = columns.response[window]
+    categories = columns.category[window]
+    if not len(lengths):
+        return {"overall": {"count": 0}, "by_category": {}}
+    q = np.asarray(percentiles, dtype=np.float64) / 100
+
+    # One sort by (category, length), packed into one int64 key; each
+    # category is then a contiguous run
+    keys = np.sort((categories.astype(np.int64) << 32) | lengths.astype(np.int64))
+    ordered = (keys & 0xFFFFFFFF).astype(np.float64)
+    counts = np.bincount(categories, minlength=len(columns.categories))
+    present = np.flatnonzero(counts)
+    starts = (np.cumsum(counts) - counts)[present]
+    position = starts[:, None] + (counts[present, None] - 1) * q[None, :]
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    values = ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+    means = np.bincount(categories, weights=lengths, minlength=len(columns.categories))[present] / counts[present]
+
+    by_category = {
+        columns.categories[c]: {"count": int(counts[c]), "mean": round(float(mean), 1), **_percentile_dict(row, percentiles)}
+        for c, mean, row in zip(present.tolist(), means, values)
+    }
+    overall = np.percentile(lengths, percentiles)
+    return {
+        "overall": {"count": int(len(lengths)), "mean": round(float(lengths.mean()), 1),
+                    **_percentile_dict(overall, percentiles)},
+        "by_category": dict(sorted(by_category.items(), key=lambda kv: kv[1]["count"], reverse=True)),
+    }
+
+
+def report(columns: ChatColumns, bucket: str = "day", days: int = 30, cohort: str = "week", periods: int = 8,
+           tz_offset_minutes: int = 0, now_ms: Optional[int] = None) -> dict:
+    """Everything /api/v1/admin/analytics returns, for the last `days` days; raises ValueError on bad parameters"""
+    if not 1 <= days <= 3660:
+        raise ValueError("days must be between 1 and 3660")
+    if not 1 <= periods <= 104:
+        raise ValueError("periods must be between 1 and 104")
+    if not -720 <= tz_offset_minutes <= 840:
+        raise ValueError("tz_offset must be between -720 and 840 minutes")
+    if cohort not in ("day", "week"):
+        raise ValueError("cohort must be 'day' or 'week'")
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unsupported bucket '{bucket}'; use one of: {', '.join(BUCKETS)}")
+    tz = tz_offset_minutes * 60 * 1000
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    until = now_ms + 1
+    # Whole buckets: the window starts at the start of the bucket `days` ago
+    since = int(bucket_start(bucket_index(now_ms - days * DAY, bucket, tz), bucket, tz))
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "data_as_of": datetime.fromtimestamp(columns.loaded_at).isoformat(),
+        "total_chats": len(columns),
+        "total_users": len(columns.user_ids),
+        "since": since,
+        "until": until,
+        "bucket": bucket,
+        "volume": volume(columns, bucket, since, until, tz),
+        "category_trends": category_trends(columns, bucket, since, until, tz),
+        "retention": {
+            "cohort": cohort,
+            "periods": periods,
+            "cohorts": retention(columns, cohort, periods, since, until, tz, now_ms),
+        },
+        "response_length": response_lengths(columns, since, until),
+    }
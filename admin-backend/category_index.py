@@ -0,0 +1,100 @@
+"""
+Secondary index of chats by category, for the category-filtered listing.
+
+  chat_index/categories/{category}/{chat_id}  {t: timestamp, u: user_id}
+  chat_index/built_at                         when rebuild() last ran
+
+Entries are written in the same multi-path update that saves a chat (see
+saveChatMessage in client/services/firebase.ts) and removed with the user's
+chats by delete_user. `.indexOn: ["t"]` lets a category be listed newest
+first with an ordered, limited query per page (pagination.ordered_stream),
+with the same cursors as the other chat listings. The count per category
+is the one maintained in stats/summary/categories (dashboard_stats.py).
+
+rebuild() recreates the whole index from the chats tree in one write, for
+first deployment or to repair drift.
+"""
+import time
+from typing import Iterator, Optional
+
+import pagination
+from dashboard_stats import STATS_PATH, as_millis, category_key, is_built as stats_built
+
+INDEX_PATH = "chat_index"
+
+
+def entry(chat: dict, user_id: str) -> dict:
+    return {"t": as_millis(chat.get("timestamp")), "u": user_id}
+
+
+def entry_path(category: Optional[str], chat_id: str) -> str:
+    return f"{INDEX_PATH}/categories/{category_key(category)}/{chat_id}"
+
+
+def removal_updates(user_chats: dict) -> dict:
+    """Root-relative multi-path deletes for a user's chats"""
+    return {entry_path(chat.get("category"), chat_id): None for chat_id, chat in (user_chats or {}).items()}
+
+
+def is_built(db) -> bool:
+    return db.reference(f"{INDEX_PATH}/built_at").get() is not None
+
+
+def category_stream(db, category: str, before: Optional[pagination.Cursor] = None, batch: int = 50) -> Iterator[tuple]:
+    """(timestamp, user_id, chat_id, entry) rows for a category, newest first"""
+    return pagination.ordered_stream(
+        db, f"{INDEX_PATH}/categories/{category_key(category)}", "t",
+        lambda chat_id, e: (as_millis(e.get("t")), str(e.get("u", "")), chat_id, e),
+        # Entries are keyed by chat id alone, so that is the tie-breaker here
+        (before.timestamp, before.chat_id) if before else None,
+        batch,
+    )
+
+
+def category_entries(db, category: str, limit: int, cursor: Optional[str] = None) -> tuple[list, Optional[str]]:
+    """One page of (timestamp, user_id, chat_id, entry) index rows and the next cursor"""
+    before = pagination.decode_cursor(cursor) if cursor else None
+    return pagination.take_page(category_stream(db, category, before, batch=limit + 1), limit)
+
+
+def with_chats(entries: list, chats: list) -> list:
+    """(timestamp, user_id, chat_id, chat) rows from index rows and their chats; stale entries are skipped"""
+    return [(t, user_id, chat_id, chat) for (t, user_id, chat_id, _), chat in zip(entries, chats) if chat]
+
+
+def category_page(db, category: str, limit: int, cursor: Optional[str] = None) -> tuple[list, Optional[str]]:
+    """One page of (timestamp, user_id, chat_id, chat) rows; stale entries are skipped"""
+    entries, next_cursor = category_entries(db, category, limit, cursor)
+    chats = [db.reference(f"chats/{user_id}/{chat_id}").get() for _, user_id, chat_id, _ in entries]
+    return with_chats(entries, chats), next_cursor
+
+
+def category_count(db, category: str) -> int:
+    summary = db.reference(f"{STATS_PATH}/summary").get()
+    count = (summary.get("categories") or {}).get(category_key(category)) if stats_built(summary) else None
+    if count is None:
+        # Stats not built yet (a partial summary from client increments
+        # doesn't count): count index keys instead
+        return len(db.reference(f"{INDEX_PATH}/categories/{category_key(category)}").get(shallow=True) or {})
+    return max(0, int(count))
+
+
+def build(chats: dict) -> dict:
+    categories = {}
+    for user_id, user_chats in chats.items():
+        for chat_id, chat in (user_chats or {}).items():
+            categories.setdefault(category_key(chat.get("category")), {})[chat_id] = entry(chat, user_id)
+    return categories
+
+
+def rebuild(db, chats: Optional[dict] = None) -> dict:
+    """Recreate the index from the chats tree; returns entries per category"""
+    start = time.perf_counter()
+    if chats is None:
+        chats = db.reference("chats").get() or {}
+    categories = build(chats)
+    db.reference(INDEX_PATH).set({"categories": categories, "built_at": int(time.time() * 1000)})
+    counts = {category: len(entries) for category, entries in categories.items()}
+    print(f"Rebuilt category index: {sum(counts.values())} chats in {len(counts)} categories "
+          f"in {time.perf_counter() - start:.2f}s")
+    return counts
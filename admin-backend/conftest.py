@@ -0,0 +1,37 @@
+"""
+Shared test setup. The admin modules import metrics and singleflight from
+fastapi_server, which main.py puts on sys.path; tests that don't import
+main get the same path here.
+"""
+import importlib.util
+import pathlib
+import sys
+
+import pytest
+
+ADMIN_DIR = pathlib.Path(__file__).parent
+sys.path.append(str(ADMIN_DIR.parent / "fastapi_server"))
+
+
+@pytest.fixture(scope="session")
+def admin_main():
+    """admin-backend/main.py, loaded by path: fastapi_server has a main.py too"""
+    spec = importlib.util.spec_from_file_location("admin_main", ADMIN_DIR / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def admin_client(admin_main, monkeypatch):
+    """admin_client(database) -> TestClient for the admin app reading and writing `database`"""
+    from fastapi.testclient import TestClient
+
+    def client(database, mirror=None):
+        monkeypatch.setattr(admin_main, "db", database)
+        monkeypatch.setattr(admin_main, "mirror", mirror)
+        monkeypatch.setattr(admin_main, "firebase_init_attempted", True)
+        monkeypatch.setattr(admin_main, "firebase_initialized", True)
+        return TestClient(admin_main.app)
+
+    return client
@@ -0,0 +1,206 @@
+"""
+Materialized dashboard aggregates in the Realtime Database.
+
+Instead of downloading every user and chat on each dashboard load, the
+counters live under one `stats` node:
+
+  stats/summary             {total_users, total_queries, categories: {name: n}, rebuilt_at}
+  stats/daily/{YYYY-MM-DD}  {queries, active_users}
+  stats/active/{day}/{uid}  true - users seen that day (dedupes active_users)
+  stats/counted/{uid}       id of the user's last counted chat
+
+They are maintained incrementally by whoever writes the data: the web
+client bumps them with server-side increments in the same multi-path
+update that saves a chat or a user (client/services/firebase.ts), and the
+admin API adjusts them when it deletes a user. The database rules only let
+a client raise the query counters in an update that also creates a chat
+and points stats/counted/{uid} at it. Reading the dashboard is then two
+small reads regardless of how many users and chats exist.
+
+Counters can drift (a client that dies between writes, manual edits in
+the console, deployments of the rules), so rebuild() recomputes them from
+the users and chats trees; run it from POST /api/v1/admin/stats/rebuild or
+rebuild_stats.py on a schedule. Days are UTC calendar days.
+"""
+import re
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+STATS_PATH = "stats"
+DEFAULT_CATEGORY = "General"
+
+# Characters Firebase does not allow in keys
+_INVALID_KEY_CHARS = re.compile(r"[.$#\[\]/]")
+
+
+def category_key(category: Optional[str]) -> str:
+    return _INVALID_KEY_CHARS.sub("_", category or DEFAULT_CATEGORY) or DEFAULT_CATEGORY
+
+
+def as_millis(value) -> int:
+    """Timestamps are numbers, but some older records store strings"""
+    if isinstance(value, str):
+        return int(value) if value.strip().isdigit() else 0
+    return int(value or 0)
+
+
+def day_key(ms: int) -> str:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def day_start_ms(day: str) -> int:
+    return int(datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def increment(amount: int = 1) -> dict:
+    """Server-side increment (the REST form of ServerValue.increment)"""
+    return {".sv": {"increment": amount}}
+
+
+# ---------- Incremental updates ----------
+def chat_updates(chat: dict, sign: int = 1) -> dict:
+    """Multi-path counter updates, relative to the stats node, for writing (or removing) a chat"""
+    day = day_key(as_millis(chat.get("timestamp")) or int(time.time() * 1000))
+    return {
+        "summary/total_queries": increment(sign),
+        f"summary/categories/{category_key(chat.get('category'))}": increment(sign),
+        f"daily/{day}/queries": increment(sign),
+    }
+
+
+def user_removed_updates(chats: dict, counted: bool = True) -> dict:
+    """Counter updates for deleting a user (counted in total_users or not) and all of their chats"""
+    updates = {"summary/total_users": increment(-1)} if counted else {}
+    if chats:
+        updates["summary/total_queries"] = increment(-len(chats))
+        categories, days = {}, {}
+        for chat in chats.values():
+            category = category_key(chat.get("category"))
+            categories[category] = categories.get(category, 0) + 1
+            day = day_key(as_millis(chat.get("timestamp")))
+            days[day] = days.get(day, 0) + 1
+        for category, n in categories.items():
+            updates[f"summary/categories/{category}"] = increment(-n)
+        for day, n in days.items():
+            updates[f"daily/{day}/queries"] = increment(-n)
+    return updates
+
+
+def apply(db, updates: dict):
+    if updates:
+        db.reference(STATS_PATH).update(updates)
+
+
+def remove_user(db, uid: str, chats: dict, counted: bool = True, now_ms: Optional[int] = None):
+    """Adjust the counters after a user and their chats were deleted"""
+    updates = user_removed_updates(chats, counted)
+    updates[f"counted/{uid}"] = None
+    today = day_key(now_ms if now_ms is not None else int(time.time() * 1000))
+    if db.reference(f"{STATS_PATH}/active/{today}/{uid}").get():
+        updates[f"active/{today}/{uid}"] = None
+        updates[f"daily/{today}/active_users"] = increment(-1)
+    apply(db, updates)
+
+
+# ---------- Reads ----------
+def is_built(summary: Optional[dict]) -> bool:
+    """Whether rebuild() has run: client increments alone leave a partial summary without rebuilt_at"""
+    return bool(summary) and summary.get("rebuilt_at") is not None
+
+
+def dashboard_reads(db, now_ms: Optional[int] = None) -> tuple:
+    """The two independent reads behind the dashboard (summary, today's counters), as callables"""
+    today = day_key(now_ms if now_ms is not None else int(time.time() * 1000))
+    return db.reference(f"{STATS_PATH}/summary").get, db.reference(f"{STATS_PATH}/daily/{today}").get
+
+
+def read_dashboard(db, now_ms: Optional[int] = None) -> Optional[dict]:
+    """The dashboard aggregates, or None if the stats node was never built"""
+    read_summary, read_daily = dashboard_reads(db, now_ms)
+    summary = read_summary()
+    if not is_built(summary):
+        return None
+    return dashboard_payload(summary, read_daily() or {})
+
+
+def total_queries(db) -> Optional[int]:
+    """Maintained chat count, or None if the stats node was never built"""
+    summary = db.reference(f"{STATS_PATH}/summary").get()
+    if not is_built(summary):
+        return None
+    return max(0, int(summary.get("total_queries") or 0))
+
+
+def dashboard_payload(summary: dict, daily: dict, top: int = 5) -> dict:
+    categories = summary.get("categories") or {}
+    top_categories = [
+        {"category": category, "count": count}
+        for category, count in sorted(categories.items(), key=lambda kv: kv[1], reverse=True)
+        if count > 0
+    ][:top]
+    return {
+        "total_users": max(0, int(summary.get("total_users", 0))),
+        "total_queries": max(0, int(summary.get("total_queries", 0))),
+        "active_users_today": max(0, int(daily.get("active_users", 0))),
+        "queries_today": max(0, int(daily.get("queries", 0))),
+        "top_categories": top_categories,
+    }
+
+
+# ---------- Rebuild ----------
+def compute(users: dict, chats: dict, now_ms: Optional[int] = None) -> dict:
+    """Aggregates computed from scratch: {"summary", "daily", "active_today"}"""
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    today = day_key(now_ms)
+    today_start = day_start_ms(today)
+
+    categories, daily_queries, total_queries = {}, {}, 0
+    for user_chats in chats.values():
+        for chat in (user_chats or {}).values():
+            total_queries += 1
+            category = category_key(chat.get("category"))
+            categories[category] = categories.get(category, 0) + 1
+            day = day_key(as_millis(chat.get("timestamp")))
+            daily_queries[day] = daily_queries.get(day, 0) + 1
+
+    # lastLogin only tells us about each user's latest day, which is exact
+    # for today; earlier days keep their incrementally maintained counts
+    active_today = {uid: True for uid, user in users.items() if as_millis((user or {}).get("lastLogin")) >= today_start}
+
+    return {
+        "summary": {
+            "total_users": len(users),
+            "total_queries": total_queries,
+            "categories": categories,
+            "rebuilt_at": now_ms,
+        },
+        "daily": daily_queries,
+        "active_today": active_today,
+        "today": today,
+    }
+
+
+def rebuild(db, now_ms: Optional[int] = None, users: Optional[dict] = None, chats: Optional[dict] = None) -> dict:
+    """Recompute the aggregates from the users and chats trees (read here unless passed) and store them"""
+    start = time.perf_counter()
+    if users is None:
+        users = db.reference("users").get() or {}
+    if chats is None:
+        chats = db.reference("chats").get() or {}
+    result = compute(users, chats, now_ms)
+
+    updates = {"summary": result["summary"]}
+    # Zero days that no longer have chats (e.g. after users were deleted)
+    existing_days = db.reference(f"{STATS_PATH}/daily").get(shallow=True) or {}
+    for day in existing_days:
+        updates[f"daily/{day}/queries"] = 0
+    for day, n in result["daily"].items():
+        updates[f"daily/{day}/queries"] = n
+    updates[f"daily/{result['today']}/active_users"] = len(result["active_today"])
+    updates[f"active/{result['today']}"] = result["active_today"] or None
+    apply(db, updates)
+
+    print(f"Rebuilt dashboard stats: {result['summary']['total_users']} users, "
+          f"{result['summary']['total_queries']} queries in {time.perf_counter() - start:.2f}s")
+    return result["summary"]
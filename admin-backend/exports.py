@@ -0,0 +1,159 @@
+"""
+Streaming exports of users and chats as NDJSON or CSV.
+
+Nothing is collected in memory: users are read in key order one page at a
+time (`order_by_key().start_at(last).limit_to_first(n)`), chats the same
+way within each user, and every page is encoded and sent before the next
+is fetched, so memory stays at one page however large the dataset. The
+only thing held for a chats export is the list of user ids, from one
+shallow read of `chats`.
+
+Exports are resumable: records come in a fixed key order, so after a
+dropped connection the client passes the id of the last record it
+received as `cursor` and the export continues after it:
+
+  users  cursor = user id                e.g. ?cursor=abc123
+  chats  cursor = "user_id/chat_id"      e.g. ?cursor=abc123/-Nx8f...
+
+CSV exports only start with a header row when they start from the
+beginning, so a resumed export can be appended to the partial file.
+"""
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+import firebase_pool
+from dashboard_stats import DEFAULT_CATEGORY, as_millis
+from pagination import InvalidCursor, children
+
+EXPORT_BATCH = int(os.getenv("EXPORT_BATCH", "500"))
+
+USER_FIELDS = ("id", "email", "phone", "display_name", "created_at", "last_login")
+CHAT_FIELDS = ("user_id", "id", "user_email", "category", "timestamp", "message", "response")
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def key_order(key: str) -> tuple:
+    """Firebase key order: integer-like keys first, numerically, then strings"""
+    if key.lstrip("-").isdigit() and -2 ** 31 <= int(key) < 2 ** 31 and str(int(key)) == key:
+        return (0, int(key), "")
+    return (1, 0, key)
+
+
+def key_pages(db, path: str, after: Optional[str] = None, batch: int = EXPORT_BATCH) -> Iterator[list]:
+    """Children of `path` as lists of (key, value), in key order, starting after key `after`"""
+    while True:
+        query = db.reference(path).order_by_key()
+        if after is not None:
+            query = query.start_at(after)
+        # start_at is inclusive, so ask for one more to make up for `after`
+        limit = batch + (after is not None)
+        fetched = children(query.limit_to_first(limit).get())
+        items = [(key, value) for key, value in fetched.items() if key != after]
+        if items:
+            yield items
+        if len(fetched) < limit or not items:
+            return
+        after = items[-1][0]
+
+
+# ---------- Records ----------
+def user_pages(db, cursor: Optional[str] = None, batch: int = EXPORT_BATCH) -> Iterator[list]:
+    for page in key_pages(db, "users", cursor or None, batch):
+        yield [user_record(uid, user) for uid, user in page if isinstance(user, dict)]
+
+
+def parse_chat_cursor(cursor: str) -> tuple[str, str]:
+    user_id, _, chat_id = cursor.partition("/")
+    if not user_id or not chat_id or "/" in chat_id:
+        raise InvalidCursor("Invalid cursor: expected user_id/chat_id")
+    return user_id, chat_id
+
+
+def chat_pages(db, cursor: Optional[str] = None, user_id: Optional[str] = None,
+               batch: int = EXPORT_BATCH) -> Iterator[list]:
+    after_user, after_chat = parse_chat_cursor(cursor) if cursor else (None, None)
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_ids = sorted(db.reference("chats").get(shallow=True) or {}, key=key_order)
+    for uid in user_ids:
+        if after_user is not None and key_order(uid) < key_order(after_user):
+            continue
+        after = after_chat if uid == after_user else None
+        for page in key_pages(db, f"chats/{uid}", after, batch):
+            yield [chat_record(uid, chat_id, chat) for chat_id, chat in page if isinstance(chat, dict)]
+
+
+def user_record(uid: str, user: dict) -> dict:
+    last_login = user.get("lastLogin")
+    return {
+        "id": uid,
+        "email": user.get("email", ""),
+        "phone": user.get("phone"),
+        "display_name": user.get("displayName"),
+        "created_at": as_millis(user.get("createdAt")),
+        "last_login": as_millis(last_login) if last_login not in (None, "") else None,
+    }
+
+
+def chat_record(uid: str, chat_id: str, chat: dict) -> dict:
+    return {
+        "user_id": uid,
+        "id": chat_id,
+        "user_email": chat.get("userEmail", ""),
+        "category": chat.get("category", DEFAULT_CATEGORY),
+        "timestamp": as_millis(chat.get("timestamp")),
+        "message": chat.get("message", ""),
+        "response": chat.get("response", ""),
+    }
+
+
+# ---------- Encoding ----------
+def encoder(format: str, fields: tuple, header: bool) -> Callable[[list], str]:
+    """Page of records -> text; raises ValueError for an unknown format"""
+    if format == "ndjson":
+        return lambda records: "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+    if format == "csv":
+        state = {"header": header}
+
+        def encode_csv(records: list) -> str:
+            out = io.StringIO()
+            writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+            if state["header"]:
+                writer.writeheader()
+                state["header"] = False
+            writer.writerows(records)
+            return out.getvalue()
+
+        return encode_csv
+    raise ValueError(f"Unsupported format '{format}'; use one of: {', '.join(MEDIA_TYPES)}")
+
+
+def next_page(pages: Iterator[list]) -> Optional[list]:
+    return next(pages, None)
+
+
+async def stream(pages: Iterator[list], encode: Callable[[list], str], name: str) -> AsyncIterator[bytes]:
+    """Fetch (on the Firebase pool) and send one page at a time"""
+    prefix = encode([])  # CSV header, if any, even for an empty export
+    if prefix:
+        yield prefix.encode("utf-8")
+    exported = 0
+    try:
+        while True:
+            page = await firebase_pool.run(next_page, pages)
+            if page is None:
+                break
+            exported += len(page)
+            if page:
+                yield encode(page).encode("utf-8")
+    except Exception as e:
+        # Headers are already sent; ending the body early tells the client
+        # to resume from the last record it received
+        print(f"Export of {name} stopped after {exported} records: {e}")
+        raise
+    print(f"Exported {exported} {name}")
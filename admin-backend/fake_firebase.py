@@ -0,0 +1,366 @@
+"""
+In-process fake of the firebase_admin.db reference API.
+
+For benchmarks and local experiments without a Firebase project: pass a
+FakeDatabase wherever main.py uses `db` (it has the same `reference(path)`
+entry point). Supported:
+
+  reference(path) -> FakeReference
+      key, path, parent, child(), get(etag=False, shallow=False), set(),
+      update() (multi-path keys), delete(), push(), listen()
+      order_by_child() / order_by_key() / order_by_value() -> FakeQuery
+  FakeQuery
+      start_at(), end_at(), equal_to(), limit_to_first(), limit_to_last(), get()
+
+Server values {".sv": "timestamp"} and {".sv": {"increment": n}} are
+resolved on write, empty objects and None values are pruned like the real
+database, reads return children in key order (integer-like keys first) and
+ordered queries sort the way Firebase does (null, false, true, numbers,
+strings, objects; ties by key).
+
+`reads` counts gets and queries, `returned` the children they returned
+(top-level, so a shallow get counts its keys).
+
+`latency` (seconds) is slept on every get and query, to model the round
+trip to a real database in benchmarks.
+
+Listeners are called synchronously from the writing thread, after the
+initial `put` of the whole subtree; a write below the listener arrives as
+a `patch` whose keys are paths relative to it, a write at or above it as a
+`put` of the new subtree.
+"""
+import copy
+import random
+import string
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+
+def split_path(path: str) -> list[str]:
+    return [part for part in (path or "").split("/") if part]
+
+
+def _prune(value):
+    """Drop None values and empty objects, as the database does"""
+    if isinstance(value, dict):
+        pruned = {}
+        for k, v in value.items():
+            v = _prune(v)
+            if v is not None:
+                pruned[str(k)] = v
+        return pruned or None
+    if isinstance(value, list):
+        return _prune({str(i): v for i, v in enumerate(value)})
+    return value
+
+
+def _key_order(key: str):
+    try:
+        n = int(key)
+        if -2 ** 31 <= n < 2 ** 31 and str(n) == key:
+            return (0, n, "")
+    except ValueError:
+        pass
+    return (1, 0, key)
+
+
+def _by_key(node: dict) -> list:
+    return sorted(node.items(), key=lambda kv: _key_order(kv[0]))
+
+
+def _sorted_copy(value):
+    """Deep copy with children in key order, as the REST API returns them"""
+    if isinstance(value, dict):
+        return {k: _sorted_copy(v) for k, v in _by_key(value)}
+    return value
+
+
+def _value_order(value):
+    if value is None:
+        return (0, 0, "")
+    if value is False:
+        return (1, 0, "")
+    if value is True:
+        return (2, 0, "")
+    if isinstance(value, (int, float)):
+        return (3, value, "")
+    if isinstance(value, str):
+        return (4, 0, value)
+    return (5, 0, "")
+
+
+class FakeEvent:
+    def __init__(self, event_type: str, path: str, data: Any):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class FakeListenerRegistration:
+    def __init__(self, database: "FakeDatabase", path: list, callback: Callable):
+        self._database = database
+        self.path = path
+        self.callback = callback
+
+    def close(self):
+        self._database._remove_listener(self)
+
+
+class FakeDatabase:
+    def __init__(self, data: Optional[dict] = None, latency: float = 0.0):
+        self._root = _prune(copy.deepcopy(data)) or {}
+        self.latency = latency
+        self._lock = threading.RLock()
+        self._listeners: list[FakeListenerRegistration] = []
+        self._last_push_ms = 0
+        self._push_random: list[int] = []
+        self.reads = 0
+        self.returned = 0
+        self.writes = 0
+
+    def reference(self, path: str = "/") -> "FakeReference":
+        return FakeReference(self, split_path(path))
+
+    # ---------- storage ----------
+    def _get(self, parts: list):
+        node = self._root
+        for part in parts:
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def _resolve(self, value, current, now_ms: int):
+        """Replace server values in `value`; `current` is the stored value at the same path"""
+        if isinstance(value, dict):
+            sv = value.get(".sv")
+            if sv == "timestamp":
+                return now_ms
+            if isinstance(sv, dict) and "increment" in sv:
+                base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+                return base + sv["increment"]
+            return {k: self._resolve(v, current.get(k) if isinstance(current, dict) else None, now_ms)
+                    for k, v in value.items()}
+        return value
+
+    def _put(self, parts: list, value, now_ms: int):
+        value = _prune(self._resolve(copy.deepcopy(value), self._get(parts), now_ms))
+        if not parts:
+            self._root = value or {}
+            return
+        node = self._root
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                child = node[part] = {}
+            node = child
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = value
+        # Remove objects emptied by the write
+        for depth in range(len(parts) - 1, 0, -1):
+            parent = self._get(parts[:depth - 1]) if depth > 1 else self._root
+            if isinstance(parent, dict) and parent.get(parts[depth - 1]) == {}:
+                parent.pop(parts[depth - 1])
+
+    # ---------- listeners ----------
+    def _add_listener(self, registration: FakeListenerRegistration):
+        with self._lock:
+            self._listeners.append(registration)
+            snapshot = copy.deepcopy(self._get(registration.path))
+        registration.callback(FakeEvent("put", "/", snapshot))
+
+    def _remove_listener(self, registration: FakeListenerRegistration):
+        with self._lock:
+            if registration in self._listeners:
+                self._listeners.remove(registration)
+
+    def _notify(self, written: list[list]):
+        """Deliver events for the given written paths (absolute, as part lists)"""
+        for registration in list(self._listeners):
+            base = registration.path
+            patch, reset = {}, False
+            for parts in written:
+                if parts[:len(base)] == base and len(parts) > len(base):
+                    relative = parts[len(base):]
+                    patch["/".join(relative)] = copy.deepcopy(self._get(parts))
+                elif base[:len(parts)] == parts:
+                    reset = True
+            if reset:
+                registration.callback(FakeEvent("put", "/", copy.deepcopy(self._get(base))))
+            elif patch:
+                registration.callback(FakeEvent("patch", "/", patch))
+
+    def _write(self, writes: list[tuple[list, Any]]):
+        # One server timestamp per write, as in the real database
+        now_ms = int(time.time() * 1000)
+        with self._lock:
+            for parts, value in writes:
+                self._put(parts, value, now_ms)
+            self.writes += 1
+            self._notify([parts for parts, _ in writes])
+
+    def push_key(self) -> str:
+        """Chronologically ordered push id, like the client SDKs generate"""
+        with self._lock:
+            now = int(time.time() * 1000)
+            if now == self._last_push_ms and self._push_random:
+                i = len(self._push_random) - 1
+                while i >= 0 and self._push_random[i] == 63:
+                    self._push_random[i] = 0
+                    i -= 1
+                if i >= 0:
+                    self._push_random[i] += 1
+            else:
+                self._push_random = [random.randrange(64) for _ in range(12)]
+            self._last_push_ms = now
+            ts, chars = now, []
+            for _ in range(8):
+                chars.append(PUSH_CHARS[ts % 64])
+                ts //= 64
+            return "".join(reversed(chars)) + "".join(PUSH_CHARS[i] for i in self._push_random)
+
+
+class FakeReference:
+    def __init__(self, database: FakeDatabase, parts: list):
+        self._database = database
+        self._parts = parts
+
+    @property
+    def key(self) -> Optional[str]:
+        return self._parts[-1] if self._parts else None
+
+    @property
+    def path(self) -> str:
+        return "/" + "/".join(self._parts)
+
+    @property
+    def parent(self) -> Optional["FakeReference"]:
+        return FakeReference(self._database, self._parts[:-1]) if self._parts else None
+
+    def child(self, path: str) -> "FakeReference":
+        return FakeReference(self._database, self._parts + split_path(path))
+
+    def get(self, etag: bool = False, shallow: bool = False):
+        if self._database.latency:
+            time.sleep(self._database.latency)
+        with self._database._lock:
+            self._database.reads += 1
+            value = self._database._get(self._parts)
+            if shallow and isinstance(value, dict):
+                value = {k: (True if isinstance(v, dict) else v) for k, v in _by_key(value)}
+            else:
+                value = _sorted_copy(value)
+            self._database.returned += len(value) if isinstance(value, dict) else int(value is not None)
+        if etag:
+            return value, str(hash(repr(value)))
+        return value
+
+    def set(self, value):
+        self._database._write([(self._parts, value)])
+
+    def update(self, value: dict):
+        if not value:
+            raise ValueError("Value argument must be a non-empty dictionary.")
+        self._database._write([(self._parts + split_path(k), v) for k, v in value.items()])
+
+    def delete(self):
+        self._database._write([(self._parts, None)])
+
+    def push(self, value="") -> "FakeReference":
+        child = self.child(self._database.push_key())
+        if value != "":
+            child.set(value)
+        return child
+
+    def listen(self, callback: Callable) -> FakeListenerRegistration:
+        registration = FakeListenerRegistration(self._database, self._parts, callback)
+        self._database._add_listener(registration)
+        return registration
+
+    def order_by_child(self, path: str) -> "FakeQuery":
+        return FakeQuery(self, "child", split_path(path))
+
+    def order_by_key(self) -> "FakeQuery":
+        return FakeQuery(self, "key")
+
+    def order_by_value(self) -> "FakeQuery":
+        return FakeQuery(self, "value")
+
+
+class FakeQuery:
+    def __init__(self, reference: FakeReference, order: str, child: Optional[list] = None):
+        self._reference = reference
+        self._order = order
+        self._child = child or []
+        self._start = self._end = self._equal = None
+        self._first = self._last = None
+
+    def start_at(self, start) -> "FakeQuery":
+        self._start = start
+        return self
+
+    def end_at(self, end) -> "FakeQuery":
+        self._end = end
+        return self
+
+    def equal_to(self, value) -> "FakeQuery":
+        self._equal = value
+        return self
+
+    def limit_to_first(self, limit: int) -> "FakeQuery":
+        self._first = limit
+        return self
+
+    def limit_to_last(self, limit: int) -> "FakeQuery":
+        self._last = limit
+        return self
+
+    def _order_value(self, key: str, value):
+        if self._order == "key":
+            return _key_order(key)
+        if self._order == "value":
+            return _value_order(value)
+        for part in self._child:
+            value = value.get(part) if isinstance(value, dict) else None
+        return _value_order(value)
+
+    def _bound(self, value):
+        return _key_order(str(value)) if self._order == "key" else _value_order(value)
+
+    def get(self):
+        database = self._reference._database
+        if database.latency:
+            time.sleep(database.latency)
+        with database._lock:
+            database.reads += 1
+            node = database._get(self._reference._parts)
+            if not isinstance(node, dict):
+                return copy.deepcopy(node)
+            items = self._select(node)
+            database.returned += len(items)
+            # Copy only what the query returns
+            return OrderedDict((k, copy.deepcopy(v)) for k, v in items)
+
+    def _select(self, node: dict) -> list:
+        items = sorted(node.items(), key=lambda kv: (self._order_value(*kv), _key_order(kv[0])))
+        if self._equal is not None:
+            items = [kv for kv in items if self._order_value(*kv) == self._bound(self._equal)]
+        if self._start is not None:
+            items = [kv for kv in items if self._order_value(*kv) >= self._bound(self._start)]
+        if self._end is not None:
+            items = [kv for kv in items if self._order_value(*kv) <= self._bound(self._end)]
+        if self._first is not None:
+            items = items[:self._first]
+        if self._last is not None:
+            items = items[-self._last:] if self._last else []
+        return items
+
+
+def random_key(n: int = 20) -> str:
+    return "".join(random.choice(string.ascii_letters + string.digits) for _ in range(n))
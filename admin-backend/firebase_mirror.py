@@ -0,0 +1,497 @@
+"""
+In-process live mirror of the users and chats trees, for admin reads.
+
+Enabled with FIREBASE_MIRROR=1. On startup the admin API opens a listen()
+stream on `users` and one on `chats`: the first event of each is the whole
+subtree (the one full load), later events are the deltas other writers
+make. They are folded into compact structures rather than kept as JSON:
+
+  users        {uid: user dict}
+  chats        {uid: {chat_id: ChatRecord}}    slotted records, interned strings
+  by_user      {uid: [(timestamp, chat_id)]}   sorted, for newest-first pages
+  by_category  {category: [(timestamp, chat_id, uid)]}
+  by_time      [(timestamp, uid, chat_id)]      all chats, for the cross-user listing
+  counters     chats in total, per category and per day; sorted lastLogin times
+
+FirebaseMirror.reference(path) answers the read calls the admin code makes
+on `db` (get, shallow get, order_by_child().end_at().limit_to_last()) for
+users/, chats/, the stats/ aggregates and the chat_index/ category index,
+so pagination.py, dashboard_stats.py and category_index.py run on it
+unchanged; recent_chats_page() replaces the per-user heap merge for the
+listing across all users with one slice of by_time. The aggregates are
+computed from the mirrored data, so they are exact rather than
+incrementally maintained. Other paths go to the database.
+The mirror is read-only: writes go to `db` and come back on the stream.
+
+status() reports how current the mirror is. Until both trees are loaded,
+or if a listener thread dies, main.reader() sends reads to the database.
+Works against anything with the `reference(path).listen()` API, including
+fake_firebase.FakeDatabase for benchmarks.
+"""
+import bisect
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+import pagination
+from dashboard_stats import as_millis, category_key, day_key, day_start_ms
+
+TREES = ("users", "chats")
+
+# Sorts after any chat id in an index tuple
+_MAX_KEY = "\uffff"
+
+
+def _split(path: str) -> list:
+    return [part for part in (path or "").split("/") if part]
+
+
+def _millis(value) -> int:
+    try:
+        return as_millis(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _descend(value, parts: list):
+    for part in parts:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _shallow(value):
+    if isinstance(value, dict):
+        return {k: (True if isinstance(v, dict) else v) for k, v in value.items()}
+    return value
+
+
+def _with_path(node: Optional[dict], parts: list, value) -> Optional[dict]:
+    """Copy of `node` with `value` set at `parts` (None deletes), emptied objects removed"""
+    node = dict(node or {})
+    if len(parts) == 1:
+        if value is None:
+            node.pop(parts[0], None)
+        else:
+            node[parts[0]] = value
+    else:
+        child = _with_path(node.get(parts[0]) if isinstance(node.get(parts[0]), dict) else None, parts[1:], value)
+        if child:
+            node[parts[0]] = child
+        else:
+            node.pop(parts[0], None)
+    return node or None
+
+
+def _remove(index: list, item: tuple):
+    i = bisect.bisect_left(index, item)
+    if i < len(index) and index[i] == item:
+        del index[i]
+
+
+class ChatRecord:
+    """One chat; userId is implied by the parent key"""
+    __slots__ = ("timestamp", "order", "category", "message", "response", "user_email", "extra")
+
+    def __init__(self, chat: dict):
+        chat = dict(chat)
+        chat.pop("userId", None)
+        self.timestamp = chat.pop("timestamp", None)
+        self.order = _millis(self.timestamp)
+        self.category = _intern(chat.pop("category", None))
+        self.message = chat.pop("message", None)
+        self.response = chat.pop("response", None)
+        self.user_email = _intern(chat.pop("userEmail", None))
+        self.extra = chat or None
+
+    @property
+    def category_key(self) -> str:
+        return category_key(self.category)
+
+    def to_dict(self, user_id: str) -> dict:
+        chat = dict(self.extra) if self.extra else {}
+        chat["userId"] = user_id
+        for key, value in (("timestamp", self.timestamp), ("category", self.category), ("message", self.message),
+                           ("response", self.response), ("userEmail", self.user_email)):
+            if value is not None:
+                chat[key] = value
+        return chat
+
+
+class FirebaseMirror:
+    def __init__(self, database):
+        self._db = database
+        self._lock = threading.RLock()
+        self._registrations = []
+        self._ready = threading.Event()
+        self._reset_users()
+        self._reset_chats()
+        self.loaded = {tree: False for tree in TREES}
+        self.started_at = None
+        self.loaded_at = None
+        self.last_event_at = None
+        self.events = 0
+        self.errors = 0
+
+    # ---------- lifecycle ----------
+    def start(self):
+        self.started_at = time.time()
+        for tree in TREES:
+            self._registrations.append(self._db.reference(tree).listen(self._listener(tree)))
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until both trees are loaded; returns whether they are"""
+        return self._ready.wait(timeout)
+
+    def stop(self):
+        for registration in self._registrations:
+            try:
+                registration.close()
+            except Exception as e:
+                print(f"Error closing mirror listener: {e}")
+        self._registrations = []
+
+    @property
+    def listening(self) -> bool:
+        # firebase_admin runs each listener on a thread that ends if the stream does
+        threads = [getattr(r, "_thread", None) for r in self._registrations]
+        return bool(self._registrations) and all(t is None or t.is_alive() for t in threads)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set() and self.listening
+
+    def status(self) -> dict:
+        now = time.time()
+        with self._lock:
+            users, chats = len(self.users), self.total_chats
+        if not self._registrations:
+            state = "stopped"
+        elif not self._ready.is_set():
+            state = "loading"
+        elif not self.listening:
+            state = "disconnected"
+        else:
+            state = "live"
+        iso = lambda t: datetime.fromtimestamp(t).isoformat() if t else None
+        return {
+            "enabled": True,
+            "state": state,
+            "users": users,
+            "chats": chats,
+            "loaded_at": iso(self.loaded_at),
+            "load_seconds": round(self.loaded_at - self.started_at, 3) if self.loaded_at else None,
+            "last_event_at": iso(self.last_event_at),
+            "seconds_since_last_event": round(now - self.last_event_at, 3) if self.last_event_at else None,
+            "events": self.events,
+            "errors": self.errors,
+        }
+
+    # ---------- stream ----------
+    def _listener(self, tree: str) -> Callable:
+        apply = self._put_users if tree == "users" else self._put_chats
+
+        def on_event(event):
+            # Exceptions would end firebase_admin's listener thread
+            try:
+                base = _split(event.path)
+                with self._lock:
+                    if event.event_type == "put":
+                        apply(base, event.data)
+                    elif event.event_type == "patch":
+                        for key, value in (event.data or {}).items():
+                            apply(base + _split(key), value)
+                    else:
+                        return
+                    self.events += 1
+                    self.last_event_at = time.time()
+                    if not base and event.event_type == "put" and not self.loaded[tree]:
+                        self.loaded[tree] = True
+                        if all(self.loaded.values()):
+                            self.loaded_at = self.last_event_at
+                            print(f"Mirror loaded {len(self.users)} users and {self.total_chats} chats "
+                                  f"in {self.loaded_at - self.started_at:.2f}s")
+                            self._ready.set()
+            except Exception as e:
+                self.errors += 1
+                print(f"Error applying mirror event on {tree}{getattr(event, 'path', '')}: {e}")
+
+        return on_event
+
+    def _reset_users(self):
+        self.users = {}
+        self.logins = []  # sorted lastLogin times, for active users today
+
+    def _reset_chats(self):
+        self.chats = {}
+        self.by_user = {}
+        self.by_category = {}
+        self.by_time = []
+        self.total_chats = 0
+        self.category_counts = {}
+        self.daily_counts = {}
+
+    def _put_users(self, parts: list, value):
+        if not parts:
+            self._reset_users()
+            for uid, user in (value or {}).items():
+                if isinstance(user, dict):
+                    self.users[uid] = user
+                    self.logins.append(_millis(user.get("lastLogin")))
+            self.logins.sort()
+            return
+        uid = parts[0]
+        old = self.users.pop(uid, None)
+        if old is not None:
+            self._drop_login(old)
+        if len(parts) > 1:
+            value = _with_path(old, parts[1:], value)
+        if isinstance(value, dict):
+            self.users[uid] = value
+            bisect.insort(self.logins, _millis(value.get("lastLogin")))
+
+    def _drop_login(self, user: dict):
+        login = _millis(user.get("lastLogin"))
+        i = bisect.bisect_left(self.logins, login)
+        if i < len(self.logins) and self.logins[i] == login:
+            del self.logins[i]
+
+    def _put_chats(self, parts: list, value):
+        if not parts:
+            self._reset_chats()
+            for uid, user_chats in (value or {}).items():
+                for chat_id, chat in (user_chats or {}).items() if isinstance(user_chats, dict) else ():
+                    self._add_chat(uid, chat_id, chat, bulk=True)
+            for index in self.by_user.values():
+                index.sort()
+            for index in self.by_category.values():
+                index.sort()
+            self.by_time.sort()
+            return
+        uid = parts[0]
+        if len(parts) == 1:
+            for chat_id in list(self.chats.get(uid, ())):
+                self._remove_chat(uid, chat_id)
+            for chat_id, chat in (value or {}).items() if isinstance(value, dict) else ():
+                self._add_chat(uid, chat_id, chat)
+            return
+        chat_id = parts[1]
+        record = self._remove_chat(uid, chat_id)
+        if len(parts) > 2:
+            value = _with_path(record.to_dict(uid) if record else None, parts[2:], value)
+        self._add_chat(uid, chat_id, value)
+
+    def _add_chat(self, uid: str, chat_id: str, chat, bulk: bool = False):
+        if not isinstance(chat, dict):
+            return
+        record = ChatRecord(chat)
+        self.chats.setdefault(uid, {})[chat_id] = record
+        by_user = self.by_user.setdefault(uid, [])
+        by_category = self.by_category.setdefault(record.category_key, [])
+        if bulk:
+            by_user.append((record.order, chat_id))
+            by_category.append((record.order, chat_id, uid))
+            self.by_time.append((record.order, uid, chat_id))
+        else:
+            bisect.insort(by_user, (record.order, chat_id))
+            bisect.insort(by_category, (record.order, chat_id, uid))
+            bisect.insort(self.by_time, (record.order, uid, chat_id))
+        self._count(record, 1)
+
+    def _remove_chat(self, uid: str, chat_id: str) -> Optional[ChatRecord]:
+        user_chats = self.chats.get(uid)
+        record = user_chats.pop(chat_id, None) if user_chats else None
+        if record is None:
+            return None
+        if not user_chats:
+            del self.chats[uid]
+        _remove(self.by_user[uid], (record.order, chat_id))
+        if not self.by_user[uid]:
+            del self.by_user[uid]
+        category = record.category_key
+        _remove(self.by_category[category], (record.order, chat_id, uid))
+        if not self.by_category[category]:
+            del self.by_category[category]
+        _remove(self.by_time, (record.order, uid, chat_id))
+        self._count(record, -1)
+        return record
+
+    def _count(self, record: ChatRecord, sign: int):
+        self.total_chats += sign
+        for counts, key in ((self.category_counts, record.category_key), (self.daily_counts, day_key(record.order))):
+            counts[key] = counts.get(key, 0) + sign
+            if not counts[key]:
+                del counts[key]
+
+    # ---------- reads ----------
+    def reference(self, path: str = "/") -> "MirrorReference":
+        return MirrorReference(self, _split(path))
+
+    def recent_chats_page(self, limit: int, cursor: Optional[str] = None) -> tuple[list, Optional[str]]:
+        """Same rows and cursors as pagination.recent_chats_page over all users"""
+        before = pagination.decode_cursor(cursor) if cursor else None
+        with self._lock:
+            hi = bisect.bisect_left(self.by_time, tuple(before)) if before else len(self.by_time)
+            rows = [(t, uid, cid, self.chats[uid][cid].to_dict(uid))
+                    for t, uid, cid in reversed(self.by_time[max(0, hi - limit - 1):hi])]
+        return pagination.take_page(iter(rows), limit)
+
+    def chat_rows(self) -> list[tuple]:
+        """(uid, timestamp, category, response length) for every chat, for analytics.load()"""
+        # A snapshot, so the stream threads aren't blocked while the caller aggregates
+        with self._lock:
+            return [
+                (uid, record.order, record.category, len(record.response or ""))
+                for uid, chats in self.chats.items()
+                for record in chats.values()
+            ]
+
+    def active_users(self, since_ms: int) -> int:
+        return len(self.logins) - bisect.bisect_left(self.logins, since_ms)
+
+    def _read(self, parts: list, shallow: bool) -> tuple[bool, object]:
+        """(handled, value) for a path; unhandled paths are read from the database"""
+        root, rest = (parts[0], parts[1:]) if parts else (None, [])
+        with self._lock:
+            if root == "users":
+                if not rest:
+                    # Key order, as the database returns children
+                    value = {uid: (True if shallow else dict(self.users[uid])) for uid in sorted(self.users)}
+                    return True, value or None
+                user = self.users.get(rest[0])
+                value = _descend(dict(user) if user else None, rest[1:])
+            elif root == "chats":
+                if not rest:
+                    if shallow:
+                        return True, {uid: True for uid in self.chats} or None
+                    return True, {uid: {cid: r.to_dict(uid) for cid, r in chats.items()}
+                                  for uid, chats in self.chats.items()} or None
+                user_chats = self.chats.get(rest[0]) or {}
+                if len(rest) == 1:
+                    if shallow:
+                        return True, {cid: True for cid in user_chats} or None
+                    return True, {cid: r.to_dict(rest[0]) for cid, r in user_chats.items()} or None
+                record = user_chats.get(rest[1])
+                value = _descend(record.to_dict(rest[0]) if record else None, rest[2:])
+            elif root == "stats" and rest[:1] == ["summary"]:
+                value = _descend(self._summary(), rest[1:])
+            elif root == "stats" and rest[:1] == ["daily"] and len(rest) >= 2:
+                value = _descend(self._daily(rest[1]), rest[2:])
+            elif root == "chat_index" and rest == ["built_at"]:
+                value = int(self.loaded_at * 1000) if self.loaded_at else None
+            elif root == "chat_index" and rest[:1] == ["categories"] and len(rest) == 2:
+                index = self.by_category.get(rest[1]) or []
+                return True, {cid: (True if shallow else {"t": t, "u": uid}) for t, cid, uid in index} or None
+            else:
+                return False, None
+        return True, _shallow(value) if shallow else value
+
+    def _summary(self) -> dict:
+        return {
+            "total_users": len(self.users),
+            "total_queries": self.total_chats,
+            "categories": dict(sorted(self.category_counts.items())),
+            "rebuilt_at": int(self.loaded_at * 1000) if self.loaded_at else None,
+        }
+
+    def _daily(self, day: str) -> dict:
+        daily = {"queries": self.daily_counts.get(day, 0)}
+        if day == day_key(int(time.time() * 1000)):
+            # lastLogin only says who was active today
+            daily["active_users"] = self.active_users(day_start_ms(day))
+        return daily
+
+    def _index(self, parts: list, child: str) -> Optional[tuple]:
+        """(sorted index, row -> (key, value)) for the ordered queries the mirror serves"""
+        if len(parts) == 2 and parts[0] == "chats" and child == "timestamp":
+            uid = parts[1]
+            return self.by_user.get(uid) or [], lambda row: (row[1], self.chats[uid][row[1]].to_dict(uid))
+        if len(parts) == 3 and parts[:2] == ["chat_index", "categories"] and child == "t":
+            return self.by_category.get(parts[2]) or [], lambda row: (row[1], {"t": row[0], "u": row[2]})
+        return None
+
+
+class MirrorReference:
+    def __init__(self, mirror: FirebaseMirror, parts: list):
+        self._mirror = mirror
+        self._parts = parts
+
+    @property
+    def key(self) -> Optional[str]:
+        return self._parts[-1] if self._parts else None
+
+    @property
+    def path(self) -> str:
+        return "/" + "/".join(self._parts)
+
+    def child(self, path: str) -> "MirrorReference":
+        return MirrorReference(self._mirror, self._parts + _split(path))
+
+    def get(self, etag: bool = False, shallow: bool = False):
+        if etag:
+            return self._mirror._db.reference(self.path).get(etag=True, shallow=shallow)
+        handled, value = self._mirror._read(self._parts, shallow)
+        if not handled:
+            return self._mirror._db.reference(self.path).get(shallow=shallow)
+        return value
+
+    def order_by_child(self, path: str):
+        if self._mirror._index(self._parts, path) is None:
+            return self._mirror._db.reference(self.path).order_by_child(path)
+        return MirrorQuery(self._mirror, self._parts, path)
+
+
+class MirrorQuery:
+    """Ordered range query over a mirror index; the index values are integer timestamps"""
+
+    def __init__(self, mirror: FirebaseMirror, parts: list, child: str):
+        self._mirror = mirror
+        self._parts = parts
+        self._child = child
+        self._start = self._end = None
+        self._first = self._last = None
+        self._strings = False
+
+    def start_at(self, start) -> "MirrorQuery":
+        self._strings |= isinstance(start, str)
+        self._start = _millis(start)
+        return self
+
+    def end_at(self, end) -> "MirrorQuery":
+        self._strings |= isinstance(end, str)
+        self._end = _millis(end)
+        return self
+
+    def equal_to(self, value) -> "MirrorQuery":
+        self._start = self._end = _millis(value)
+        return self
+
+    def limit_to_first(self, limit: int) -> "MirrorQuery":
+        self._first = limit
+        return self
+
+    def limit_to_last(self, limit: int) -> "MirrorQuery":
+        self._last = limit
+        return self
+
+    def get(self) -> dict:
+        if self._strings:
+            # Firebase's separate range of string values (legacy timestamps):
+            # the index already orders those by their numeric value
+            return {}
+        with self._mirror._lock:
+            index, to_item = self._mirror._index(self._parts, self._child)
+            lo = bisect.bisect_left(index, (self._start,)) if self._start is not None else 0
+            hi = bisect.bisect_right(index, (self._end, _MAX_KEY)) if self._end is not None else len(index)
+            if self._first is not None:
+                hi = min(hi, lo + self._first)
+            if self._last is not None:
+                lo = max(lo, hi - self._last)
+            return dict(to_item(row) for row in index[lo:hi])
@@ -0,0 +1,160 @@
+"""
+Blocking firebase_admin calls, run off the event loop.
+
+The firebase_admin `db` and `auth` APIs make synchronous HTTP requests.
+Called straight from the async admin handlers, one slow read would stall
+every other request on the worker, health checks included, so handlers
+go through run() and gather(), which execute the calls on a dedicated
+thread pool:
+
+  FIREBASE_WORKERS  threads in the pool (default 16), i.e. the most
+                    Firebase requests in flight per process
+  FIREBASE_TIMEOUT  seconds a handler waits for one call once it starts
+                    running (default 30) before answering 504; time spent
+                    queued behind other calls does not count
+  FIREBASE_GATHER_WINDOW
+                    calls one gather() runs at once (default half the
+                    workers), so a fan-out over every user queues in its
+                    handler rather than in front of everyone else's calls
+
+gather() runs independent calls concurrently and returns their results in
+order; on the first error, its calls that have not started are dropped. A
+timed-out call cannot be interrupted from here: it keeps its thread until
+the underlying request returns, which main.py bounds by passing the same
+timeout to firebase_admin as `httpTimeout`. Call durations and timeouts
+are exported on /metrics.
+"""
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from fastapi import HTTPException
+
+from metrics import REGISTRY
+
+FIREBASE_WORKERS = int(os.getenv("FIREBASE_WORKERS", "16"))
+FIREBASE_TIMEOUT = float(os.getenv("FIREBASE_TIMEOUT", "30"))
+FIREBASE_GATHER_WINDOW = int(os.getenv("FIREBASE_GATHER_WINDOW", str(max(1, FIREBASE_WORKERS // 2))))
+
+CALL_SECONDS = REGISTRY.histogram(
+    "legally_firebase_call_duration_seconds",
+    "Time spent in blocking Firebase calls on the pool, by call",
+    ["call"],
+)
+TIMEOUTS = REGISTRY.counter(
+    "legally_firebase_timeouts",
+    "Firebase calls a handler stopped waiting for after FIREBASE_TIMEOUT, by call",
+    ["call"],
+)
+
+IN_FLIGHT = REGISTRY.gauge(
+    "legally_firebase_calls_in_flight",
+    "Firebase calls handlers are waiting for, queued or running",
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=FIREBASE_WORKERS, thread_name_prefix="firebase")
+    return _executor
+
+
+class FirebaseTimeout(HTTPException):
+    def __init__(self, call: str, timeout: float):
+        super().__init__(status_code=504, detail=f"Firebase call {call} timed out after {timeout:g}s")
+
+
+def _name(fn: Callable) -> str:
+    """Metric label for a call: the function name, through partials"""
+    while isinstance(fn, functools.partial):
+        fn = fn.func
+    return getattr(fn, "__name__", None) or type(fn).__name__
+
+
+def _timed(name: str, fn: Callable, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        CALL_SECONDS.labels(name).observe(time.perf_counter() - start)
+
+
+def _started(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+async def run(fn: Callable, *args, timeout: float = None, **kwargs):
+    """
+    Run a blocking call on the Firebase pool; raises FirebaseTimeout (504)
+    if it runs for more than `timeout` seconds. Cancelling the caller drops
+    the call if it has not started yet.
+    """
+    name = _name(fn)
+    timeout = FIREBASE_TIMEOUT if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    started = loop.create_future()
+
+    def call():
+        try:
+            loop.call_soon_threadsafe(_started, started)
+        except RuntimeError:  # the loop has closed; nobody is waiting
+            pass
+        return _timed(name, fn, *args, **kwargs)
+
+    future = loop.run_in_executor(_pool(), call)
+    IN_FLIGHT.inc()
+    try:
+        # The timeout starts when a worker picks the call up
+        await asyncio.wait((started, future), return_when=asyncio.FIRST_COMPLETED)
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        TIMEOUTS.labels(name).inc()
+        print(f"Firebase call {name} timed out after {timeout:g}s")
+        raise FirebaseTimeout(name, timeout) from None
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    finally:
+        IN_FLIGHT.dec()
+
+
+async def gather(*calls: Callable, timeout: float = None) -> list:
+    """Run zero-argument calls concurrently on the pool, FIREBASE_GATHER_WINDOW at a time; results in order"""
+    window = asyncio.Semaphore(FIREBASE_GATHER_WINDOW)
+
+    async def windowed(call: Callable):
+        async with window:
+            return await run(call, timeout=timeout)
+
+    tasks = [asyncio.ensure_future(windowed(call)) for call in calls]
+    try:
+        return list(await asyncio.gather(*tasks))
+    finally:
+        # After an error, the calls still waiting have no one to return to
+        for task in tasks:
+            task.cancel()
+
+
+def gather_from_thread(loop: asyncio.AbstractEventLoop, *calls: Callable) -> list:
+    """gather() for blocking code running on another thread (e.g. under asyncio.to_thread), via `loop`"""
+    return asyncio.run_coroutine_threadsafe(gather(*calls), loop).result()
+
+
+def shutdown():
+    """Stop the pool (on app shutdown); the next call starts a new one"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -1,21 +1,36 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, Response
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from contextlib import asynccontextmanager
-import firebase_admin
-from firebase_admin import credentials, auth, db
 # Production deployment - v1.0.1
 from datetime import datetime
 import os
+import asyncio
+import threading
 from dotenv import load_dotenv
 from typing import Optional, List
 from pydantic import BaseModel
 import sys
 import pathlib
+import functools
 
+sys.path.append(str(pathlib.Path(__file__).parent))
 # Add fastapi_server to path to import its modules
 sys.path.append(str(pathlib.Path(__file__).parent.parent / "fastapi_server"))
 
+from singleflight import SingleFlight
+from answer_cache import normalize_message
+from citations import CitationRewriter
+from metrics import CONTENT_TYPE, REGISTRY, STAGE_SECONDS, UPSTREAM_ERRORS, MetricsMiddleware, observe_response
+from providers import GROQ_API_URL as DEFAULT_GROQ_API_URL, ProviderError, aclose_shared_client, groq_chat
+import dashboard_stats
+import pagination
+import category_index
+from firebase_mirror import FirebaseMirror
+import firebase_pool
+import exports
+import analytics
+
 # Load environment variables
 load_dotenv()
 
@@ -37,6 +52,7 @@ class UserData(BaseModel):
     last_login: Optional[int] = None  # Unix timestamp in milliseconds
 
 class ChatQuery(BaseModel):
+    id: Optional[str] = None
     user_id: str
     query: str
     timestamp: int  # Unix timestamp in milliseconds from Firebase
@@ -57,20 +73,37 @@ class UsersListResponse(BaseModel):
 class QueriesListResponse(BaseModel):
     total: int
     queries: List[ChatQuery]
+    # Pass back as ?cursor= for the next page; None on the last page
+    next_cursor: Optional[str] = None
 
 class LegalAdviceRequest(BaseModel):
     message: str
     thread_id: Optional[str] = None
 
-# Initialize Firebase Admin SDK
+# Firebase Admin SDK configuration
 firebase_credentials_path = os.getenv("FIREBASE_CREDENTIALS_PATH", "firebase-credentials.json")
 firebase_db_url = os.getenv("FIREBASE_DATABASE_URL", "")
 
-# Try to initialize Firebase
+# Firebase is initialized on first use rather than at import, so cold starts
+# and endpoints that never touch it (health, login, legal advice) skip the
+# firebase_admin import and credential setup. `auth` and `db` are bound by
+# ensure_firebase().
 firebase_initialized = False
-try:
-    if not firebase_admin._apps:
-        import pathlib
+firebase_init_attempted = False
+auth = None
+db = None
+_firebase_lock = threading.Lock()
+
+def _init_firebase() -> bool:
+    global auth, db
+    import firebase_admin
+    from firebase_admin import credentials
+    from firebase_admin import auth as firebase_auth, db as firebase_db
+    auth, db = firebase_auth, firebase_db
+
+    try:
+        if firebase_admin._apps:
+            return True
         cred_path = pathlib.Path(firebase_credentials_path)
         
         # Try environment variables first (for production/Render)
@@ -90,35 +123,110 @@ try:
             }
             cred = credentials.Certificate(cred_dict)
             firebase_admin.initialize_app(cred, {
-                'databaseURL': firebase_db_url
+                'databaseURL': firebase_db_url,
+                # Abort requests the pool has stopped waiting for (see firebase_pool.py)
+                'httpTimeout': firebase_pool.FIREBASE_TIMEOUT
             })
-            firebase_initialized = True
             print("✓ Firebase Admin SDK initialized successfully from environment variables")
+            return True
         elif cred_path.exists():
             # Fall back to credentials file (for local development)
             print(f"Loading Firebase credentials from file: {cred_path}")
             cred = credentials.Certificate(str(cred_path))
             firebase_admin.initialize_app(cred, {
-                'databaseURL': firebase_db_url
+                'databaseURL': firebase_db_url,
+                # Abort requests the pool has stopped waiting for (see firebase_pool.py)
+                'httpTimeout': firebase_pool.FIREBASE_TIMEOUT
             })
-            firebase_initialized = True
             print("✓ Firebase Admin SDK initialized successfully from file")
+            return True
         else:
             print(f"Firebase credentials not found. Checked env vars and file: {cred_path}")
-            firebase_initialized = False
-except Exception as e:
-    print(f"✗ Firebase initialization error: {e}")
-    firebase_initialized = False
+            return False
+    except Exception as e:
+        print(f"✗ Firebase initialization error: {e}")
+        return False
+
+def ensure_firebase() -> bool:
+    """Initialize Firebase once, on first use. Returns whether it is available."""
+    global firebase_initialized, firebase_init_attempted
+    if firebase_init_attempted:
+        return firebase_initialized
+    with _firebase_lock:
+        if not firebase_init_attempted:
+            firebase_initialized = _init_firebase()
+            firebase_init_attempted = True
+    return firebase_initialized
+
+# Optional in-process mirror of users/ and chats/ for admin reads (see
+# firebase_mirror.py), kept current by listen() streams
+MIRROR_ENABLED = os.getenv("FIREBASE_MIRROR", "").lower() in ("1", "true", "yes")
+MIRROR_LOAD_TIMEOUT = float(os.getenv("FIREBASE_MIRROR_LOAD_TIMEOUT", "120"))
+mirror = None
+
+def start_mirror(database=None, timeout: float = MIRROR_LOAD_TIMEOUT) -> FirebaseMirror:
+    """Start mirroring `database` (default: db) and wait up to `timeout` seconds for the initial load"""
+    global mirror
+    mirror = FirebaseMirror(database if database is not None else db)
+    mirror.start()
+    if not mirror.wait(timeout):
+        print(f"Mirror not loaded after {timeout:.0f}s; admin reads use the database until it is")
+    return mirror
+
+def reader():
+    """Where admin reads go: the mirror once it is loaded and listening, else the database"""
+    if mirror is not None and mirror.ready:
+        return mirror
+    return db
+
+# Rebuilds of stats/ and chat_index/ from the chats tree (see
+# dashboard_stats.py and category_index.py). Each downloads every chat and
+# overwrites its node, dropping client increments made while it ran, so
+# they run one at a time; requests that found the node unbuilt and waited
+# re-read the marker the rebuild recorded instead of rebuilding again.
+_stats_rebuild = asyncio.Lock()
+_index_rebuild = asyncio.Lock()
+
+async def _rebuild_stats(only_if_missing: bool = False) -> dict:
+    """Recompute stats/ from users and chats; with only_if_missing, unless rebuild()'s marker is there"""
+    async with _stats_rebuild:
+        if only_if_missing:
+            summary = await firebase_pool.run(db.reference(f'{dashboard_stats.STATS_PATH}/summary').get)
+            if dashboard_stats.is_built(summary):
+                return summary
+        users, chats = await firebase_pool.gather(db.reference('users').get, db.reference('chats').get)
+        return await firebase_pool.run(dashboard_stats.rebuild, db, users=users or {}, chats=chats or {})
+
+async def _rebuild_index(only_if_missing: bool = False) -> Optional[dict]:
+    """Recreate chat_index/ from chats; with only_if_missing, unless its built_at marker is there (None then)"""
+    async with _index_rebuild:
+        if only_if_missing and await firebase_pool.run(category_index.is_built, db):
+            return None
+        chats = await firebase_pool.run(db.reference('chats').get)
+        return await firebase_pool.run(category_index.rebuild, db, chats or {})
 
 # In-memory data storage (in production, use a real database)
 admin_users = {
     os.getenv("ADMIN_EMAIL", "admin@legally.com"): os.getenv("ADMIN_PASSWORD", "Admin@123")
 }
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MIRROR_ENABLED and ensure_firebase():
+        await asyncio.to_thread(start_mirror)
+    yield
+    if mirror is not None:
+        await asyncio.to_thread(mirror.stop)
+    # Blocking Firebase calls (see firebase_pool.py)
+    firebase_pool.shutdown()
+    # Pooled upstream connections (see providers.py)
+    await aclose_shared_client()
+
 app = FastAPI(
     title="Legal AI Admin API",
     description="Admin panel API for managing legal AI assistant",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -130,6 +238,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Per-route latency and in-flight requests for /metrics
+app.add_middleware(MetricsMiddleware)
 
 # Dependency for verifying admin token
 async def verify_admin_token(token: str = None) -> dict:
@@ -180,6 +290,12 @@ async def root():
             "users": "GET /api/v1/admin/users",
             "queries": "GET /api/v1/admin/queries",
             "queries_by_category": "GET /api/v1/admin/queries/category/{category}",
+            "rebuild_stats": "POST /api/v1/admin/stats/rebuild",
+            "rebuild_category_index": "POST /api/v1/admin/queries/category-index/rebuild",
+            "mirror": "GET /api/v1/admin/mirror",
+            "export_users": "GET /api/v1/admin/export/users?format=ndjson|csv",
+            "export_chats": "GET /api/v1/admin/export/chats?format=ndjson|csv",
+            "analytics": "GET /api/v1/admin/analytics?bucket=hour|day|week",
             "set_admin_role": "POST /api/v1/admin/set-admin-role/{user_id}",
             "delete_user": "DELETE /api/v1/admin/users/{user_id}"
         },
@@ -224,58 +340,47 @@ async def get_dashboard_stats(token: str = None) -> DashboardStats:
     """Get admin dashboard statistics from Firebase"""
     await verify_admin_token(token)
     
-    if not firebase_initialized:
+    if not ensure_firebase():
         raise HTTPException(status_code=503, detail="Firebase not initialized")
     
     try:
-        # Get Firebase Realtime Database reference
-        users_ref = db.reference('users')
-        chats_ref = db.reference('chats')
-        
-        # Fetch all users
-        users_data = users_ref.get() or {}
-        total_users = len(users_data)
-        
-        # Fetch all chats
-        chats_data = chats_ref.get() or {}
-        all_chats = []
-        category_count = {}
-        
-        for user_id, user_chats in chats_data.items():
-            if user_chats:
-                for chat_id, chat in user_chats.items():
-                    all_chats.append(chat)
-                    category = chat.get('category', 'General')
-                    category_count[category] = category_count.get(category, 0) + 1
-        
-        total_queries = len(all_chats)
-        
-        # Calculate today's stats
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_timestamp = int(today.timestamp() * 1000)
-        
-        active_users_today = sum(1 for user in users_data.values() 
-                                 if user.get('lastLogin', 0) >= today_timestamp)
-        queries_today = sum(1 for chat in all_chats 
-                           if chat.get('timestamp', 0) >= today_timestamp)
-        
-        # Top categories
-        top_categories = [{"category": cat, "count": count} 
-                         for cat, count in sorted(category_count.items(), 
-                                                 key=lambda x: x[1], reverse=True)[:5]]
+        # Materialized aggregates under stats/ (see dashboard_stats.py), the
+        # summary and today's counters read concurrently; the first load
+        # after deploy builds them from the users and chats trees
+        summary, daily = await firebase_pool.gather(*dashboard_stats.dashboard_reads(reader()))
+        # Client increments can create a partial summary before any rebuild,
+        # so only a summary carrying rebuild()'s marker counts as built
+        if not dashboard_stats.is_built(summary):
+            await _rebuild_stats(only_if_missing=True)
+            summary, daily = await firebase_pool.gather(*dashboard_stats.dashboard_reads(db))
         
         return DashboardStats(
-            total_users=total_users,
-            total_queries=total_queries,
-            active_users_today=active_users_today,
-            queries_today=queries_today,
-            top_categories=top_categories,
+            **dashboard_stats.dashboard_payload(summary or {}, daily or {}),
             last_updated=datetime.now().isoformat()
         )
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching dashboard stats: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch stats: {str(e)}")
 
+@app.post("/api/v1/admin/stats/rebuild")
+async def rebuild_dashboard_stats(token: str = None):
+    """Recompute the dashboard aggregates from users and chats to fix drift"""
+    await verify_admin_token(token)
+    
+    if not ensure_firebase():
+        raise HTTPException(status_code=503, detail="Firebase not initialized")
+    
+    try:
+        summary = await _rebuild_stats()
+        return {"success": True, "summary": summary}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error rebuilding dashboard stats: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild stats: {str(e)}")
+
 @app.get("/api/v1/admin/users", response_model=UsersListResponse)
 async def get_users(
     limit: int = 50,
@@ -285,12 +390,12 @@ async def get_users(
     """Get list of users from Firebase"""
     await verify_admin_token(token)
     
-    if not firebase_initialized:
+    if not ensure_firebase():
         raise HTTPException(status_code=503, detail="Firebase not initialized")
     
     try:
-        users_ref = db.reference('users')
-        users_data = users_ref.get() or {}
+        users_ref = reader().reference('users')
+        users_data = await firebase_pool.run(users_ref.get) or {}
         
         users = []
         for uid, user in users_data.items():
@@ -313,6 +418,8 @@ async def get_users(
             total=len(users),
             users=users[offset:offset+limit]
         )
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching users: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch users: {str(e)}")
@@ -325,12 +432,12 @@ async def get_user_details(
     """Get individual user details from Firebase"""
     await verify_admin_token(token)
     
-    if not firebase_initialized:
+    if not ensure_firebase():
         raise HTTPException(status_code=503, detail="Firebase not initialized")
     
     try:
-        user_ref = db.reference(f'users/{user_id}')
-        user_data = user_ref.get()
+        user_ref = reader().reference(f'users/{user_id}')
+        user_data = await firebase_pool.run(user_ref.get)
         
         if not user_data:
             raise HTTPException(status_code=404, detail="User not found")
@@ -362,41 +469,46 @@ async def get_user_details(
 async def get_user_chats(
     user_id: str,
     limit: int = 100,
+    cursor: Optional[str] = None,
     token: str = None
 ):
-    """Get user's chat history from Firebase"""
+    """Get user's chat history from Firebase, newest first"""
     await verify_admin_token(token)
     
-    if not firebase_initialized:
+    if not ensure_firebase():
         raise HTTPException(status_code=503, detail="Firebase not initialized")
     
     try:
-        chats_ref = db.reference(f'chats/{user_id}')
-        chats_data = chats_ref.get() or {}
+        # Ordered, limited query on the timestamp index (see pagination.py)
+        source = reader()
+        (rows, next_cursor), chat_keys = await firebase_pool.gather(
+            functools.partial(pagination.user_chats_page, source, user_id, pagination.clamp_limit(limit), cursor),
+            functools.partial(source.reference(f'chats/{user_id}').get, shallow=True),
+        )
+        total = len(chat_keys or {})
         
-        chats = []
-        for chat_id, chat in chats_data.items():
-            timestamp = chat.get('timestamp', 0)
-            # Ensure timestamp is an integer
-            if isinstance(timestamp, str):
-                timestamp = int(timestamp) if timestamp else 0
-            chats.append({
+        chats = [
+            {
                 "id": chat_id,
-                "user_id": user_id,
+                "user_id": uid,
                 "user_email": chat.get('userEmail', ''),
                 "message": chat.get('message', ''),
                 "response": chat.get('response', ''),
                 "category": chat.get('category', 'General'),
                 "timestamp": timestamp
-            })
-        
-        # Sort by timestamp descending
-        chats.sort(key=lambda x: x['timestamp'], reverse=True)
+            }
+            for timestamp, uid, chat_id, chat in rows
+        ]
         
         return {
-            "total": len(chats),
-            "chats": chats[:limit]
+            "total": total,
+            "chats": chats,
+            "next_cursor": next_cursor
         }
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching user chats: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch user chats: {str(e)}")
@@ -404,44 +516,72 @@ async def get_user_chats(
 @app.get("/api/v1/admin/queries", response_model=QueriesListResponse)
 async def get_user_queries(
     limit: int = 50,
-    offset: int = 0,
+    cursor: Optional[str] = None,
     user_id: Optional[str] = None,
     token: str = None
 ) -> QueriesListResponse:
-    """Get user chat queries from Firebase"""
+    """Get user chat queries from Firebase, newest first, one cursor page at a time"""
     await verify_admin_token(token)
     
-    if not firebase_initialized:
+    if not ensure_firebase():
         raise HTTPException(status_code=503, detail="Firebase not initialized")
     
     try:
-        chats_ref = db.reference('chats')
-        chats_data = chats_ref.get() or {}
-        
-        queries = []
-        for uid, user_chats in chats_data.items():
-            if user_id and uid != user_id:
-                continue
-            if user_chats:
-                for chat_id, chat in user_chats.items():
-                    timestamp = chat.get('timestamp', 0)
-                    # Ensure timestamp is an integer
-                    if isinstance(timestamp, str):
-                        timestamp = int(timestamp)
-                    queries.append(ChatQuery(
-                        user_id=uid,
-                        query=chat.get('message', ''),
-                        timestamp=timestamp,
-                        category=chat.get('category', 'General')
-                    ))
+        limit = pagination.clamp_limit(limit)
+        source = reader()
+        if user_id:
+            (rows, next_cursor), chat_keys = await firebase_pool.gather(
+                functools.partial(pagination.user_chats_page, source, user_id, limit, cursor),
+                functools.partial(source.reference(f'chats/{user_id}').get, shallow=True),
+            )
+            total = len(chat_keys or {})
+        elif source is mirror:
+            # One slice of the mirror's index of all chats by time
+            rows, next_cursor = mirror.recent_chats_page(limit, cursor)
+            total = dashboard_stats.total_queries(source)
+        else:
+            # Heap merge of each user's newest chats (see pagination.py); the
+            # shallow read only fetches keys, and every user's first small
+            # batch is fetched concurrently on the pool
+            user_keys, total = await firebase_pool.gather(
+                functools.partial(source.reference('chats').get, shallow=True),
+                functools.partial(dashboard_stats.total_queries, source),
+            )
+            loop = asyncio.get_running_loop()
+
+            def prime_all(streams: list) -> list:
+                return firebase_pool.gather_from_thread(loop, *(functools.partial(pagination.prime, s) for s in streams))
+
+            # The merge blocks between batches, so it runs off the loop
+            rows, next_cursor = await asyncio.to_thread(
+                pagination.recent_chats_page, source, list(user_keys or {}), limit, cursor, prime_all
+            )
+            if total is None:
+                # Counting every user's chats would cost a read per user on
+                # each page; build the maintained counters once instead
+                summary = await _rebuild_stats(only_if_missing=True)
+                total = max(0, int(summary.get("total_queries") or 0))
         
-        # Sort by timestamp descending
-        queries.sort(key=lambda x: x.timestamp, reverse=True)
+        queries = [
+            ChatQuery(
+                id=chat_id,
+                user_id=uid,
+                query=chat.get('message', ''),
+                timestamp=timestamp,
+                category=chat.get('category', 'General')
+            )
+            for timestamp, uid, chat_id, chat in rows
+        ]
         
         return QueriesListResponse(
-            total=len(queries),
-            queries=queries[offset:offset+limit]
+            total=total,
+            queries=queries,
+            next_cursor=next_cursor
         )
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching queries: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch queries: {str(e)}")
@@ -450,35 +590,192 @@ async def get_user_queries(
 async def get_queries_by_category(
     category: str,
     limit: int = 50,
-    offset: int = 0,
+    cursor: Optional[str] = None,
     token: str = None
 ) -> QueriesListResponse:
-    """Get queries filtered by legal category"""
+    """Get queries filtered by legal category, newest first, via the category index"""
     await verify_admin_token(token)
     
-    # TODO: Replace with actual filtered query data from database
-    queries = [
-        ChatQuery(
-            user_id=f"user_{i}",
-            query=f"Query about {category}: Question {i}",
-            timestamp=datetime.now().isoformat(),
-            category=category
+    if not ensure_firebase():
+        raise HTTPException(status_code=503, detail="Firebase not initialized")
+    
+    try:
+        # Range read on chat_index/categories/{category} (see category_index.py);
+        # the first listing after deploy builds the index
+        source = reader()
+        if not await firebase_pool.run(category_index.is_built, source):
+            await _rebuild_index(only_if_missing=True)
+        (entries, next_cursor), total = await firebase_pool.gather(
+            functools.partial(category_index.category_entries, source, category, pagination.clamp_limit(limit), cursor),
+            functools.partial(category_index.category_count, source, category),
         )
-        for i in range(1, 11)  # Demo data
-    ]
+        # The page's chats are independent reads, fetched concurrently
+        chats = await firebase_pool.gather(
+            *(source.reference(f'chats/{uid}/{chat_id}').get for _, uid, chat_id, _ in entries)
+        )
+        rows = category_index.with_chats(entries, chats)
+        
+        queries = [
+            ChatQuery(
+                id=chat_id,
+                user_id=uid,
+                query=chat.get('message', ''),
+                timestamp=timestamp,
+                category=chat.get('category', 'General')
+            )
+            for timestamp, uid, chat_id, chat in rows
+        ]
+        
+        return QueriesListResponse(
+            total=total,
+            queries=queries,
+            next_cursor=next_cursor
+        )
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error fetching queries for category {category}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch queries: {str(e)}")
+
+@app.post("/api/v1/admin/queries/category-index/rebuild")
+async def rebuild_category_index(token: str = None):
+    """Recreate the category index from all chats"""
+    await verify_admin_token(token)
+    
+    if not ensure_firebase():
+        raise HTTPException(status_code=503, detail="Firebase not initialized")
     
-    return QueriesListResponse(
-        total=1840,
-        queries=queries[offset:offset+limit]
+    try:
+        counts = await _rebuild_index()
+        return {"success": True, "categories": counts}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error rebuilding category index: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild category index: {str(e)}")
+
+def _export_response(pages, fields: tuple, format: str, cursor: Optional[str], name: str) -> StreamingResponse:
+    try:
+        encode = exports.encoder(format, fields, header=not cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filename = f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{format}"
+    return StreamingResponse(
+        exports.stream(pages, encode, name),
+        media_type=exports.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
+@app.get("/api/v1/admin/export/users")
+async def export_users(
+    format: str = "ndjson",
+    cursor: Optional[str] = None,
+    token: str = None
+):
+    """Stream all users as NDJSON or CSV; resume with cursor=<id of the last user received>"""
+    await verify_admin_token(token)
+    
+    if not ensure_firebase():
+        raise HTTPException(status_code=503, detail="Firebase not initialized")
+    
+    # Key-ordered pages read as the response is sent (see exports.py)
+    return _export_response(exports.user_pages(db, cursor), exports.USER_FIELDS, format, cursor, "users")
+
+@app.get("/api/v1/admin/export/chats")
+async def export_chats(
+    format: str = "ndjson",
+    cursor: Optional[str] = None,
+    user_id: Optional[str] = None,
+    token: str = None
+):
+    """Stream all chats (or one user's) as NDJSON or CSV; resume with cursor=<user_id>/<chat_id> of the last chat received"""
+    await verify_admin_token(token)
+    
+    if not ensure_firebase():
+        raise HTTPException(status_code=503, detail="Firebase not initialized")
+    
+    try:
+        if cursor:
+            exports.parse_chat_cursor(cursor)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    pages = exports.chat_pages(db, cursor, user_id)
+    return _export_response(pages, exports.CHAT_FIELDS, format, cursor, "chats")
+
+# Chat columns for analytics (see analytics.py), reloaded at most every
+# ANALYTICS_TTL seconds; concurrent requests share one load
+ANALYTICS_TTL = float(os.getenv("ANALYTICS_TTL", "300"))
+ANALYTICS_LOAD_TIMEOUT = float(os.getenv("ANALYTICS_LOAD_TIMEOUT", "300"))
+analytics_flight = SingleFlight()
+_analytics_columns = None
+
+async def analytics_columns() -> analytics.ChatColumns:
+    global _analytics_columns
+    if _analytics_columns is None or _analytics_columns.age() > ANALYTICS_TTL:
+        _analytics_columns = await analytics_flight.do(
+            "columns",
+            lambda: firebase_pool.run(analytics.load, reader(), timeout=ANALYTICS_LOAD_TIMEOUT)
+        )
+    return _analytics_columns
+
+@app.get("/api/v1/admin/analytics")
+async def get_analytics(
+    bucket: str = "day",
+    days: int = 30,
+    cohort: str = "week",
+    periods: int = 8,
+    tz_offset: int = 0,
+    token: str = None
+):
+    """Query volume, active users, category trends, cohort retention and response lengths over the last `days` days"""
+    await verify_admin_token(token)
+    
+    if not ensure_firebase():
+        raise HTTPException(status_code=503, detail="Firebase not initialized")
+    
+    try:
+        columns = await analytics_columns()
+        # Vectorized, but still CPU work on up to millions of rows
+        return await asyncio.to_thread(
+            analytics.report, columns, bucket, days, cohort, periods, tz_offset
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error computing analytics: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to compute analytics: {str(e)}")
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: request and Groq latencies, upstream errors, answer sizes"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/api/legal-advice/stats")
+async def legal_advice_stats():
+    """Coalescing and citation rewrite counters for the legal advice endpoint"""
+    return {"coalescing": legal_advice_flight.stats(), "citations": citation_rewriter.stats()}
+
+@app.get("/api/v1/admin/mirror")
+async def mirror_status(token: str = None):
+    """Live mirror state and staleness (FIREBASE_MIRROR=1)"""
+    await verify_admin_token(token)
+    if mirror is None:
+        return {"enabled": False, "state": "disabled"}
+    return {**mirror.status(), "serving_reads": mirror.ready}
+
 @app.get("/api/v1/admin/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "service": "Legal AI Admin API"
+        "service": "Legal AI Admin API",
+        "mirror": mirror.status()["state"] if mirror is not None else "disabled"
     }
 
 @app.post("/api/v1/admin/set-admin-role/{user_id}")
@@ -489,13 +786,18 @@ async def set_admin_role(
     """Set a user as admin (admin only)"""
     await verify_admin_token(token)
     
+    if not ensure_firebase():
+        raise HTTPException(status_code=503, detail="Firebase not initialized")
+    
     try:
         # Set custom claims for admin role
-        auth.set_custom_user_claims(user_id, {'admin': True})
+        await firebase_pool.run(auth.set_custom_user_claims, user_id, {'admin': True})
         return {
             "success": True,
             "message": f"User {user_id} set as admin"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -510,25 +812,37 @@ async def delete_user(
     """Delete a user completely - Auth + all data (admin only)"""
     await verify_admin_token(token)
     
-    if not firebase_initialized:
+    if not ensure_firebase():
         raise HTTPException(status_code=503, detail="Firebase not initialized")
     
     try:
-        # Delete user from Firebase Auth
-        auth.delete_user(user_id)
-        
-        # Delete user data from Realtime Database
-        users_ref = db.reference(f'users/{user_id}')
-        users_ref.delete()
+        # Delete user from Firebase Auth, concurrently with reading what the
+        # counters need; data is only removed once the Auth deletion succeeded
+        _, user_keys, user_chats = await firebase_pool.gather(
+            functools.partial(auth.delete_user, user_id),
+            functools.partial(db.reference(f'users/{user_id}').get, shallow=True),
+            db.reference(f'chats/{user_id}').get,
+        )
+        user_chats = user_chats or {}
         
-        # Delete all user chats
-        chats_ref = db.reference(f'chats/{user_id}')
-        chats_ref.delete()
+        # User record, all user chats and their category index entries go in
+        # one multi-path write, alongside the dashboard aggregates
+        removals = {
+            f'users/{user_id}': None,
+            f'chats/{user_id}': None,
+            **category_index.removal_updates(user_chats)
+        }
+        await firebase_pool.gather(
+            functools.partial(db.reference().update, removals),
+            functools.partial(dashboard_stats.remove_user, db, user_id, user_chats, counted=user_keys is not None),
+        )
         
         return {
             "success": True,
             "message": f"User {user_id} and all associated data deleted successfully"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -550,7 +864,7 @@ async def update_user(
     """Update user information (admin only)"""
     await verify_admin_token(token)
     
-    if not firebase_initialized:
+    if not ensure_firebase():
         raise HTTPException(status_code=503, detail="Firebase not initialized")
     
     try:
@@ -573,15 +887,6 @@ async def update_user(
                 phone = f'+91{phone}'  # Default to India +91
             update_params['phone_number'] = phone
         
-        # Try to update Firebase Auth (continue even if it fails)
-        if update_params:
-            try:
-                auth.update_user(user_id, **update_params)
-                print(f"Firebase Auth updated successfully for {user_id}")
-            except Exception as auth_error:
-                print(f"Firebase Auth update error (continuing anyway): {auth_error}")
-                # Continue to update database
-        
         # Update user data in Realtime Database
         users_ref = db.reference(f'users/{user_id}')
         db_updates = {}
@@ -593,10 +898,24 @@ async def update_user(
         if user_data.display_name is not None:
             db_updates['displayName'] = user_data.display_name if user_data.display_name else None
         
-        if db_updates:
-            users_ref.update(db_updates)
+        async def update_auth():
+            # Try to update Firebase Auth (continue even if it fails)
+            try:
+                await firebase_pool.run(functools.partial(auth.update_user, user_id, **update_params))
+                print(f"Firebase Auth updated successfully for {user_id}")
+            except Exception as auth_error:
+                print(f"Firebase Auth update error (continuing anyway): {auth_error}")
+        
+        async def update_database():
+            await firebase_pool.run(users_ref.update, db_updates)
             print(f"Database updated successfully for {user_id}")
         
+        # Auth and the database are independent, so update them concurrently
+        await asyncio.gather(
+            *([update_auth()] if update_params else []),
+            *([update_database()] if db_updates else []),
+        )
+        
         return {
             "success": True,
             "message": "User updated successfully",
@@ -616,6 +935,66 @@ async def update_user(
 
 # ============ LEGAL ADVICE ENDPOINT (PUBLIC) ============
 
+GROQ_API_URL = os.getenv("GROQ_API_URL", DEFAULT_GROQ_API_URL)
+GROQ_MODEL = "llama-3.3-70b-versatile"  # Fast, high-quality model
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "30"))
+GROQ_RETRIES = int(os.getenv("GROQ_RETRIES", "2"))
+
+GROQ_SYSTEM_PROMPT = """You are an expert legal assistant specialized in Indian Law and International Law.
+
+Provide accurate and educational legal information with proper citations to relevant Indian statutes.
+
+IMPORTANT INSTRUCTIONS:
+- Use the Bharatiya Nyaya Sanhita, 2023 (BNS) instead of the Indian Penal Code, 1860 (IPC).
+- Do NOT reference IPC sections unless explicitly asked.
+- Cite laws in this format:
+  Example: Section 103, Bharatiya Nyaya Sanhita, 2023.
+- Where applicable, also reference:
+    - Bharatiya Nagarik Suraksha Sanhita, 2023 (BNSS)
+    - Bharatiya Sakshya Adhiniyam, 2023 (BSA)
+    - Relevant Special Acts (e.g., IT Act, POCSO Act, etc.)
+
+Explain legal principles clearly in simple language.
+Mention punishments, legal ingredients, and exceptions where applicable.
+Clarify whether the offence is cognizable/non-cognizable and bailable/non-bailable when relevant.
+Always recommend consulting a qualified advocate for specific legal cases."""
+
+# Identical questions that arrive while one is already being answered share
+# that Groq call (legal advice here has no thread history)
+legal_advice_flight = SingleFlight()
+
+# Old IPC/CrPC/Evidence Act citations in answers are rewritten to their
+# BNS/BNSS/BSA equivalents (CITATION_REWRITE=rewrite|flag|off)
+citation_rewriter = CitationRewriter(os.getenv("CITATION_REWRITE", "rewrite"))
+
+async def _groq_completion(user_message: str, groq_api_key: str) -> str:
+    provider = groq_chat(
+        GROQ_MODEL,
+        groq_api_key,
+        GROQ_API_URL,
+        timeout=GROQ_TIMEOUT,
+        retries=GROQ_RETRIES,
+        defaults={"max_tokens": 1024, "temperature": 0.7},
+    )
+    messages = [
+        {"role": "system", "content": GROQ_SYSTEM_PROMPT},
+        {"role": "user", "content": user_message}
+    ]
+    
+    # Async client with pooled keep-alive connections (providers.py)
+    try:
+        with STAGE_SECONDS.time("groq"):
+            content = await provider.complete(messages)
+    except ProviderError as e:
+        print(f"Groq API Error: {e}")
+        UPSTREAM_ERRORS.labels("groq", f"http_{e.status}" if e.status else type(e.__cause__ or e).__name__).inc()
+        raise
+    
+    with STAGE_SECONDS.time("postprocess"):
+        advice = citation_rewriter.rewrite(content.strip())
+    observe_response(advice)
+    return advice
+
 @app.post("/api/legal-advice")
 async def get_legal_advice(request: LegalAdviceRequest):
     """
@@ -633,8 +1012,6 @@ async def get_legal_advice(request: LegalAdviceRequest):
         print(f"Processing legal advice request: {user_message[:50]}...")
         
         # Use Groq API (fast, free, reliable)
-        import requests
-        
         groq_api_key = os.getenv('GROQ_API_KEY')
         if not groq_api_key or groq_api_key == 'your_groq_api_key_here':
             raise HTTPException(
@@ -642,49 +1019,10 @@ async def get_legal_advice(request: LegalAdviceRequest):
                 detail="AI service not configured. Please add GROQ_API_KEY to environment variables."
             )
         
-        system_prompt = """You are an expert legal assistant specialized in Indian Law and International Law.
-
-Provide accurate and educational legal information with proper citations to relevant Indian statutes.
-
-IMPORTANT INSTRUCTIONS:
-- Use the Bharatiya Nyaya Sanhita, 2023 (BNS) instead of the Indian Penal Code, 1860 (IPC).
-- Do NOT reference IPC sections unless explicitly asked.
-- Cite laws in this format:
-  Example: Section 103, Bharatiya Nyaya Sanhita, 2023.
-- Where applicable, also reference:
-    - Bharatiya Nagarik Suraksha Sanhita, 2023 (BNSS)
-    - Bharatiya Sakshya Adhiniyam, 2023 (BSA)
-    - Relevant Special Acts (e.g., IT Act, POCSO Act, etc.)
-
-Explain legal principles clearly in simple language.
-Mention punishments, legal ingredients, and exceptions where applicable.
-Clarify whether the offence is cognizable/non-cognizable and bailable/non-bailable when relevant.
-Always recommend consulting a qualified advocate for specific legal cases."""
-        
-        api_url = "https://api.groq.com/openai/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {groq_api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": "llama-3.3-70b-versatile",  # Fast, high-quality model
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            "max_tokens": 1024,
-            "temperature": 0.7
-        }
-        
-        response = requests.post(api_url, headers=headers, json=payload, timeout=30)
-        
-        if response.status_code != 200:
-            print(f"Groq API Error {response.status_code}: {response.text}")
-            raise Exception(f"Groq API error: {response.status_code}")
-        
-        result = response.json()
-        response_text = result['choices'][0]['message']['content'].strip()
+        response_text = await legal_advice_flight.do(
+            (GROQ_MODEL, normalize_message(user_message)),
+            lambda: _groq_completion(user_message, groq_api_key)
+        )
         
         if not response_text:
             raise Exception("Model returned empty response")
@@ -0,0 +1,190 @@
+"""
+Cursor pagination over chats, newest first, using Firebase ordered queries.
+
+Chats live under chats/{uid}/{chat_id} with `.indexOn: ["timestamp"]`, so a
+user's newest chats are `order_by_child("timestamp").limit_to_last(n)` and
+the next page ends at the last timestamp seen (`end_at`). Nothing is read
+past what the page needs.
+
+Listings across users are a k-way heap merge of one such stream per user.
+Each stream starts with a small batch (about its share of the page) and
+doubles it each time the merge exhausts it, so a page reads a couple of
+rows per user plus at most about twice the rows on the page, whatever the
+page size and however many chats exist in total.
+
+Cursors are opaque strings encoding (timestamp, user_id, chat_id) of the
+last row returned. Within one ordered query Firebase breaks timestamp ties
+by key, and merged listings by (user_id, chat_id), so no row is skipped or
+repeated between pages.
+
+Records with string timestamps (written by old clients) are ordered by
+Firebase after all numeric ones, as strings, so a numeric `end_at` never
+reaches them. Each stream reads them in a second query, all at once (there
+are few, and no new ones are written; for most users it returns nothing),
+and merges them in by their numeric value.
+"""
+import base64
+import heapq
+import itertools
+import json
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+from dashboard_stats import as_millis
+
+MAX_PAGE_SIZE = 500
+# Largest batch a stream grows to, and the smallest it starts with in a merge
+MAX_BATCH = 2 * MAX_PAGE_SIZE
+MIN_BATCH = 2
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class Cursor(NamedTuple):
+    timestamp: int
+    user_id: str
+    chat_id: str
+
+
+# (timestamp, user_id, chat_id, chat); the first three fields are the sort key
+Row = tuple
+
+
+def encode_cursor(row: Row) -> str:
+    raw = json.dumps([row[0], row[1], row[2]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Parse a cursor from a previous page; raises InvalidCursor if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, user_id, chat_id = json.loads(raw)
+        return Cursor(int(timestamp), str(user_id), str(chat_id))
+    except Exception as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def children(result) -> dict:
+    if isinstance(result, list):  # Firebase returns arrays for integer-like keys
+        return {str(i): v for i, v in enumerate(result) if v is not None}
+    return result or {}
+
+
+# Sorts after any Firebase key (and, as a value, after any other string)
+MAX_KEY = "\uffff"
+# Above any numeric value; numbers past 2**53 don't survive JSON
+MAX_NUMBER = 2 ** 53 - 1
+
+
+def _positioned(items: dict, to_row: Callable[[str, dict], Row], bound: Optional[tuple]) -> list:
+    """(position, row) for children before the exclusive `bound`, in descending (value, key) order"""
+    rows = []
+    for key, value in items.items():
+        row = to_row(key, value)
+        if bound is None or (row[0], key) < bound:
+            rows.append(((row[0], key), row))
+    rows.sort(key=lambda item: item[0], reverse=True)
+    return rows
+
+
+def ordered_stream(db, path: str, order_by: str, to_row: Callable[[str, dict], Row],
+                   before: Optional[tuple] = None, batch: int = 50) -> Iterator[Row]:
+    """
+    Children of `path` as rows, in descending (row value, key) order, where
+    the row value is `to_row`'s numeric reading of the `order_by` child.
+    Numeric values are fetched `batch` at first, doubling with each further
+    query (up to MAX_BATCH); string values (legacy timestamps) in one query
+    up front. `before` is an exclusive (value, key) bound.
+    """
+    # A generator: nothing is read until the first row is asked for
+    legacy = children(db.reference(path).order_by_child(order_by).start_at("").end_at(MAX_KEY).get())
+    numeric = _numeric_rows(db, path, order_by, to_row, before, batch, skip=legacy.keys())
+    merged = heapq.merge(numeric, _positioned(legacy, to_row, before), key=lambda item: item[0], reverse=True)
+    yield from (row for _, row in merged)
+
+
+def _numeric_rows(db, path: str, order_by: str, to_row: Callable[[str, dict], Row],
+                  last: Optional[tuple], batch: int, skip) -> Iterator[tuple]:
+    while True:
+        query = db.reference(path).order_by_child(order_by).end_at(last[0] if last is not None else MAX_NUMBER)
+        fetched = children(query.limit_to_last(batch).get())
+        fresh = _positioned(fetched, to_row, last)
+        yield from ((position, row) for position, row in fresh if position[1] not in skip)
+        if len(fetched) < batch:
+            return
+        if fresh:
+            last = fresh[-1][0]
+            batch = max(batch, min(batch * 2, MAX_BATCH))
+        else:
+            # A whole batch shares the boundary value; widen and retry
+            batch *= 2
+
+
+def _user_bound(user_id: str, before: Optional[Cursor]) -> Optional[tuple]:
+    """A cross-user cursor as a (timestamp, chat_id) bound within one user's chats"""
+    if before is None:
+        return None
+    if user_id < before.user_id:
+        return (before.timestamp, MAX_KEY)
+    if user_id == before.user_id:
+        return (before.timestamp, before.chat_id)
+    return (before.timestamp, "")
+
+
+def user_chat_stream(db, user_id: str, before: Optional[Cursor] = None, batch: int = 50) -> Iterator[Row]:
+    """A user's chats newest first"""
+    return ordered_stream(
+        db, f"chats/{user_id}", "timestamp",
+        lambda chat_id, chat: (as_millis(chat.get("timestamp")), user_id, chat_id, chat),
+        _user_bound(user_id, before), batch,
+    )
+
+
+def prime(stream: Iterator[Row]) -> Iterator[Row]:
+    """Fetch a stream's first batch now (e.g. on a worker thread, concurrently with others)"""
+    first = list(itertools.islice(stream, 1))
+    return itertools.chain(first, stream)
+
+
+def merge_streams(streams: Iterable[Iterator[Row]]) -> Iterator[Row]:
+    return heapq.merge(*streams, key=lambda row: row[:3], reverse=True)
+
+
+def take_page(rows: Iterator[Row], limit: int) -> tuple[list, Optional[str]]:
+    """The first `limit` rows and the cursor for the next page (None on the last page)"""
+    page = list(itertools.islice(rows, limit + 1))
+    if len(page) > limit:
+        return page[:limit], encode_cursor(page[limit - 1])
+    return page, None
+
+
+def user_chats_page(db, user_id: str, limit: int, cursor: Optional[str] = None) -> tuple[list, Optional[str]]:
+    before = decode_cursor(cursor) if cursor else None
+    return take_page(user_chat_stream(db, user_id, before, batch=limit + 1), limit)
+
+
+def first_batch(limit: int, streams: int) -> int:
+    """Initial batch for each of `streams` merged into a page: its share of the page, at least MIN_BATCH"""
+    return max(MIN_BATCH, -(-(limit + 1) // max(1, streams)))
+
+
+def recent_chats_page(db, user_ids: Iterable[str], limit: int, cursor: Optional[str] = None,
+                      prime_all: Optional[Callable[[list], list]] = None) -> tuple[list, Optional[str]]:
+    """
+    Newest chats across the given users. `prime_all(streams)` returns the
+    streams with their first batch fetched; pass one that fetches them
+    concurrently (otherwise the merge fetches them one after another).
+    """
+    before = decode_cursor(cursor) if cursor else None
+    user_ids = list(user_ids)
+    batch = first_batch(limit, len(user_ids))
+    streams = [user_chat_stream(db, uid, before, batch=batch) for uid in user_ids]
+    if prime_all is not None:
+        streams = prime_all(streams)
+    return take_page(merge_streams(streams), limit)
@@ -0,0 +1,32 @@
+"""
+Recompute the dashboard aggregates under stats/ and the category index under
+chat_index/ from the users and chats trees.
+
+Both are maintained incrementally on write (see dashboard_stats.py and
+category_index.py); run this on a schedule (e.g. a nightly cron job) to
+correct any drift. Uses the same Firebase configuration as main.py.
+
+Usage (from the repo root):
+    python admin-backend/rebuild_stats.py
+"""
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).parent))
+
+import main
+import category_index
+import dashboard_stats
+
+
+def run():
+    if not main.ensure_firebase():
+        sys.exit("Firebase not initialized; check FIREBASE_* settings")
+    summary = dashboard_stats.rebuild(main.db)
+    top = sorted(summary["categories"].items(), key=lambda kv: kv[1], reverse=True)[:5]
+    print(f"Top categories: {', '.join(f'{c} ({n})' for c, n in top) or 'none'}")
+    category_index.rebuild(main.db)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,169 @@
+import random
+import statistics
+
+import numpy as np
+import pytest
+
+import analytics
+from analytics import BUCKETS, DAY, WEEK_ORIGIN
+from dashboard_stats import category_key
+from fake_firebase import FakeDatabase
+from firebase_mirror import FirebaseMirror
+
+TOKEN = "0" * 64
+NOW = 1_760_000_000_000
+CATEGORIES = ["Criminal Law", "Family Law", None, "Property.Law"]
+
+
+def data(seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    chats = {}
+    for u in range(60):
+        uid = f"u{u:03d}"
+        for c in range(rng.randrange(0, 25)):
+            chat = {"userId": uid, "message": "q", "response": "r" * rng.randrange(0, 3000),
+                    "timestamp": NOW - rng.randrange(120 * DAY)}
+            category = rng.choice(CATEGORIES)
+            if category:
+                chat["category"] = category
+            chats.setdefault(uid, {})[f"c{c:03d}"] = chat
+    return {"chats": chats}
+
+
+def rows(tree: dict) -> list:
+    return [(uid, chat["timestamp"], category_key(chat.get("category")), len(chat["response"]))
+            for uid, user_chats in tree["chats"].items() for chat in user_chats.values()]
+
+
+def bucket_of(timestamp: int, bucket: str, tz: int) -> int:
+    origin = WEEK_ORIGIN if bucket == "week" else 0
+    return (timestamp + tz - origin) // BUCKETS[bucket]
+
+
+def start_of(index: int, bucket: str, tz: int) -> int:
+    return index * BUCKETS[bucket] + (WEEK_ORIGIN if bucket == "week" else 0) - tz
+
+
+def reference_report(chats: list, bucket: str, days: int, cohort: str, periods: int, tz_minutes: int) -> dict:
+    """The same report with plain Python loops"""
+    tz = tz_minutes * 60 * 1000
+    since = start_of(bucket_of(NOW - days * DAY, bucket, tz), bucket, tz)
+    window = [row for row in chats if since <= row[1] <= NOW]
+
+    volume = {}
+    for uid, t, _, _ in window:
+        entry = volume.setdefault(start_of(bucket_of(t, bucket, tz), bucket, tz), [0, set()])
+        entry[0] += 1
+        entry[1].add(uid)
+
+    first = {}
+    for uid, t, _, _ in chats:
+        first[uid] = min(first.get(uid, float("inf")), bucket_of(t, cohort, tz))
+    current, first_cohort = bucket_of(NOW, cohort, tz), bucket_of(since, cohort, tz)
+    cohorts = {}
+    for uid, t, _, _ in window:
+        offset = bucket_of(t, cohort, tz) - first[uid]
+        if offset < periods and first[uid] >= first_cohort:
+            cohorts.setdefault(first[uid], [set() for _ in range(periods)])[offset].add(uid)
+
+    lengths = {}
+    for _, _, category, length in window:
+        lengths.setdefault(category, []).append(length)
+
+    return {
+        "since": since,
+        "volume": {start: (n, len(users)) for start, (n, users) in volume.items()},
+        "cohorts": {
+            start_of(c, cohort, tz): [len(users) if k <= current - c else None for k, users in enumerate(active)]
+            for c, active in cohorts.items()
+        },
+        "lengths": lengths,
+    }
+
+
+PARAMETERS = [
+    dict(bucket="day", days=30, cohort="week", periods=8, tz_offset_minutes=0),
+    dict(bucket="hour", days=3, cohort="day", periods=5, tz_offset_minutes=330),
+    dict(bucket="week", days=100, cohort="week", periods=20, tz_offset_minutes=-300),
+]
+
+
+@pytest.fixture(params=["database", "mirror"])
+def columns(request):
+    database = FakeDatabase(data())
+    if request.param == "database":
+        return analytics.load(database)
+    mirror = FirebaseMirror(database)
+    mirror.start()
+    assert mirror.wait(5)
+    try:
+        return analytics.load(mirror)
+    finally:
+        mirror.stop()
+
+
+def test_columns_are_time_sorted_and_complete(columns):
+    assert len(columns) == len(rows(data()))
+    assert np.all(np.diff(columns.timestamp) >= 0)
+    assert sorted(columns.categories) == sorted({category_key(c) for c in CATEGORIES})
+
+
+@pytest.mark.parametrize("params", PARAMETERS, ids=lambda p: p["bucket"])
+def test_report_matches_plain_python(columns, params):
+    report = analytics.report(columns, now_ms=NOW, **params)
+    expected = reference_report(rows(data()), params["bucket"], params["days"], params["cohort"],
+                                params["periods"], params["tz_offset_minutes"])
+
+    assert report["since"] == expected["since"]
+    volume = {v["start"]: (v["queries"], v["active_users"]) for v in report["volume"] if v["queries"]}
+    assert volume == expected["volume"]
+    assert len({v["start"] for v in report["volume"]}) == len(report["volume"])
+
+    trends = report["category_trends"]
+    assert trends["starts"] == [v["start"] for v in report["volume"]]
+    assert [sum(day) for day in zip(*trends["categories"].values())] == [v["queries"] for v in report["volume"]]
+
+    cohorts = {c["start"]: c["active"] for c in report["retention"]["cohorts"]}
+    assert cohorts == expected["cohorts"]
+
+    by_category = report["response_length"]["by_category"]
+    assert set(by_category) == set(expected["lengths"])
+    for category, lengths in expected["lengths"].items():
+        stats = by_category[category]
+        assert stats["count"] == len(lengths)
+        assert stats["mean"] == pytest.approx(statistics.mean(lengths), abs=0.051)
+        for q in analytics.PERCENTILES:
+            assert stats[f"p{q}"] == pytest.approx(float(np.percentile(lengths, q)), abs=0.051)
+
+
+def test_empty_columns():
+    report = analytics.report(analytics.load(FakeDatabase()), now_ms=NOW)
+    assert report["total_chats"] == 0
+    assert all(v["queries"] == 0 for v in report["volume"])
+    assert report["retention"]["cohorts"] == []
+    assert report["response_length"] == {"overall": {"count": 0}, "by_category": {}}
+
+
+@pytest.mark.parametrize("params", [
+    {"bucket": "month"}, {"days": 0}, {"cohort": "hour"}, {"periods": 0}, {"tz_offset_minutes": 900},
+    {"bucket": "hour", "days": 3000},
+])
+def test_report_rejects_bad_parameters(params):
+    with pytest.raises(ValueError):
+        analytics.report(analytics.load(FakeDatabase(data())), now_ms=NOW, **params)
+
+
+def test_endpoint_caches_columns(admin_client, admin_main, monkeypatch):
+    monkeypatch.setattr(admin_main, "_analytics_columns", None)
+    database = FakeDatabase(data())
+    client = admin_client(database)
+    response = client.get("/api/v1/admin/analytics", params={"token": TOKEN, "bucket": "hour", "days": 2})
+    assert response.status_code == 200
+    assert response.json()["total_chats"] == len(rows(data()))
+
+    reads = database.reads
+    assert client.get("/api/v1/admin/analytics", params={"token": TOKEN}).status_code == 200
+    assert database.reads == reads
+
+    bad = client.get("/api/v1/admin/analytics", params={"token": TOKEN, "bucket": "month"})
+    assert bad.status_code == 400
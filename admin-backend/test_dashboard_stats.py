@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import category_index
+import dashboard_stats
+from fake_firebase import FakeDatabase
+
+TOKEN = "0" * 64
+NOW = int(time.time() * 1000)
+
+
+def dataset(users: int = 5, chats: int = 30) -> dict:
+    data = {"users": {}, "chats": {}}
+    for i in range(users):
+        data["users"][f"u{i}"] = {"email": f"u{i}@example.com", "createdAt": NOW, "lastLogin": NOW}
+    for i in range(chats):
+        uid = f"u{i % users}"
+        data["chats"].setdefault(uid, {})[f"c{i:03d}"] = {
+            "message": f"q{i}",
+            "category": "Criminal Law" if i % 3 else "Family Law",
+            "timestamp": NOW - i * 1000,
+        }
+    return data
+
+
+def client_increment(database: FakeDatabase):
+    """What saveChatMessage in client/services/firebase.ts writes to stats/ before any rebuild"""
+    dashboard_stats.apply(database, dashboard_stats.chat_updates({"category": "Criminal Law", "timestamp": NOW}))
+
+
+def test_partial_summary_is_not_built():
+    assert not dashboard_stats.is_built(None)
+    assert not dashboard_stats.is_built({})
+    assert not dashboard_stats.is_built({"total_queries": 1})
+    assert dashboard_stats.is_built({"total_queries": 0, "rebuilt_at": NOW})
+
+
+def test_dashboard_rebuilds_over_partial_summary(admin_client):
+    database = FakeDatabase(dataset())
+    client_increment(database)
+    assert dashboard_stats.read_dashboard(database) is None
+    assert dashboard_stats.total_queries(database) is None
+
+    stats = admin_client(database).get("/api/v1/admin/dashboard", params={"token": TOKEN}).json()
+    assert stats["total_users"] == 5
+    assert stats["total_queries"] == 30
+    assert stats["top_categories"][0] == {"category": "Criminal Law", "count": 20}
+    assert dashboard_stats.is_built(database.reference("stats/summary").get())
+
+
+def test_increments_after_rebuild_are_kept():
+    database = FakeDatabase(dataset())
+    dashboard_stats.rebuild(database, now_ms=NOW)
+    client_increment(database)
+    assert dashboard_stats.total_queries(database) == 31
+    assert dashboard_stats.read_dashboard(database, now_ms=NOW)["queries_today"] == 31
+
+
+def test_category_count_falls_back_to_index_over_partial_summary():
+    database = FakeDatabase(dataset())
+    category_index.rebuild(database)
+    client_increment(database)
+    # The partial summary says 1; the index holds the real 20
+    assert category_index.category_count(database, "Criminal Law") == 20
+
+    dashboard_stats.rebuild(database)
+    assert category_index.category_count(database, "Family Law") == 10
+
+
+def test_remove_user_subtracts_chats():
+    data = dataset()
+    database = FakeDatabase(data)
+    dashboard_stats.rebuild(database, now_ms=NOW)
+    dashboard_stats.remove_user(database, "u0", data["chats"]["u0"], now_ms=NOW)
+    summary = database.reference("stats/summary").get()
+    assert summary["total_users"] == 4
+    assert summary["total_queries"] == 30 - len(data["chats"]["u0"])
+    assert database.reference("stats/daily").get()[dashboard_stats.day_key(NOW)]["active_users"] == 4
+
+
+def test_concurrent_first_loads_rebuild_once(admin_main, monkeypatch):
+    database = FakeDatabase(dataset(), latency=0.01)
+    monkeypatch.setattr(admin_main, "db", database)
+    calls = {"stats": 0, "index": 0}
+    rebuild_stats, rebuild_index = dashboard_stats.rebuild, category_index.rebuild
+
+    def counted(name, rebuild):
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return rebuild(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(dashboard_stats, "rebuild", counted("stats", rebuild_stats))
+    monkeypatch.setattr(category_index, "rebuild", counted("index", rebuild_index))
+
+    async def first_loads():
+        await asyncio.gather(*(admin_main._rebuild_stats(only_if_missing=True) for _ in range(5)),
+                             *(admin_main._rebuild_index(only_if_missing=True) for _ in range(5)))
+        # An explicit rebuild always runs
+        await admin_main._rebuild_stats()
+
+    asyncio.run(first_loads())
+    assert calls == {"stats": 2, "index": 1}
+    assert dashboard_stats.total_queries(database) == 30
@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+
+import pytest
+
+import exports
+from fake_firebase import FakeDatabase
+
+TOKEN = "0" * 64
+BASE = 1_700_000_000_000
+
+
+def data() -> dict:
+    users, chats = {}, {}
+    # Integer-like keys sort before the others, numerically, as in Firebase
+    for uid in ["10", "9", "alice", "bob", "carol"]:
+        users[uid] = {"email": f"{uid}@example.com", "createdAt": BASE, "lastLogin": str(BASE + 1)}
+        chats[uid] = {
+            f"-N{i:03d}": {"userEmail": f"{uid}@example.com", "message": f'"{uid}", q{i}\nline two',
+                           "response": "a" * i, "timestamp": BASE + i}
+            for i in range(7)
+        }
+    chats["bob"]["-N003"]["category"] = "Family Law"
+    return {"users": users, "chats": chats}
+
+
+def flatten(pages) -> list:
+    return [record for page in pages for record in page]
+
+
+def test_users_in_key_order_and_resumable():
+    database = FakeDatabase(data())
+    records = flatten(exports.user_pages(database, batch=2))
+    assert [r["id"] for r in records] == ["9", "10", "alice", "bob", "carol"]
+    assert records[0]["last_login"] == BASE + 1
+    for i, record in enumerate(records):
+        assert flatten(exports.user_pages(database, record["id"], batch=2)) == records[i + 1:]
+
+
+@pytest.mark.parametrize("batch", [1, 3, 50])
+def test_chats_resume_after_any_cursor(batch):
+    database = FakeDatabase(data())
+    records = flatten(exports.chat_pages(database, batch=batch))
+    assert len(records) == 35
+    assert [r["user_id"] for r in records[:8]] == ["9"] * 7 + ["10"]
+    assert next(r for r in records if r["id"] == "-N003" and r["user_id"] == "bob")["category"] == "Family Law"
+    for i, record in enumerate(records):
+        cursor = f"{record['user_id']}/{record['id']}"
+        assert flatten(exports.chat_pages(database, cursor, batch=batch)) == records[i + 1:]
+
+
+def test_one_users_chats():
+    database = FakeDatabase(data())
+    records = flatten(exports.chat_pages(database, user_id="bob", batch=4))
+    assert [r["id"] for r in records] == [f"-N{i:03d}" for i in range(7)]
+    assert flatten(exports.chat_pages(database, "bob/-N004", user_id="bob")) == records[5:]
+
+
+@pytest.mark.parametrize("cursor", ["bob", "bob/", "/-N001", "bob/-N001/x"])
+def test_malformed_chat_cursor(cursor):
+    with pytest.raises(exports.InvalidCursor):
+        exports.parse_chat_cursor(cursor)
+
+
+def test_encoders():
+    records = [{"id": "1", "email": "a@example.com, b", "phone": None}]
+    assert json.loads(exports.encoder("ndjson", exports.USER_FIELDS, True)(records)) == records[0]
+
+    encode = exports.encoder("csv", exports.USER_FIELDS, header=True)
+    assert encode([]).startswith("id,email,")
+    assert list(csv.reader(io.StringIO(encode(records)))) == [["1", "a@example.com, b", "", "", "", ""]]
+    assert exports.encoder("csv", exports.USER_FIELDS, header=False)([]) == ""
+    with pytest.raises(ValueError):
+        exports.encoder("xml", exports.USER_FIELDS, True)
+
+
+def test_chat_export_endpoint_resumes(admin_client):
+    client = admin_client(FakeDatabase(data()))
+    full = client.get("/api/v1/admin/export/chats", params={"token": TOKEN})
+    assert full.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in full.text.splitlines()]
+    assert len(records) == 35
+
+    # A dropped connection after 12 records resumes from the 12th
+    cursor = f"{records[11]['user_id']}/{records[11]['id']}"
+    rest = client.get("/api/v1/admin/export/chats", params={"token": TOKEN, "cursor": cursor})
+    assert [json.loads(line) for line in rest.text.splitlines()] == records[12:]
+
+    csv_full = client.get("/api/v1/admin/export/chats", params={"token": TOKEN, "format": "csv"}).text
+    csv_rest = client.get("/api/v1/admin/export/chats", params={"token": TOKEN, "format": "csv", "cursor": cursor}).text
+    rows = list(csv.DictReader(io.StringIO(csv_full)))
+    assert len(rows) == 35 and rows[0]["message"] == records[0]["message"]
+    # No header on a resumed CSV export: it appends to the partial file
+    appended = list(csv.reader(io.StringIO(csv_rest)))
+    assert appended[0][:2] == [records[12]["user_id"], records[12]["id"]]
+    assert len(appended) == 23
+
+
+def test_export_endpoint_rejects_bad_parameters(admin_client):
+    client = admin_client(FakeDatabase(data()))
+    assert client.get("/api/v1/admin/export/chats", params={"token": TOKEN, "cursor": "bob"}).status_code == 400
+    assert client.get("/api/v1/admin/export/users", params={"token": TOKEN, "format": "xml"}).status_code == 400
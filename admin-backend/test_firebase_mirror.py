@@ -0,0 +1,169 @@
+import threading
+import time
+
+import pytest
+
+import dashboard_stats
+import pagination
+from dashboard_stats import category_key
+from fake_firebase import FakeDatabase, FakeEvent
+from firebase_mirror import FirebaseMirror
+
+BASE = 1_700_000_000_000
+
+
+def data() -> dict:
+    return {
+        "users": {
+            "u1": {"email": "u1@example.com", "lastLogin": BASE},
+            "u2": {"email": "u2@example.com", "lastLogin": BASE + 1},
+        },
+        "chats": {
+            "u1": {
+                "c1": {"userId": "u1", "message": "bail?", "category": "Criminal Law", "timestamp": BASE},
+                "c2": {"userId": "u1", "message": "divorce?", "category": "Family Law", "timestamp": BASE + 10},
+            },
+            "u2": {"c3": {"userId": "u2", "message": "rent?", "timestamp": BASE + 5}},
+        },
+    }
+
+
+@pytest.fixture
+def live():
+    database = FakeDatabase(data())
+    mirror = FirebaseMirror(database)
+    mirror.start()
+    assert mirror.wait(5)
+    yield database, mirror
+    mirror.stop()
+
+
+def assert_matches(database: FakeDatabase, mirror: FirebaseMirror):
+    """The mirror answers like the database, and its aggregates match a rebuild"""
+    for path in ("users", "chats", "chats/u1", "chats/u2", "users/u1"):
+        assert mirror.reference(path).get() == database.reference(path).get(), path
+        assert mirror.reference(path).get(shallow=True) == database.reference(path).get(shallow=True), path
+    users = database.reference("users").get() or {}
+    chats = database.reference("chats").get() or {}
+    expected = dashboard_stats.compute(users, chats)["summary"]
+    summary = mirror.reference("stats/summary").get()
+    assert summary["total_users"] == expected["total_users"]
+    assert summary["total_queries"] == expected["total_queries"]
+    assert summary["categories"] == expected["categories"]
+    for uid in chats:
+        rows, _ = pagination.user_chats_page(mirror, uid, 100)
+        direct, _ = pagination.user_chats_page(database, uid, 100)
+        assert rows == direct
+
+
+def event(callback, event_type: str, path: str, value):
+    callback(FakeEvent(event_type, path, value))
+
+
+def listeners() -> tuple:
+    """A mirror fed events by hand, and its users and chats listeners"""
+    mirror = FirebaseMirror(FakeDatabase())
+    mirror.started_at = time.time()
+    return mirror, mirror._listener("users"), mirror._listener("chats")
+
+
+def test_ready_only_after_both_trees_load():
+    mirror, on_users, on_chats = listeners()
+    event(on_users, "put", "/", data()["users"])
+    assert not mirror._ready.is_set()
+    event(on_chats, "put", "/", data()["chats"])
+    assert mirror._ready.is_set()
+    assert mirror.status()["users"] == 2 and mirror.status()["chats"] == 3
+
+
+def test_put_and_patch_events_update_records_and_indexes():
+    mirror, on_users, on_chats = listeners()
+    event(on_users, "put", "/", data()["users"])
+    event(on_chats, "put", "/", data()["chats"])
+
+    # A patch with multi-segment keys moves a chat to another category
+    event(on_chats, "patch", "/u1", {
+        "c1/category": "Property Law",
+        "c4": {"userId": "u1", "message": "lease?", "timestamp": BASE + 20},
+    })
+    assert mirror.category_counts == {"Family Law": 1, "General": 2, "Property Law": 1}
+    assert [cid for _, cid in mirror.by_user["u1"]] == ["c1", "c2", "c4"]
+    assert mirror.chats["u1"]["c1"].message == "bail?"
+
+    # Putting null removes a chat; a user's last chat takes their entry with it
+    event(on_chats, "put", "/u2/c3", None)
+    assert "u2" not in mirror.chats and "u2" not in mirror.by_user
+    assert mirror.total_chats == 3
+    assert [row[1:] for row in mirror.by_time] == [("u1", "c1"), ("u1", "c2"), ("u1", "c4")]
+
+    # Nested user fields are patched into the existing record
+    event(on_users, "patch", "/u2", {"lastLogin": BASE + 99})
+    assert mirror.users["u2"] == {"email": "u2@example.com", "lastLogin": BASE + 99}
+    assert mirror.logins == [BASE, BASE + 99]
+    event(on_users, "put", "/u1", None)
+    assert list(mirror.users) == ["u2"] and mirror.logins == [BASE + 99]
+
+
+def test_bad_events_are_counted_not_raised():
+    mirror, _, on_chats = listeners()
+    event(on_chats, "put", "/", data()["chats"])
+    on_chats(object())
+    assert mirror.errors == 1
+    assert mirror.total_chats == 3
+
+
+def test_chat_rows_do_not_block_the_listeners():
+    mirror, on_users, on_chats = listeners()
+    event(on_users, "put", "/", data()["users"])
+    event(on_chats, "put", "/", data()["chats"])
+    rows = iter(mirror.chat_rows())
+    next(rows)
+    # The listeners run on their own threads; a half-read snapshot must not hold them up
+    writer = threading.Thread(target=event, args=(on_chats, "put", "/u2/c3", None))
+    writer.start()
+    writer.join(1)
+    assert not writer.is_alive() and mirror.total_chats == 2
+    assert len([next(rows)] + list(rows)) == 2
+
+
+def test_live_mirror_follows_writes(live):
+    database, mirror = live
+    assert_matches(database, mirror)
+
+    # What saveChatMessage writes: the chat, its counters and its index entry
+    database.reference().update({
+        "chats/u2/c5": {"userId": "u2", "message": "theft?", "category": "Criminal Law", "timestamp": BASE + 30},
+        "stats/counted/u2": "c5",
+        "stats/summary/total_queries": dashboard_stats.increment(1),
+        f"chat_index/categories/{category_key('Criminal Law')}/c5": {"t": BASE + 30, "u": "u2"},
+    })
+    assert_matches(database, mirror)
+
+    database.reference("chats/u1/c2").update({"category": "Criminal Law"})
+    database.reference("users/u3").set({"email": "u3@example.com", "lastLogin": BASE + 2})
+    assert_matches(database, mirror)
+
+    # delete_user's multi-path removal
+    database.reference().update({"users/u1": None, "chats/u1": None})
+    assert_matches(database, mirror)
+    assert mirror.reference("chat_index/categories/Criminal Law").get(shallow=True) == {"c5": True}
+
+
+def test_unmirrored_paths_read_the_database(live):
+    database, mirror = live
+    database.reference("stats/active/2024-01-01/u1").set(True)
+    reads = database.reads
+    assert mirror.reference("stats/active/2024-01-01").get() == {"u1": True}
+    assert database.reads == reads + 1
+
+    reads = database.reads
+    mirror.reference("chats/u1").get()
+    mirror.reference("stats/summary").get()
+    assert database.reads == reads
+
+
+def test_stopped_mirror_is_not_ready(live):
+    _, mirror = live
+    assert mirror.ready and mirror.status()["state"] == "live"
+    mirror.stop()
+    assert not mirror.ready and mirror.status()["state"] == "stopped"
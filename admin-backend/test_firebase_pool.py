@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import firebase_pool
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """pool(workers, window) swaps in a fresh executor and gather window"""
+    executors = []
+
+    def make(workers: int, window: int = 8):
+        executor = ThreadPoolExecutor(max_workers=workers)
+        executors.append(executor)
+        monkeypatch.setattr(firebase_pool, "_executor", executor)
+        monkeypatch.setattr(firebase_pool, "FIREBASE_GATHER_WINDOW", window)
+
+    yield make
+    for executor in executors:
+        executor.shutdown(wait=True)
+
+
+def sleeper(seconds: float, ran: list = None, name: str = ""):
+    def call():
+        if ran is not None:
+            ran.append(name)
+        time.sleep(seconds)
+        return name
+    return call
+
+
+def test_time_queued_does_not_count_against_the_timeout(pool):
+    pool(workers=1)
+    calls = [sleeper(0.1, name=str(i)) for i in range(4)]
+    start = time.perf_counter()
+    assert asyncio.run(firebase_pool.gather(*calls, timeout=0.3)) == ["0", "1", "2", "3"]
+    assert time.perf_counter() - start >= 0.4
+
+
+def test_a_call_that_runs_too_long_times_out(pool):
+    pool(workers=2)
+    with pytest.raises(firebase_pool.FirebaseTimeout) as raised:
+        asyncio.run(firebase_pool.run(sleeper(0.3), timeout=0.05))
+    assert raised.value.status_code == 504
+
+
+def test_gather_drops_queued_calls_after_an_error(pool):
+    pool(workers=1)
+    ran = []
+
+    def fail():
+        ran.append("fail")
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(firebase_pool.gather(fail, *(sleeper(0.1, ran, f"c{i}") for i in range(4))))
+    time.sleep(0.3)
+    # At most the call the worker took straight after the failure still ran
+    assert ran[0] == "fail" and len(ran) <= 2
+
+
+def test_gather_runs_at_most_its_window_at_once(pool):
+    pool(workers=8, window=3)
+    lock, running, peak = threading.Lock(), [0], [0]
+
+    def call():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    asyncio.run(firebase_pool.gather(*(call for _ in range(12))))
+    assert peak[0] == 3
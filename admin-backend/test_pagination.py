@@ -0,0 +1,157 @@
+import pytest
+
+import category_index
+import pagination
+from dashboard_stats import as_millis
+from fake_firebase import FakeDatabase
+from firebase_mirror import FirebaseMirror
+
+TOKEN = "0" * 64
+BASE = 1_700_000_000_000
+
+
+def mixed_chats() -> dict:
+    """Numeric timestamps with ties, plus legacy string and missing ones, across three users"""
+    chats = {}
+    for u in range(3):
+        uid = f"u{u}"
+        chats[uid] = {}
+        for i in range(12):
+            chats[uid][f"c{u}{i:02d}"] = {"message": f"{uid} {i}", "timestamp": BASE + (i // 2) * 1000}
+        # Old clients stored timestamps as strings; they interleave with the numbers
+        for i in range(5):
+            chats[uid][f"s{u}{i:02d}"] = {"message": f"{uid} legacy {i}", "timestamp": str(BASE + i * 1500 + 500)}
+        chats[uid][f"s{u}99"] = {"message": f"{uid} legacy ordered last", "timestamp": str(BASE + 99_000)}
+        chats[uid][f"n{u}00"] = {"message": f"{uid} no timestamp"}
+    return chats
+
+
+def expected(chats: dict, user_ids) -> list:
+    rows = [(as_millis(chat.get("timestamp")), uid, cid) for uid in user_ids for cid, chat in chats[uid].items()]
+    return sorted(rows, reverse=True)
+
+
+def all_pages(page, limit: int) -> list:
+    rows, cursor, pages = [], None, 0
+    while True:
+        page_rows, cursor = page(limit, cursor)
+        rows += [row[:3] for row in page_rows]
+        pages += 1
+        assert pages < 100
+        if cursor is None:
+            return rows
+
+
+@pytest.fixture(params=["database", "mirror"])
+def source(request):
+    database = FakeDatabase({"chats": mixed_chats()})
+    if request.param == "database":
+        yield database
+        return
+    mirror = FirebaseMirror(database)
+    mirror.start()
+    assert mirror.wait(5)
+    yield mirror
+    mirror.stop()
+
+
+def test_cursor_round_trip():
+    row = (BASE, "u1", "-Nx8f", {})
+    assert pagination.decode_cursor(pagination.encode_cursor(row)) == (BASE, "u1", "-Nx8f")
+    for bad in ("", "not-a-cursor", pagination.encode_cursor((BASE, "u1", "c"))[:-3]):
+        with pytest.raises(pagination.InvalidCursor):
+            pagination.decode_cursor(bad)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 5, 50])
+def test_user_pages_cover_mixed_timestamps_once_in_order(source, limit):
+    chats = mixed_chats()
+    rows = all_pages(lambda n, cursor: pagination.user_chats_page(source, "u1", n, cursor), limit)
+    assert rows == expected(chats, ["u1"])
+
+
+@pytest.mark.parametrize("limit", [1, 4, 7, 100])
+def test_merged_pages_cover_mixed_timestamps_once_in_order(source, limit):
+    chats = mixed_chats()
+    rows = all_pages(lambda n, cursor: pagination.recent_chats_page(source, ["u0", "u1", "u2"], n, cursor), limit)
+    assert rows == expected(chats, ["u0", "u1", "u2"])
+
+
+def test_legacy_row_as_cursor_resumes_after_it():
+    database = FakeDatabase({"chats": mixed_chats()})
+    first, cursor = pagination.user_chats_page(database, "u1", 1)
+    assert first[0][2] == "s199"  # the newest chat has a string timestamp
+    rest, _ = pagination.user_chats_page(database, "u1", 100, cursor)
+    assert [row[:3] for row in first + rest] == expected(mixed_chats(), ["u1"])
+
+
+def test_category_pages_follow_the_index():
+    chats = mixed_chats()
+    database = FakeDatabase({"chats": chats})
+    category_index.rebuild(database)
+    rows = all_pages(lambda n, cursor: category_index.category_page(database, "General", n, cursor), 4)
+    # Index entries are keyed by chat id alone, so ties break on it
+    assert [(t, cid) for t, _, cid in rows] == sorted(((t, cid) for t, _, cid in expected(chats, ["u0", "u1", "u2"])),
+                                                      reverse=True)
+
+
+def test_user_chats_endpoint_pages_and_rejects_bad_cursor(admin_client):
+    client = admin_client(FakeDatabase({"chats": mixed_chats()}))
+    ids, cursor = [], None
+    while True:
+        params = {"token": TOKEN, "limit": 4, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/v1/admin/users/u2/chats", params=params).json()
+        assert body["total"] == 19
+        ids += [chat["id"] for chat in body["chats"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert ids == [cid for _, _, cid in expected(mixed_chats(), ["u2"])]
+
+    response = client.get("/api/v1/admin/users/u2/chats", params={"token": TOKEN, "cursor": "garbage"})
+    assert response.status_code == 400
+
+
+def many_users(users: int, chats: int = 30) -> dict:
+    return {
+        f"u{u:03d}": {f"c{i:03d}": {"message": "q", "timestamp": BASE + i * 1000 + u} for i in range(chats)}
+        for u in range(users)
+    }
+
+
+@pytest.mark.parametrize("limit", [10, 50])
+def test_merged_page_reads_scale_with_page_not_users_times_page(limit):
+    for users in (4, 16, 64):
+        chats = many_users(users)
+        database = FakeDatabase({"chats": chats})
+        ids = [f"u{u:03d}" for u in range(users)]
+        cursor, pages = None, []
+        for _ in range(3):
+            reads, returned = database.reads, database.returned
+            rows, cursor = pagination.recent_chats_page(database, ids, limit, cursor)
+            pages.append(rows)
+            # Two queries per user to start its stream, then a few doublings
+            assert database.reads - reads <= 2 * users + 4 * limit.bit_length()
+            # A couple of rows per user, plus about twice the page
+            batch = pagination.first_batch(limit, users)
+            assert database.returned - returned <= users * batch + 2 * (limit + 1) + users
+        rows = [row[:3] for page in pages for row in page]
+        assert rows == expected(chats, ids)[:3 * limit]
+
+
+def test_queries_endpoint_merges_users_concurrently(admin_client):
+    database = FakeDatabase({"chats": mixed_chats()})
+    client = admin_client(database)
+    ids, cursor = [], None
+    while True:
+        params = {"token": TOKEN, "limit": 7, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/v1/admin/queries", params=params).json()
+        # The stats were never built: the first page builds them rather than
+        # counting every user's chats
+        assert body["total"] == 57
+        ids += [(query["user_id"], query["id"]) for query in body["queries"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert ids == [(uid, cid) for _, uid, cid in expected(mixed_chats(), ["u0", "u1", "u2"])]
+    assert client.get("/api/v1/admin/queries", params={"token": TOKEN, "cursor": "garbage"}).status_code == 400
@@ -0,0 +1,127 @@
+"""
+Admin read latency with and without the live mirror (admin-backend/firebase_mirror.py).
+
+Fills an in-process fake database (admin-backend/fake_firebase.py) with
+synthetic users and chats, then calls the admin read endpoints through
+FastAPI's TestClient twice: reading the database directly, and from a
+mirror started on the same data. --latency-ms is slept on every database
+read to stand in for the network round trip. Reports p50/p95/p99 per
+endpoint and database reads per request, plus the mirror's load time.
+
+Usage (from the repo root):
+    python benchmarks/admin_reads.py
+    python benchmarks/admin_reads.py --users 2000 --chats 100000 --latency-ms 20 --requests 50
+"""
+import argparse
+import pathlib
+import random
+import statistics
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT / "admin-backend"))
+
+from fastapi.testclient import TestClient
+
+import category_index
+import dashboard_stats
+import main as admin
+from fake_firebase import FakeDatabase
+
+CATEGORIES = ["Criminal Law", "Family Law", "Property Law", "Consumer Law", "Labour Law", "General"]
+TOKEN = "0" * 64
+
+
+def synthetic_data(users: int, chats: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    now = int(time.time() * 1000)
+    day = 24 * 3600 * 1000
+    data = {"users": {}, "chats": {}}
+    for i in range(users):
+        uid = f"user{i:07d}"
+        data["users"][uid] = {
+            "email": f"{uid}@example.com",
+            "createdAt": now - rng.randrange(365 * day),
+            "lastLogin": now - rng.randrange(30 * day),
+        }
+    for i in range(chats):
+        uid = f"user{rng.randrange(users):07d}"
+        data["chats"].setdefault(uid, {})[f"chat{i:09d}"] = {
+            "userId": uid,
+            "userEmail": f"{uid}@example.com",
+            "message": f"Question {i}",
+            "response": "Answer " * rng.randrange(5, 50),
+            "category": rng.choice(CATEGORIES),
+            "timestamp": now - rng.randrange(90 * day),
+        }
+    return data
+
+
+def percentiles(samples_ms: list[float]) -> str:
+    q = statistics.quantiles(samples_ms, n=100, method="inclusive")
+    return f"p50 {q[49]:8.2f} ms  p95 {q[94]:8.2f} ms  p99 {q[98]:8.2f} ms"
+
+
+def endpoints(users: list[str]) -> dict:
+    uid = users[0]
+    return {
+        "dashboard": ("/api/v1/admin/dashboard", {}),
+        "users": ("/api/v1/admin/users", {"limit": 50}),
+        "user details": (f"/api/v1/admin/users/{uid}", {}),
+        "user chats": (f"/api/v1/admin/users/{uid}/chats", {"limit": 20}),
+        "queries": ("/api/v1/admin/queries", {"limit": 50}),
+        "category": ("/api/v1/admin/queries/category/Criminal Law", {"limit": 50}),
+    }
+
+
+def run(client: TestClient, database: FakeDatabase, routes: dict, requests: int) -> dict:
+    results = {}
+    for name, (path, params) in routes.items():
+        samples, reads = [], database.reads
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = client.get(path, params={"token": TOKEN, **params})
+            samples.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+        results[name] = (samples, (database.reads - reads) / requests)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000, help="synthetic users")
+    parser.add_argument("--chats", type=int, default=50000, help="synthetic chats, spread over the users")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated round trip per database read")
+    parser.add_argument("--requests", type=int, default=20, help="requests timed per endpoint and mode")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    database = FakeDatabase(synthetic_data(args.users, args.chats))
+    dashboard_stats.rebuild(database)
+    category_index.rebuild(database)
+    print(f"{args.users} users, {args.chats} chats generated in {time.perf_counter() - start:.1f}s")
+
+    admin.db = database
+    admin.firebase_init_attempted = admin.firebase_initialized = True
+    client = TestClient(admin.app)
+    routes = endpoints(sorted(database.reference("users").get(shallow=True)))
+    database.latency = args.latency_ms / 1000
+
+    admin.mirror = None
+    direct = run(client, database, routes, args.requests)
+
+    mirror = admin.start_mirror(database)
+    print(f"mirror loaded in {mirror.status()['load_seconds']:.2f}s")
+    mirrored = run(client, database, routes, args.requests)
+    mirror.stop()
+
+    print(f"\nsimulated read latency {args.latency_ms:g} ms")
+    for name in routes:
+        for mode, results in (("database", direct), ("mirror", mirrored)):
+            samples, reads = results[name]
+            print(f"  {name:<13} {mode:<9} {percentiles(samples)}  {reads:7.1f} reads/request")
+
+
+if __name__ == "__main__":
+    main()
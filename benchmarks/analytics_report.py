@@ -0,0 +1,126 @@
+"""
+Analytics report time over synthetic chat logs (admin-backend/analytics.py).
+
+Builds columns for --chats synthetic chats (users with a heavy-tailed
+activity distribution, 90 days of timestamps, six categories, skewed
+response lengths) and times each aggregation and the full report() over
+--repeats runs. For comparison it also times the same daily volume and
+per-category median as a plain Python loop over chat dicts, which is what
+the endpoint would do without the columns, and the cost of building the
+columns from rows (what load() adds on top of the database or mirror scan).
+
+Usage (from the repo root):
+    python benchmarks/analytics_report.py
+    python benchmarks/analytics_report.py --chats 5000000 --users 200000 --repeats 5
+"""
+import argparse
+import pathlib
+import statistics
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT / "admin-backend"))
+sys.path.append(str(ROOT / "fastapi_server"))
+
+import numpy as np
+
+import analytics
+
+CATEGORIES = ["Criminal Law", "Family Law", "Property Law", "Consumer Law", "Labour Law", "General"]
+
+
+def synthetic_columns(chats: int, users: int, now_ms: int, seed: int = 0) -> analytics.ChatColumns:
+    rng = np.random.default_rng(seed)
+    timestamp = np.sort(now_ms - rng.integers(0, 90 * analytics.DAY, chats, dtype=np.int64))
+    user = np.minimum(rng.zipf(1.3, chats) - 1, users - 1).astype(np.int32)
+    category = rng.choice(len(CATEGORIES), chats, p=[0.3, 0.2, 0.2, 0.1, 0.1, 0.1]).astype(np.int16)
+    response = rng.lognormal(7, 0.6, chats).astype(np.int32)
+    return analytics.ChatColumns(
+        timestamp, category, user, response,
+        [analytics.category_key(c) for c in CATEGORIES], [f"user{i:07d}" for i in range(users)],
+    )
+
+
+def timed(fn, repeats: int) -> list[float]:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summary(samples_ms: list[float]) -> str:
+    ordered = sorted(samples_ms)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return f"p50 {statistics.median(ordered):9.1f} ms  p95 {p95:9.1f} ms"
+
+
+def python_baseline(rows: list[dict], since: int) -> tuple:
+    """Daily volume and median response length per category, one dict per chat"""
+    per_day, lengths = {}, {}
+    for chat in rows:
+        if chat["timestamp"] >= since:
+            day = chat["timestamp"] // analytics.DAY
+            per_day[day] = per_day.get(day, 0) + 1
+            lengths.setdefault(chat["category"], []).append(len(chat["response"]))
+    return per_day, {c: statistics.median(v) for c, v in lengths.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=1_000_000, help="synthetic chats")
+    parser.add_argument("--users", type=int, default=50_000, help="synthetic users")
+    parser.add_argument("--repeats", type=int, default=10, help="timed runs per aggregation")
+    parser.add_argument("--baseline-chats", type=int, default=200_000,
+                        help="chats for the Python loop and column build timings (scaled up to --chats)")
+    args = parser.parse_args()
+
+    now_ms = int(time.time() * 1000)
+    columns = synthetic_columns(args.chats, args.users, now_ms)
+    print(f"{len(columns)} chats, {len(columns.user_ids)} users, {columns.nbytes / 1e6:.1f} MB of columns")
+
+    since = now_ms - 30 * analytics.DAY
+    until = now_ms + 1
+    runs = {
+        "volume (hour)": lambda: analytics.volume(columns, "hour", since, until),
+        "volume (day)": lambda: analytics.volume(columns, "day", since, until),
+        "category trends": lambda: analytics.category_trends(columns, "day", since, until),
+        "retention (week)": lambda: analytics.retention(columns, "week", 8, since, until, now_ms=now_ms),
+        "response lengths": lambda: analytics.response_lengths(columns, since, until),
+        "report()": lambda: analytics.report(columns, now_ms=now_ms),
+    }
+    print(f"\nlast 30 days, {args.repeats} runs each")
+    for name, fn in runs.items():
+        print(f"  {name:<18} {summary(timed(fn, args.repeats))}")
+
+    # Python loop and column build on an evenly spread sample, scaled to the full size
+    sample = np.linspace(0, args.chats - 1, min(args.baseline_chats, args.chats)).astype(np.int64)
+    n = len(sample)
+    scale = args.chats / n
+    rows = [
+        {"user": columns.user_ids[u], "timestamp": t, "category": CATEGORIES[c], "response": "x" * r}
+        for u, t, c, r in zip(columns.user[sample].tolist(), columns.timestamp[sample].tolist(),
+                              columns.category[sample].tolist(), np.minimum(columns.response[sample], 4000).tolist())
+    ]
+    loop = statistics.median(timed(lambda: python_baseline(rows, since), 3)) * scale
+
+    def build():
+        builder = analytics.ColumnBuilder()
+        for chat in rows:
+            builder.add(chat["user"], chat["timestamp"], chat["category"], len(chat["response"]))
+        builder.build()
+
+    build_ms = statistics.median(timed(build, 3)) * scale
+    vectorized = statistics.median(timed(lambda: (
+        analytics.volume(columns, "day", since, until), analytics.response_lengths(columns, since, until)
+    ), args.repeats))
+    print(f"\ndaily volume + per-category median, {args.chats} chats")
+    print(f"  python loop        ~{loop:9.1f} ms (measured on {n}, scaled)")
+    print(f"  numpy columns       {vectorized:9.1f} ms  ({loop / vectorized:.0f}x)")
+    print(f"\ncolumn build from rows ~{build_ms:.0f} ms (once per ANALYTICS_TTL, measured on {n}, scaled)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Import-time / cold-start benchmark for the two FastAPI services.
+
+Each run starts a fresh interpreter (so nothing is cached in sys.modules),
+imports the service's main module under `python -X importtime` and then
+times the first request to a few cheap endpoints. Reports the median wall
+time over --repeat runs and the most expensive imports by cumulative time.
+
+Usage (from the repo root):
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --service fastapi_server --repeat 10 --top 25
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+SERVICES = {
+    "fastapi_server": {
+        "cwd": ROOT / "fastapi_server",
+        "endpoints": ["/api/ping", "/api/browse/laws"],
+    },
+    "admin-backend": {
+        "cwd": ROOT / "admin-backend",
+        "endpoints": ["/api/v1/admin/health"],
+    },
+}
+
+# Runs inside the fresh interpreter: import main, then hit each endpoint once
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+first = {}
+for path in sys.argv[1:]:
+    s = time.perf_counter()
+    status = client.get(path).status_code
+    first[path] = {"ms": (time.perf_counter() - s) * 1000, "status": status}
+print("@@RESULT@@" + json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "first_request": first,
+    "pipeline_loaded": "pipeline" in sys.modules,
+    "firebase_loaded": "firebase_admin" in sys.modules,
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> dict:
+    """module -> (self_us, cumulative_us) from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cumulative_us, name = [p.strip() for p in line.replace("import time:", "", 1).split("|", 2)]
+            modules[name] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue  # header line
+    return modules
+
+
+def run_once(service: dict) -> tuple[dict, dict]:
+    env = dict(os.environ)
+    # Deterministic, offline configuration
+    env.setdefault("HF_TOKEN", "hf_benchmark_dummy_token")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    env.pop("PRELOAD_PIPELINE", None)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE, *service["endpoints"]],
+        cwd=service["cwd"],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    result_line = next((l for l in proc.stdout.splitlines() if l.startswith("@@RESULT@@")), None)
+    if proc.returncode != 0 or result_line is None:
+        raise RuntimeError(f"probe failed (exit {proc.returncode}):\n{proc.stderr[-2000:]}")
+    return json.loads(result_line[len("@@RESULT@@"):]), parse_importtime(proc.stderr)
+
+
+def report(name: str, service: dict, repeat: int, top: int):
+    runs, imports = [], []
+    for _ in range(repeat):
+        result, modules = run_once(service)
+        runs.append(result)
+        imports.append(modules)
+
+    print(f"\n=== {name} ({repeat} cold starts) ===")
+    print(f"import main:            {statistics.median(r['import_ms'] for r in runs):8.1f} ms (median)")
+    for path in service["endpoints"]:
+        ms = statistics.median(r["first_request"][path]["ms"] for r in runs)
+        status = runs[-1]["first_request"][path]["status"]
+        print(f"first GET {path:<22} {ms:8.1f} ms (median, HTTP {status})")
+    print(f"LLM pipeline built:     {runs[-1]['pipeline_loaded']}")
+    print(f"firebase_admin imported: {runs[-1]['firebase_loaded']}")
+
+    # Median cumulative cost per module across runs
+    names = set().union(*imports)
+    cost = {
+        n: (
+            statistics.median(m[n][0] for m in imports if n in m),
+            statistics.median(m[n][1] for m in imports if n in m),
+        )
+        for n in names
+    }
+    print(f"\nTop {top} imports by cumulative time (us):")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for n, (self_us, cum_us) in sorted(cost.items(), key=lambda kv: kv[1][1], reverse=True)[:top]:
+        print(f"{cum_us:>12.0f} {self_us:>10.0f}  {n}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service", choices=sorted(SERVICES), action="append", help="service to measure (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="cold starts per service")
+    parser.add_argument("--top", type=int, default=15, help="number of imports to list")
+    args = parser.parse_args()
+
+    for name in args.service or sorted(SERVICES):
+        report(name, SERVICES[name], args.repeat, args.top)
+
+
+if __name__ == "__main__":
+    main()
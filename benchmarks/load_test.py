@@ -0,0 +1,265 @@
+"""
+Offline load test for /api/legal-advice on both services.
+
+Starts the stub LLM server (stub_llm.py), then each selected service under
+uvicorn with its model endpoints pointed at the stub:
+
+  fastapi_server   HF_ENDPOINT_URL=<stub>   (primary and fallback models)
+  admin-backend    GROQ_API_URL=<stub>/openai/v1/chat/completions
+
+and drives POST /api/legal-advice with --concurrency closed-loop clients
+for --requests requests (or --duration seconds). Every request carries a
+distinct question so the answer caches and single-flight do not hide the
+model path; pass --repeat-questions to measure a cache-friendly mix
+instead. Reports throughput, p50/p95/p99 latency and status counts;
+--json appends one line per service to a file so runs can be compared
+across commits.
+
+Arguments not listed below are passed through to the stub, e.g.
+--latency-ms, --jitter-ms, --token-rate, --tokens, --error-rate.
+
+Usage (from the repo root):
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --service fastapi_server --concurrency 32 --requests 500 \\
+        --latency lognormal --latency-ms 800 --token-rate 40 --error-rate 0.02
+    python benchmarks/load_test.py --duration 60 --json results.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+SERVICES = {
+    "fastapi_server": {
+        "cwd": ROOT / "fastapi_server",
+        "ready": "/api/ping",
+    },
+    "admin-backend": {
+        "cwd": ROOT / "admin-backend",
+        "ready": "/api/v1/admin/health",
+    },
+}
+
+QUESTIONS = [
+    "What is the punishment for theft?",
+    "How do I file an FIR if the police refuse?",
+    "Can I get anticipatory bail for a non-bailable offence?",
+    "Is a WhatsApp chat admissible as evidence?",
+    "What counts as dowry harassment?",
+    "What is the punishment for cheating?",
+    "Someone is threatening me online, what can I do?",
+    "What is the difference between murder and culpable homicide?",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def service_env(name: str, stub_url: str) -> dict:
+    env = dict(os.environ)
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    if name == "fastapi_server":
+        env["HF_TOKEN"] = "hf_benchmark_dummy_token"
+        env["HF_ENDPOINT_URL"] = stub_url
+        env.pop("HF_FALLBACK_ENDPOINT_URL", None)
+        env["PRELOAD_PIPELINE"] = "1"
+        # Keep benchmark runs from reading or writing persisted cache state
+        env.pop("ANSWER_CACHE_PATH", None)
+        env.pop("SEMANTIC_CACHE_DIR", None)
+        env["CHECKPOINT_BACKEND"] = "memory"
+    else:
+        env["GROQ_API_KEY"] = "gsk_benchmark_dummy_key"
+        env["GROQ_API_URL"] = stub_url + "/openai/v1/chat/completions"
+    return env
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with status {proc.returncode} before becoming ready")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+def start_process(args: list, cwd, env, ready_url: str, verbose: bool) -> subprocess.Popen:
+    output = None if verbose else subprocess.DEVNULL
+    proc = subprocess.Popen(args, cwd=cwd, env=env, stdout=output, stderr=output)
+    try:
+        wait_ready(ready_url, proc)
+    except Exception:
+        proc.terminate()
+        raise
+    return proc
+
+
+def stop_process(proc: subprocess.Popen):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def question(i: int, repeat: bool) -> str:
+    text = QUESTIONS[i % len(QUESTIONS)]
+    return text if repeat else f"{text} (case {i})"
+
+
+async def drive(base_url: str, args) -> dict:
+    """Closed-loop clients; returns latencies (ms) and status counts"""
+    latencies, statuses = [], Counter()
+    issued = 0
+    deadline = None
+
+    def next_index():
+        nonlocal issued
+        if deadline is not None:
+            if time.monotonic() >= deadline:
+                return None
+        elif issued >= args.requests:
+            return None
+        issued += 1
+        return issued - 1
+
+    async def worker(client: httpx.AsyncClient):
+        while (i := next_index()) is not None:
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/legal-advice", json={"message": question(i, args.repeat_questions)})
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] += 1
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        for i in range(args.warmup):
+            await client.post("/api/legal-advice", json={"message": f"warmup {i}"})
+        start = time.perf_counter()
+        if args.duration:
+            deadline = time.monotonic() + args.duration
+        await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+    return {"latencies": latencies, "statuses": statuses, "elapsed": elapsed}
+
+
+def summarize(name: str, run: dict, args) -> dict:
+    latencies = sorted(run["latencies"])
+    ok = run["statuses"].get("200", 0)
+    result = {
+        "service": name,
+        "concurrency": args.concurrency,
+        "requests": len(latencies),
+        "ok": ok,
+        "statuses": dict(run["statuses"]),
+        "elapsed_s": round(run["elapsed"], 3),
+        "throughput_rps": round(len(latencies) / run["elapsed"], 2) if run["elapsed"] else 0.0,
+        "ok_rps": round(ok / run["elapsed"], 2) if run["elapsed"] else 0.0,
+    }
+    if len(latencies) >= 2:
+        q = statistics.quantiles(latencies, n=100, method="inclusive")
+        result.update({
+            "mean_ms": round(statistics.fmean(latencies), 1),
+            "p50_ms": round(q[49], 1),
+            "p95_ms": round(q[94], 1),
+            "p99_ms": round(q[98], 1),
+            "max_ms": round(latencies[-1], 1),
+        })
+    return result
+
+
+def print_result(result: dict):
+    print(f"\n=== {result['service']} ({result['requests']} requests, concurrency {result['concurrency']}) ===")
+    print(f"throughput:   {result['throughput_rps']:8.2f} req/s ({result['ok_rps']:.2f} ok/s) over {result['elapsed_s']:.1f}s")
+    if "p50_ms" in result:
+        print(f"latency:      p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+              f"p99 {result['p99_ms']:8.1f} ms  max {result['max_ms']:8.1f} ms")
+    print(f"statuses:     {', '.join(f'{k}: {v}' for k, v in sorted(result['statuses'].items()))}")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service", choices=sorted(SERVICES), action="append", help="service to load (default: all)")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent closed-loop clients")
+    parser.add_argument("--requests", type=int, default=200, help="requests per service")
+    parser.add_argument("--duration", type=float, default=0, help="run for this many seconds instead of --requests")
+    parser.add_argument("--warmup", type=int, default=4, help="untimed requests before the run")
+    parser.add_argument("--timeout", type=float, default=120, help="client timeout per request (seconds)")
+    parser.add_argument("--repeat-questions", action="store_true",
+                        help="reuse a small question set so caches and single-flight can hit")
+    parser.add_argument("--stub-url", help="use an already running stub instead of starting one")
+    parser.add_argument("--json", help="append one JSON result line per service to this file")
+    parser.add_argument("--verbose", action="store_true", help="show stub and service output")
+    args, stub_args = parser.parse_known_args()
+
+    stub = None
+    stub_url = args.stub_url
+    if not stub_url:
+        port = free_port()
+        stub_url = f"http://127.0.0.1:{port}"
+        stub = start_process(
+            [sys.executable, str(ROOT / "benchmarks" / "stub_llm.py"), "--port", str(port), *stub_args],
+            ROOT, dict(os.environ), stub_url + "/stats", args.verbose,
+        )
+    elif stub_args:
+        parser.error(f"stub options {' '.join(stub_args)} cannot be applied to --stub-url")
+
+    try:
+        for name in args.service or sorted(SERVICES):
+            service = SERVICES[name]
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            proc = start_process(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                service["cwd"], service_env(name, stub_url), base_url + service["ready"], args.verbose,
+            )
+            try:
+                result = summarize(name, asyncio.run(drive(base_url, args)), args)
+            finally:
+                stop_process(proc)
+            result.update({
+                "commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "stub": " ".join(stub_args),
+            })
+            print_result(result)
+            if args.json:
+                with open(args.json, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(result) + "\n")
+        print(f"\nstub: {httpx.get(stub_url + '/stats').json()}")
+    finally:
+        if stub is not None:
+            stop_process(stub)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Retrieval latency benchmark for the statute vector index (fastapi_server/retrieval.py).
+
+For each size, writes a synthetic index (sparse signed vectors shaped like
+the hashing embedder's output) to a temporary directory, opens it memory-
+mapped exactly as the pipeline does and times top-k queries: single
+queries (embedding included) and batches of --batch queries. Reports p50,
+p95 and p99 per query.
+
+Usage (from the repo root):
+    python benchmarks/retrieval_latency.py
+    python benchmarks/retrieval_latency.py --sizes 10000,100000 --queries 200 --batch 32 --k 3
+"""
+import argparse
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT / "fastapi_server"))
+
+from retrieval import StatuteRetriever, write_index
+
+QUERIES = [
+    "what is the punishment for murder",
+    "how do I get anticipatory bail",
+    "husband harassing wife for dowry",
+    "is a whatsapp chat admissible as electronic evidence",
+    "police refused to register my FIR",
+    "someone is threatening me with injury",
+    "cheating and dishonestly inducing delivery of property",
+    "theft from a dwelling house at night",
+]
+
+
+def synthetic_index(path: str, size: int, dim: int, nonzeros: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    matrix = np.zeros((size, dim), dtype=np.float32)
+    rows = np.repeat(np.arange(size), nonzeros)
+    cols = rng.integers(0, dim, size * nonzeros)
+    np.add.at(matrix, (rows, cols), rng.choice([-1.0, 1.0], size * nonzeros).astype(np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms > 0, norms, 1)
+    records = [
+        {"id": f"syn-{i}", "act_code": "BNS", "section": f"Section {i}", "title": "", "summary": ""}
+        for i in range(size)
+    ]
+    write_index(path, records, matrix)
+
+
+def percentiles(samples_ms: list[float]) -> str:
+    q = statistics.quantiles(samples_ms, n=100)
+    return f"p50 {q[49]:7.3f} ms  p95 {q[94]:7.3f} ms  p99 {q[98]:7.3f} ms"
+
+
+def bench(size: int, args) -> None:
+    with tempfile.TemporaryDirectory() as path:
+        start = time.perf_counter()
+        synthetic_index(path, size, args.dim, args.nonzeros)
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        retriever = StatuteRetriever.load(path)
+        open_ms = (time.perf_counter() - start) * 1000
+        # Fault the mapping in once so timings reflect a warm page cache
+        retriever.search(QUERIES[0], args.k)
+
+        queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+        single = []
+        for query in queries:
+            start = time.perf_counter()
+            retriever.search(query, args.k)
+            single.append((time.perf_counter() - start) * 1000)
+
+        batched = []
+        for i in range(0, len(queries), args.batch):
+            chunk = queries[i:i + args.batch]
+            start = time.perf_counter()
+            retriever.search_batch(chunk, args.k)
+            batched.append((time.perf_counter() - start) * 1000 / len(chunk))
+
+        embed = []
+        for query in queries:
+            start = time.perf_counter()
+            retriever.embedder.embed(query)
+            embed.append((time.perf_counter() - start) * 1000)
+
+        mb = size * args.dim * 4 / 1e6
+        print(f"\n{size:,} sections x {args.dim} dims ({mb:,.0f} MB, built in {build_s:.1f}s, opened in {open_ms:.1f} ms)")
+        print(f"  embed query           {percentiles(embed)}")
+        print(f"  single query (k={args.k})    {percentiles(single)}")
+        print(f"  batch of {args.batch:<3} per query {percentiles(batched if len(batched) > 1 else batched * 2)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated index sizes")
+    parser.add_argument("--dim", type=int, default=1024, help="embedding dimensions")
+    parser.add_argument("--nonzeros", type=int, default=80, help="hashed features per synthetic section")
+    parser.add_argument("--queries", type=int, default=200, help="queries timed per size")
+    parser.add_argument("--batch", type=int, default=32, help="queries per search_batch call")
+    parser.add_argument("--k", type=int, default=3, help="sections returned per query")
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        bench(size, args)
+
+
+if __name__ == "__main__":
+    main()
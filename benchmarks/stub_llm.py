@@ -0,0 +1,202 @@
+"""
+Stub LLM server for offline load tests.
+
+Mimics the two upstream APIs the services call, so they can be load-tested
+without Hugging Face or Groq quota:
+
+  POST /  (or any other path)        Hugging Face text-generation (TGI):
+                                     {"inputs", "parameters", "stream"}
+  POST .../chat/completions          OpenAI-style chat completions, as served
+                                     by Groq (/openai/v1/chat/completions) and
+                                     the Hugging Face router (/v1/chat/completions)
+
+Both support streaming (Server-Sent Events) and non-streaming responses.
+Each request waits a sampled time-to-first-token, then emits --tokens tokens
+at --token-rate tokens/s. --error-rate of requests fail with --error-status
+and --hang-rate never answer (to exercise client timeouts).
+
+Usage (from the repo root):
+    python benchmarks/stub_llm.py --port 8900
+    python benchmarks/stub_llm.py --latency lognormal --latency-ms 800 --jitter-ms 400 \\
+        --token-rate 40 --tokens 200 --error-rate 0.02 --error-status 503
+
+Point the services at it with HF_ENDPOINT_URL=http://127.0.0.1:8900 and
+GROQ_API_URL=http://127.0.0.1:8900/openai/v1/chat/completions
+(benchmarks/load_test.py does this for you).
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER_WORDS = (
+    "Under Section 303 of the Bharatiya Nyaya Sanhita, 2023, theft is punishable with "
+    "imprisonment which may extend to three years, or with fine, or with both. The "
+    "offence is cognizable and non-bailable. An FIR may be registered under Section 173 "
+    "of the Bharatiya Nagarik Suraksha Sanhita. Please consult a qualified advocate."
+).split()
+
+
+class StubConfig:
+    def __init__(self, args):
+        self.latency = args.latency
+        self.latency_ms = args.latency_ms
+        self.jitter_ms = args.jitter_ms
+        self.token_rate = args.token_rate
+        self.tokens = args.tokens
+        self.error_rate = args.error_rate
+        self.error_status = args.error_status
+        self.hang_rate = args.hang_rate
+        self.rng = random.Random(args.seed)
+
+    def first_token_delay(self) -> float:
+        """Seconds before the first token, from the configured distribution"""
+        mean, jitter = self.latency_ms, self.jitter_ms
+        if self.latency == "fixed" or mean <= 0:
+            ms = mean
+        elif self.latency == "uniform":
+            ms = self.rng.uniform(mean - jitter, mean + jitter)
+        elif self.latency == "normal":
+            ms = self.rng.gauss(mean, jitter)
+        else:  # lognormal: long right tail, like real inference queues
+            sigma2 = (jitter / mean) ** 2 if jitter else 0.0
+            mu = math.log(mean) - sigma2 / 2
+            ms = self.rng.lognormvariate(mu, sigma2 ** 0.5)
+        return max(0.0, ms) / 1000
+
+    def outcome(self) -> str:
+        roll = self.rng.random()
+        if roll < self.error_rate:
+            return "error"
+        if roll < self.error_rate + self.hang_rate:
+            return "hang"
+        return "ok"
+
+    def token_gap(self) -> float:
+        return 1 / self.token_rate if self.token_rate > 0 else 0.0
+
+    def words(self) -> list[str]:
+        return [ANSWER_WORDS[i % len(ANSWER_WORDS)] + " " for i in range(self.tokens)]
+
+
+def build_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="Stub LLM server")
+    stats = {"requests": 0, "errors": 0, "hangs": 0, "in_flight": 0}
+
+    async def tokens():
+        await asyncio.sleep(config.first_token_delay())
+        gap = config.token_gap()
+        for i, word in enumerate(config.words()):
+            if i and gap:
+                await asyncio.sleep(gap)
+            yield word
+
+    async def start(kind: str):
+        """Apply error/hang injection; returns an error response or None"""
+        stats["requests"] += 1
+        outcome = config.outcome()
+        if outcome == "error":
+            stats["errors"] += 1
+            await asyncio.sleep(config.first_token_delay())
+            return JSONResponse({"error": f"injected {kind} failure"}, status_code=config.error_status)
+        if outcome == "hang":
+            stats["hangs"] += 1
+            await asyncio.sleep(3600)
+        return None
+
+    @app.get("/stats")
+    async def stub_stats():
+        return stats
+
+    @app.post("/{path:path}")
+    async def generate(path: str, request: Request):
+        body = await request.json()
+        chat = path.rstrip("/").endswith("chat/completions")
+        failure = await start("chat" if chat else "text-generation")
+        if failure is not None:
+            return failure
+        stream = bool(body.get("stream"))
+        model = body.get("model") or "stub"
+        created = int(time.time())
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        if not stream:
+            stats["in_flight"] += 1
+            try:
+                text = "".join([word async for word in tokens()]).strip()
+            finally:
+                stats["in_flight"] -= 1
+            if chat:
+                return {
+                    "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": config.tokens, "total_tokens": config.tokens},
+                }
+            return [{"generated_text": text}]
+
+        async def events():
+            stats["in_flight"] += 1
+            try:
+                n = 0
+                async for word in tokens():
+                    n += 1
+                    if chat:
+                        chunk = {
+                            "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                            "choices": [{"index": 0, "delta": {"role": "assistant", "content": word}, "finish_reason": None}],
+                        }
+                    else:
+                        chunk = {
+                            "index": n,
+                            "token": {"id": n, "text": word, "logprob": 0.0, "special": False},
+                            "generated_text": None,
+                            "details": None,
+                        }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                if chat:
+                    done = {
+                        "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                    }
+                    yield f"data: {json.dumps(done)}\n\n"
+                    yield "data: [DONE]\n\n"
+            finally:
+                stats["in_flight"] -= 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "normal", "lognormal"], default="lognormal",
+                        help="time-to-first-token distribution")
+    parser.add_argument("--latency-ms", type=float, default=300, help="mean time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="spread (half-width / std dev) of the distribution")
+    parser.add_argument("--token-rate", type=float, default=50, help="tokens per second after the first (0 = instant)")
+    parser.add_argument("--tokens", type=int, default=120, help="tokens per answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of injected failures")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of requests that never answer")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for reproducible runs")
+    return parser.parse_args(argv)
+
+
+def main():
+    import uvicorn
+
+    args = parse_args()
+    uvicorn.run(build_app(StubConfig(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
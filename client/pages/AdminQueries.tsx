@@ -65,7 +65,11 @@ export default function AdminQueries() {
       }
       
       const apiBaseUrl = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
-      const response = await fetch(`${apiBaseUrl}/api/v1/admin/queries?token=${token}`);
+      // Category filtering happens on the server, over its category index
+      const endpoint = selectedCategory
+        ? `${apiBaseUrl}/api/v1/admin/queries/category/${encodeURIComponent(selectedCategory)}`
+        : `${apiBaseUrl}/api/v1/admin/queries`;
+      const response = await fetch(`${endpoint}?token=${token}`);
       if (!response.ok) {
         throw new Error("Failed to fetch queries");
       }
@@ -74,7 +78,7 @@ export default function AdminQueries() {
       
       // Convert backend response to frontend format
       const queriesData = data.queries.map((q: any) => ({
-        id: q.timestamp,
+        id: q.id || q.timestamp,
         userId: q.user_id,
         userEmail: q.user_id,
         message: q.query,
@@ -83,12 +87,7 @@ export default function AdminQueries() {
         category: q.category || "General"
       }));
       
-      // Filter by category if selected
-      const filteredQueries = selectedCategory 
-        ? queriesData.filter((chat: ChatQuery) => chat.category === selectedCategory)
-        : queriesData;
-      
-      setQueries(filteredQueries);
+      setQueries(queriesData);
       setTotalQueries(data.total);
     } catch (error) {
       console.error("Fetch queries error:", error);
@@ -16,10 +16,10 @@ import {
   getDatabase,
   ref,
   push,
-  set,
   get,
   update,
   serverTimestamp,
+  increment,
   query,
   orderByChild,
   limitToLast,
@@ -105,6 +105,27 @@ interface ChatMessage {
   timestamp: any;
 }
 
+// Dashboard aggregates under stats/ are bumped in the same multi-path
+// update as the data they count (see admin-backend/dashboard_stats.py,
+// which also rebuilds them if they drift). Days are UTC.
+const statsDayKey = (ms: number = Date.now()) => new Date(ms).toISOString().slice(0, 10);
+
+const statsCategoryKey = (category?: string) =>
+  (category || "General").replace(/[.$#[\]\/]/g, "_") || "General";
+
+// Count the user as active today, once per day
+const markActiveToday = async (userId: string) => {
+  const day = statsDayKey();
+  const markerRef = ref(database, `stats/active/${day}/${userId}`);
+  const marker = await get(markerRef);
+  if (!marker.exists()) {
+    await update(ref(database), {
+      [`stats/active/${day}/${userId}`]: true,
+      [`stats/daily/${day}/active_users`]: increment(1),
+    });
+  }
+};
+
 // Save or update user data
 export const saveUserData = async (userData: Partial<UserData>) => {
   try {
@@ -129,13 +150,17 @@ export const saveUserData = async (userData: Partial<UserData>) => {
       });
     } else {
       // Create new user
-      await set(userRef, {
-        ...cleanUserData,
-        uid: userId,
-        createdAt: serverTimestamp(),
-        lastLogin: serverTimestamp(),
+      await update(ref(database), {
+        [`users/${userId}`]: {
+          ...cleanUserData,
+          uid: userId,
+          createdAt: serverTimestamp(),
+          lastLogin: serverTimestamp(),
+        },
+        "stats/summary/total_users": increment(1),
       });
     }
+    await markActiveToday(userId);
 
     return true;
   } catch (error) {
@@ -154,11 +179,25 @@ export const saveChatMessage = async (chatData: Omit<ChatMessage, 'id'>) => {
 
     const chatsRef = ref(database, `chats/${userId}`);
     const newChatRef = push(chatsRef);
+    const category = statsCategoryKey(chatData.category);
     
-    await set(newChatRef, {
-      ...chatData,
-      userId,
-      timestamp: serverTimestamp(),
+    await update(ref(database), {
+      [`chats/${userId}/${newChatRef.key}`]: {
+        ...chatData,
+        userId,
+        timestamp: serverTimestamp(),
+      },
+      // The rules only accept the counter increments alongside a new chat
+      // named by this pointer (database.rules.json)
+      [`stats/counted/${userId}`]: newChatRef.key,
+      "stats/summary/total_queries": increment(1),
+      [`stats/summary/categories/${category}`]: increment(1),
+      [`stats/daily/${statsDayKey()}/queries`]: increment(1),
+      // Category index for the admin listing (admin-backend/category_index.py)
+      [`chat_index/categories/${category}/${newChatRef.key}`]: {
+        t: serverTimestamp(),
+        u: userId,
+      },
     });
 
     return newChatRef.key;
@@ -230,6 +269,7 @@ export const updateLastLogin = async (userId?: string) => {
     await update(userRef, {
       lastLogin: serverTimestamp(),
     });
+    await markActiveToday(uid);
 
     return true;
   } catch (error) {
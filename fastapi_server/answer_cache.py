@@ -0,0 +1,230 @@
+"""
+Exact-match answer cache for the legal advice pipeline.
+
+Answers are keyed by the normalized question text plus a namespace that
+identifies the models and prompt version, so changing MODEL_ID or
+SYSTEM_PROMPT never serves answers produced by an older configuration.
+
+Two backends share the same interface:
+  MemoryBackend - per-process LRU with TTL
+  SqliteBackend - on-disk LRU with TTL; survives restarts and can be shared by
+                  several uvicorn workers pointing at the same file
+
+Backends block (SqliteBackend commits to disk), so the async pipeline calls
+them through asyncio.to_thread. A SqliteBackend hit is a read only: the
+recency it records for LRU eviction is kept in memory and written in one
+batch every TOUCH_BATCH hits or TOUCH_INTERVAL seconds, before evicting,
+and on flush().
+"""
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(text: str) -> str:
+    """Case/whitespace-insensitive form of a question used for cache keys"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _WHITESPACE.sub(" ", text)
+    return text.strip(" \t\n?.!")
+
+
+def prompt_version(*parts: str) -> str:
+    """Short stable fingerprint of the prompt text"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:12]
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, answer = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return answer
+
+    def set(self, key: str, answer: str, expires_at: float) -> int:
+        """Store an answer and return how many entries were evicted"""
+        with self._lock:
+            self._entries[key] = (expires_at, answer)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def flush(self):
+        pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SqliteBackend:
+    TOUCH_BATCH = 64
+    TOUCH_INTERVAL = 30.0
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._touched: dict[str, float] = {}  # key -> last_used not yet written
+        self._flushed_at = time.monotonic()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        # WAL lets other workers read while one of them writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " key TEXT PRIMARY KEY,"
+            " answer TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers(last_used)")
+        self._conn.commit()
+
+    def get(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer, expires_at FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            answer, expires_at = row
+            if expires_at <= now:
+                # Removed by the next set()
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= self.TOUCH_BATCH or time.monotonic() - self._flushed_at >= self.TOUCH_INTERVAL:
+                self._write_touches()
+                self._conn.commit()
+            return answer
+
+    def _write_touches(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE answers SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()],
+            )
+            self._touched.clear()
+        self._flushed_at = time.monotonic()
+
+    def flush(self):
+        """Write pending last_used updates"""
+        with self._lock:
+            if self._touched:
+                self._write_touches()
+                self._conn.commit()
+
+    def set(self, key: str, answer: str, expires_at: float) -> int:
+        now = time.time()
+        with self._lock:
+            # Recent hits count for the eviction order below
+            self._write_touches()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, answer, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, answer, expires_at, now),
+            )
+            self._conn.execute("DELETE FROM answers WHERE expires_at <= ?", (now,))
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+            evicted = max(0, count - self.max_entries)
+            if evicted:
+                self._conn.execute(
+                    "DELETE FROM answers WHERE key IN "
+                    "(SELECT key FROM answers ORDER BY last_used ASC LIMIT ?)",
+                    (evicted,),
+                )
+            self._conn.commit()
+            return evicted
+
+    def size(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+            return count
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+
+
+class AnswerCache:
+    def __init__(self, namespace: str, max_entries: int = 2048, ttl_seconds: float = 86400, path: Optional[str] = None):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.enabled = max_entries > 0
+        if path:
+            self.backend = SqliteBackend(path, max(1, max_entries))
+        else:
+            self.backend = MemoryBackend(max(1, max_entries))
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, message: str) -> str:
+        raw = f"{self.namespace}\0{normalize_message(message)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, message: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        answer = self.backend.get(self.key(message), time.time())
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    def set(self, message: str, answer: str):
+        if not self.enabled or not answer:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        self.evictions += self.backend.set(self.key(message), answer, expires_at)
+
+    def flush(self):
+        self.backend.flush()
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "namespace": self.namespace,
+            "entries": self.backend.size() if self.enabled else 0,
+            "max_entries": self.backend.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,42 @@
+"""
+Build the statute vector index used by the retrieval node (retrieval.py).
+
+Embeds every section of the statute corpus and writes vectors.npy plus
+sections.json to the output directory. Run it whenever data/laws.json
+changes; the pipeline embeds the corpus in memory if no index exists.
+
+Usage (from the repo root):
+    python fastapi_server/build_statute_index.py
+    python fastapi_server/build_statute_index.py --acts BNS,BNSS,BSA --dim 1024 --out /srv/statute_index
+"""
+import argparse
+import pathlib
+import sys
+import time
+
+sys.path.append(str(pathlib.Path(__file__).parent))
+
+from law_search import load_law_corpus
+from retrieval import DEFAULT_ACTS, embed_sections, select_sections, write_index
+
+DATA_DIR = pathlib.Path(__file__).parent / "data"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=str(DATA_DIR / "laws.json"), help="statute corpus JSON")
+    parser.add_argument("--out", default=str(DATA_DIR / "statute_index"), help="output directory")
+    parser.add_argument("--acts", default=DEFAULT_ACTS, help="act codes to index (comma-separated, empty for all)")
+    parser.add_argument("--dim", type=int, default=1024, help="embedding dimensions")
+    args = parser.parse_args()
+
+    records = select_sections(load_law_corpus(args.corpus), args.acts)
+    start = time.perf_counter()
+    matrix = embed_sections(records, args.dim)
+    write_index(args.out, records, matrix)
+    print(f"Indexed {len(records)} sections ({args.dim} dims) into {args.out} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
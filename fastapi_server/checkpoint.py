@@ -0,0 +1,291 @@
+"""
+Bounded LangGraph checkpointers for conversation threads.
+
+MemorySaver keeps every checkpoint of every thread forever. The savers here
+add three limits on top of the stock LangGraph backends:
+
+  max_checkpoints - checkpoints kept per thread (older ones are pruned; the
+                    latest one always holds the full thread state)
+  idle_ttl        - threads not written to for this many seconds are deleted
+  max_threads     - least recently used threads beyond this count are deleted
+
+and report how many threads/checkpoints/bytes they hold.
+
+Backends:
+  memory - BoundedMemorySaver, per process (default)
+  sqlite - BoundedSqliteSaver, a local file shared by all workers on the host;
+           needs the optional langgraph-checkpoint-sqlite package
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from typing import Optional
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from metrics import STAGE_SECONDS
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:  # optional dependency, only needed for CHECKPOINT_BACKEND=sqlite
+    SqliteSaver = None
+
+
+class _BoundedSaverMixin:
+    # Reads and writes done by LangGraph around each node, for /metrics
+    @STAGE_SECONDS.timed("checkpoint_get")
+    def get_tuple(self, config):
+        return super().get_tuple(config)
+
+    @STAGE_SECONDS.timed("checkpoint_writes")
+    def put_writes(self, config, writes, task_id, task_path=""):
+        return super().put_writes(config, writes, task_id, task_path)
+
+    def _init_bounds(self, max_checkpoints: int, idle_ttl: float, max_threads: int, sweep_interval: float):
+        self.max_checkpoints = max(1, max_checkpoints)
+        self.idle_ttl = idle_ttl
+        self.max_threads = max_threads
+        self.sweep_interval = sweep_interval
+        self.evicted_threads = 0
+        self.pruned_checkpoints = 0
+        self._last_sweep = time.monotonic()
+        self._sweep_lock = threading.Lock()
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sweep = now
+            self.sweep()
+        finally:
+            self._sweep_lock.release()
+
+    def sweep(self) -> int:
+        """Delete idle threads and threads over the max_threads budget"""
+        victims = self._threads_to_evict(time.time())
+        for thread_id in victims:
+            self.delete_thread(thread_id)
+        self.evicted_threads += len(victims)
+        return len(victims)
+
+
+class BoundedMemorySaver(_BoundedSaverMixin, InMemorySaver):
+    def __init__(self, max_checkpoints: int = 6, idle_ttl: float = 86400, max_threads: int = 10000, sweep_interval: float = 60):
+        super().__init__()
+        self._init_bounds(max_checkpoints, idle_ttl, max_threads, sweep_interval)
+        # (thread_id, ns) -> deque of (checkpoint_id, channel_versions, blob keys written)
+        self._history = defaultdict(deque)
+        # thread_id -> last write time, in LRU order
+        self._last_access: "OrderedDict[str, float]" = OrderedDict()
+        self._bytes = defaultdict(int)
+        self._lock = threading.RLock()
+
+    @STAGE_SECONDS.timed("checkpoint_put")
+    def put(self, config, checkpoint, metadata, new_versions):
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        blob_keys = [(thread_id, checkpoint_ns, k, v) for k, v in new_versions.items()]
+
+        with self._lock:
+            saved_checkpoint, saved_metadata, _ = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            size = len(saved_checkpoint[1]) + len(saved_metadata[1])
+            size += sum(len(self.blobs[key][1]) for key in blob_keys if key in self.blobs)
+            self._bytes[thread_id] += size
+
+            history = self._history[(thread_id, checkpoint_ns)]
+            history.append((checkpoint["id"], dict(checkpoint["channel_versions"]), blob_keys))
+            self._prune(thread_id, checkpoint_ns, history)
+
+            self._last_access[thread_id] = time.time()
+            self._last_access.move_to_end(thread_id)
+
+        self._maybe_sweep()
+        return next_config
+
+    def _prune(self, thread_id, checkpoint_ns, history):
+        if len(history) <= self.max_checkpoints:
+            return
+        referenced = {
+            (k, v)
+            for _, versions, _ in list(history)[-self.max_checkpoints:]
+            for k, v in versions.items()
+        }
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        while len(history) > self.max_checkpoints:
+            checkpoint_id, _, blob_keys = history.popleft()
+            saved = checkpoints.pop(checkpoint_id, None)
+            if saved:
+                self._bytes[thread_id] -= len(saved[0][1]) + len(saved[1][1])
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            for key in blob_keys:
+                if (key[2], key[3]) not in referenced and key in self.blobs:
+                    self._bytes[thread_id] -= len(self.blobs.pop(key)[1])
+            self.pruned_checkpoints += 1
+
+    def _threads_to_evict(self, now: float) -> list:
+        with self._lock:
+            cutoff = now - self.idle_ttl
+            victims = [tid for tid, last in self._last_access.items() if last < cutoff]
+            overflow = len(self._last_access) - len(victims) - self.max_threads
+            if overflow > 0:
+                # _last_access is in LRU order, so the oldest survivors go first
+                evicting = set(victims)
+                survivors = (tid for tid in self._last_access if tid not in evicting)
+                victims.extend(next(survivors) for _ in range(overflow))
+            return victims
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self._lock:
+            self._last_access.pop(thread_id, None)
+            self._bytes.pop(thread_id, None)
+            for key in [key for key in self._history if key[0] == thread_id]:
+                del self._history[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "threads": len(self._last_access),
+                "checkpoints": sum(len(h) for h in self._history.values()),
+                "bytes": sum(self._bytes.values()),
+                "max_checkpoints_per_thread": self.max_checkpoints,
+                "max_threads": self.max_threads,
+                "idle_ttl_seconds": self.idle_ttl,
+                "evicted_threads": self.evicted_threads,
+                "pruned_checkpoints": self.pruned_checkpoints,
+            }
+
+
+if SqliteSaver is not None:
+
+    class BoundedSqliteSaver(_BoundedSaverMixin, SqliteSaver):
+        """
+        SqliteSaver with bounds, plus async methods that run the (local, fast)
+        SQLite calls on a worker thread so it can back `app_graph.ainvoke`.
+        Activity is tracked in the database itself so every worker sharing
+        the file sees the same idle times.
+        """
+
+        def __init__(self, path: str, max_checkpoints: int = 6, idle_ttl: float = 86400, max_threads: int = 10000, sweep_interval: float = 60):
+            conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+            super().__init__(conn)
+            self._init_bounds(max_checkpoints, idle_ttl, max_threads, sweep_interval)
+            self.path = path
+            self.setup()
+            with self.cursor() as cur:
+                cur.execute(
+                    "CREATE TABLE IF NOT EXISTS thread_activity ("
+                    " thread_id TEXT PRIMARY KEY,"
+                    " last_access REAL NOT NULL,"
+                    " bytes INTEGER NOT NULL DEFAULT 0)"
+                )
+                cur.execute("CREATE INDEX IF NOT EXISTS thread_activity_last_access ON thread_activity(last_access)")
+
+        @STAGE_SECONDS.timed("checkpoint_put")
+        def put(self, config, checkpoint, metadata, new_versions):
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            with self.cursor() as cur:
+                keep = "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT ?"
+                args = (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.max_checkpoints)
+                cur.execute(
+                    f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ({keep})",
+                    args,
+                )
+                cur.execute(
+                    f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ({keep})",
+                    args,
+                )
+                self.pruned_checkpoints += max(0, cur.rowcount)
+                (size,) = cur.execute(
+                    "SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints WHERE thread_id = ?",
+                    (thread_id,),
+                ).fetchone()
+                cur.execute(
+                    "INSERT OR REPLACE INTO thread_activity (thread_id, last_access, bytes) VALUES (?, ?, ?)",
+                    (thread_id, time.time(), size),
+                )
+            self._maybe_sweep()
+            return next_config
+
+        def _threads_to_evict(self, now: float) -> list:
+            with self.cursor(transaction=False) as cur:
+                victims = [
+                    row[0] for row in cur.execute(
+                        "SELECT thread_id FROM thread_activity WHERE last_access < ?",
+                        (now - self.idle_ttl,),
+                    )
+                ]
+                (count,) = cur.execute("SELECT COUNT(*) FROM thread_activity").fetchone()
+                overflow = count - len(victims) - self.max_threads
+                if overflow > 0:
+                    victims.extend(
+                        row[0] for row in cur.execute(
+                            "SELECT thread_id FROM thread_activity WHERE last_access >= ? ORDER BY last_access ASC LIMIT ?",
+                            (now - self.idle_ttl, overflow),
+                        )
+                    )
+            return victims
+
+        def delete_thread(self, thread_id: str) -> None:
+            super().delete_thread(thread_id)
+            with self.cursor() as cur:
+                cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (thread_id,))
+
+        async def aget_tuple(self, config):
+            return await asyncio.to_thread(self.get_tuple, config)
+
+        async def alist(self, config, *, filter=None, before=None, limit=None):
+            items = await asyncio.to_thread(
+                lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+            )
+            for item in items:
+                yield item
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path=""):
+            return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+        async def adelete_thread(self, thread_id: str) -> None:
+            return await asyncio.to_thread(self.delete_thread, thread_id)
+
+        def stats(self) -> dict:
+            with self.cursor(transaction=False) as cur:
+                threads, size = cur.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM thread_activity"
+                ).fetchone()
+                (checkpoints,) = cur.execute("SELECT COUNT(*) FROM checkpoints").fetchone()
+            return {
+                "backend": "sqlite",
+                "path": self.path,
+                "threads": threads,
+                "checkpoints": checkpoints,
+                "bytes": size,
+                "max_checkpoints_per_thread": self.max_checkpoints,
+                "max_threads": self.max_threads,
+                "idle_ttl_seconds": self.idle_ttl,
+                "evicted_threads": self.evicted_threads,
+                "pruned_checkpoints": self.pruned_checkpoints,
+            }
+
+
+def build_checkpointer(backend: str = "memory", path: Optional[str] = None, **limits):
+    """Create the checkpointer selected by CHECKPOINT_BACKEND"""
+    backend = (backend or "memory").lower()
+    if backend == "memory":
+        return BoundedMemorySaver(**limits)
+    if backend == "sqlite":
+        if SqliteSaver is None:
+            raise RuntimeError("CHECKPOINT_BACKEND=sqlite requires the langgraph-checkpoint-sqlite package")
+        return BoundedSqliteSaver(path or "checkpoints.sqlite", **limits)
+    raise ValueError(f"Unknown CHECKPOINT_BACKEND: {backend}")
@@ -0,0 +1,348 @@
+"""
+Rewrites citations of repealed criminal statutes in model output.
+
+The IPC, CrPC and Indian Evidence Act were replaced on 1 July 2024 by the
+BNS, BNSS and BSA. Models still cite the old sections ("Section 302 IPC"),
+so answers are post-processed with a fixed old -> new mapping table.
+
+Every spelling of every mapped citation ("Section 302 IPC", "u/s 302 of
+the Indian Penal Code", "IPC 302", ...) is compiled into one Aho-Corasick
+automaton, so text is scanned once, a character at a time, regardless of
+how many citations are known. The scan is incremental: `CitationStream`
+accepts model output chunk by chunk and only holds back the few characters
+that could still be part of a citation, so streamed and non-streamed
+answers are rewritten identically.
+
+Modes:
+  rewrite - "Section 302 IPC" -> "Section 103 BNS"
+  flag    - "Section 302 IPC" -> "Section 302 IPC [now Section 103 BNS]"
+  off     - text passes through unchanged
+
+An old citation is left as written when the new section it maps to is
+mentioned within NEARBY characters of it: "Section 302 IPC is now Section
+103 of BNS" is a comparison, not a stale citation.
+"""
+import threading
+from collections import deque
+from typing import Optional
+
+# Old section -> new section, per (old act, new act)
+IPC_TO_BNS = {
+    "34": "3(5)", "120B": "61(2)", "153A": "196", "302": "103", "304": "105",
+    "304A": "106", "304B": "80", "306": "108", "307": "109", "323": "115(2)",
+    "354": "74", "375": "63", "376": "64", "378": "303(1)", "379": "303(2)",
+    "380": "305", "384": "308(2)", "392": "309(4)", "395": "310(2)",
+    "406": "316(2)", "420": "318(4)", "498A": "85", "499": "356(1)",
+    "500": "356(2)", "506": "351", "509": "79",
+}
+CRPC_TO_BNSS = {
+    "41": "35", "125": "144", "144": "163", "154": "173", "161": "180",
+    "164": "183", "167": "187", "438": "482", "439": "483", "482": "528",
+}
+EVIDENCE_TO_BSA = {
+    "3": "2", "24": "22", "25": "23", "32": "26", "45": "39", "65B": "63",
+    "101": "104", "114": "119",
+}
+
+# Ways each old act is written after (or before) a section number
+IPC_NAMES = ["ipc", "i.p.c.", "i.p.c", "indian penal code", "indian penal code, 1860", "penal code"]
+CRPC_NAMES = [
+    "crpc", "cr.p.c.", "cr.p.c", "code of criminal procedure", "code of criminal procedure, 1973",
+    "criminal procedure code",
+]
+EVIDENCE_NAMES = ["evidence act", "indian evidence act", "indian evidence act, 1872", "iea"]
+
+STATUTE_TABLES = [
+    ("IPC", "BNS", IPC_TO_BNS, IPC_NAMES),
+    ("CrPC", "BNSS", CRPC_TO_BNSS, CRPC_NAMES),
+    ("Evidence Act", "BSA", EVIDENCE_TO_BSA, EVIDENCE_NAMES),
+]
+
+# Ways each new act is written, to spot answers that cite both codes
+BNS_NAMES = ["bns", "b.n.s.", "bharatiya nyaya sanhita", "bharatiya nyaya sanhita, 2023", "nyaya sanhita"]
+BNSS_NAMES = [
+    "bnss", "b.n.s.s.", "bharatiya nagarik suraksha sanhita", "bharatiya nagarik suraksha sanhita, 2023",
+]
+BSA_NAMES = ["bsa", "b.s.a.", "bharatiya sakshya adhiniyam", "bharatiya sakshya adhiniyam, 2023"]
+NEW_ACT_NAMES = {"BNS": BNS_NAMES, "BNSS": BNSS_NAMES, "BSA": BSA_NAMES}
+
+SECTION_WORDS = ["section ", "sec. ", "sec ", "s. ", "u/s ", "u/s. "]
+
+MODES = ("rewrite", "flag", "off")
+
+# An old citation with a mention of its new section this many characters
+# before or after it is left as written: the answer is comparing the codes
+# ("Section 302 IPC is now Section 103 of BNS"), which the prompt allows
+NEARBY = 120
+
+
+def _spellings(sec: str, names: list[str]) -> set[str]:
+    spellings = set()
+    for name in names:
+        for word in SECTION_WORDS:
+            spellings.update({
+                f"{word}{sec} {name}",
+                f"{word}{sec}, {name}",
+                f"{word}{sec} of {name}",
+                f"{word}{sec} of the {name}",
+                f"{name} {word}{sec}",
+            })
+        # Bare "302 IPC" / "IPC 302" only for the short act codes
+        if " " not in name and "." not in name:
+            spellings.update({f"{sec} {name}", f"{name} {sec}"})
+    return spellings
+
+
+def citation_patterns(mode: str = "rewrite") -> dict[str, tuple[str, Optional[str], str]]:
+    """
+    Lower-cased citation spelling -> (canonical citation, replacement, new
+    citation). Old citations carry their replacement; spellings of the new
+    citations they map to are included too, with replacement None.
+    """
+    patterns = {}
+    for old_act, new_act, table, names in STATUTE_TABLES:
+        for old, new in table.items():
+            canonical = f"Section {old} {old_act}"
+            new_citation = f"Section {new} {new_act}"
+            replacement = f"[now {new_citation}]" if mode == "flag" else new_citation
+            for spelling in _spellings(new.lower(), NEW_ACT_NAMES[new_act]):
+                patterns[spelling] = (new_citation, None, new_citation)
+            for spelling in _spellings(old.lower(), names):
+                patterns[spelling] = (canonical, replacement, new_citation)
+    return patterns
+
+
+class _Automaton:
+    def __init__(self, patterns: dict[str, tuple]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.depth: list[int] = [0]
+        # Longest pattern ending at each node: (length, pattern's value)
+        self.output: list[Optional[tuple[int, tuple]]] = [None]
+
+        for pattern, value in patterns.items():
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.depth.append(self.depth[node] + 1)
+                    self.output.append(None)
+                node = nxt
+            self.output[node] = (len(pattern), value)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(ch, 0)
+                if self.output[child] is None:
+                    self.output[child] = self.output[self.fail[child]]
+
+    def step(self, state: int, ch: str) -> int:
+        while state and ch not in self.goto[state]:
+            state = self.fail[state]
+        return self.goto[state].get(ch, 0)
+
+
+class _Edit:
+    """An old citation found in the output; `text` is None until it is decided"""
+    __slots__ = ("start", "end", "canonical", "replacement", "new_citation", "text")
+
+    def __init__(self, start: int, end: int, canonical: str, replacement: str, new_citation: str):
+        self.start, self.end = start, end
+        self.canonical, self.replacement, self.new_citation = canonical, replacement, new_citation
+        self.text: Optional[str] = None
+
+
+class CitationStream:
+    """
+    Incremental rewriter for one piece of output; see CitationRewriter.stream().
+
+    Positions are offsets into the whole output fed so far. Text is held
+    back while it could still be part of a citation, and from an old
+    citation until NEARBY characters after it have been seen without a
+    mention of its new section.
+    """
+
+    def __init__(self, rewriter: "CitationRewriter", count: bool = True):
+        self._rewriter = rewriter
+        self._count = count
+        self._automaton = rewriter.automaton
+        self._text: list[str] = []  # fed but not yet emitted
+        self._base = 0              # position of _text[0]
+        self._scan = 0              # position of the next character to scan
+        self._last_char = ""
+        self._edits: list[_Edit] = []
+        # New citation -> where its latest mention ended
+        self._mentioned: dict[str, int] = {}
+        self._restart()
+
+    def _restart(self):
+        # Positions of the characters fed to the automaton (runs of
+        # whitespace count once, so "Section  302\nIPC" still matches)
+        self._offsets: list[int] = []
+        self._state = 0
+        self._prev_space = False
+        # Match waiting for the next character: (start, end, pattern's value)
+        self._candidate: Optional[tuple[int, int, tuple]] = None
+
+    def _span(self, start: int, end: int) -> str:
+        return "".join(self._text[start - self._base:end - self._base])
+
+    def _decide(self, edit: _Edit, keep: bool):
+        original = self._span(edit.start, edit.end)
+        if keep:
+            edit.text = original
+            return
+        edit.text = f"{original} {edit.replacement}" if self._rewriter.mode == "flag" else edit.replacement
+        if self._count:
+            self._rewriter._record(edit.canonical)
+
+    def _commit(self):
+        start, end, (canonical, replacement, new_citation) = self._candidate
+        self._restart()
+        # Scanning resumes right after the match
+        self._scan = end
+        if replacement is None:
+            self._mentioned[new_citation] = end
+            for edit in self._edits:
+                if edit.text is None and edit.new_citation == new_citation and start <= edit.end + NEARBY:
+                    self._decide(edit, keep=True)
+            return
+        edit = _Edit(start, end, canonical, replacement, new_citation)
+        mentioned = self._mentioned.get(new_citation)
+        if mentioned is not None and mentioned >= start - NEARBY:
+            self._decide(edit, keep=True)
+        self._edits.append(edit)
+
+    def _step(self, c: str, pos: int):
+        automaton = self._automaton
+        ch = " " if c.isspace() else c.lower()
+        if not (ch == " " and self._prev_space):
+            self._state = automaton.step(self._state, ch)
+            self._offsets.append(pos)
+        self._prev_space = ch == " "
+        depth = automaton.depth[self._state]
+
+        if self._candidate is not None:
+            start, end = self._candidate[0], self._candidate[1]
+            if pos == end and c.isalnum():
+                # "Section 302 IPCs", "IPC 3020": not a citation boundary
+                self._candidate = None
+            elif not (depth and self._offsets[-depth] <= start):
+                # No longer spelling of this citation can follow
+                self._commit()
+                return
+
+        match = automaton.output[self._state]
+        if match is not None:
+            length, value = match
+            start = self._offsets[-length]
+            before = self._text[start - 1 - self._base] if start > self._base else self._last_char
+            if not before.isalnum() and (self._candidate is None or start <= self._candidate[0]):
+                self._candidate = (start, pos + 1, value)
+
+    def _run(self):
+        while self._scan < self._base + len(self._text):
+            pos = self._scan
+            self._scan = pos + 1
+            self._step(self._text[pos - self._base], pos)
+
+    def _emit(self, upto: int) -> str:
+        """Text up to position `upto`, with the decided edits before it applied"""
+        out, pos = [], self._base
+        while self._edits and self._edits[0].start < upto:
+            edit = self._edits.pop(0)
+            out.append(self._span(pos, edit.start))
+            out.append(edit.text)
+            pos = edit.end
+        out.append(self._span(pos, upto))
+        if upto > self._base:
+            self._last_char = self._text[upto - 1 - self._base]
+            del self._text[:upto - self._base]
+            self._base = upto
+        return "".join(out)
+
+    def feed(self, chunk: str) -> str:
+        """Rewrite a chunk; returns the text that is safe to emit so far"""
+        if self._rewriter.mode == "off":
+            return chunk
+        self._text.extend(chunk)
+        self._run()
+        # Where a citation (or a mention of a new one) may still start
+        depth = self._automaton.depth[self._state]
+        hold = self._offsets[-depth] if depth else self._scan
+        if self._candidate is not None:
+            hold = min(hold, self._candidate[0])
+        self._offsets = self._offsets[-depth:] if depth else []
+        for edit in self._edits:
+            if edit.text is None:
+                if edit.end + NEARBY < hold:
+                    self._decide(edit, keep=False)
+                else:
+                    hold = min(hold, edit.start)
+                    break
+        return self._emit(hold)
+
+    def flush(self) -> str:
+        """End of output: rewrite anything still held back"""
+        if self._rewriter.mode == "off":
+            return ""
+        while self._candidate is not None:
+            self._commit()
+            self._run()
+        for edit in self._edits:
+            if edit.text is None:
+                self._decide(edit, keep=False)
+        out = self._emit(self._base + len(self._text))
+        self._mentioned.clear()
+        self._restart()
+        return out
+
+
+class CitationRewriter:
+    def __init__(self, mode: str = "rewrite"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown citation rewrite mode {mode!r}; expected one of {MODES}")
+        self.mode = mode
+        self._automaton: Optional[_Automaton] = None
+        self._lock = threading.Lock()
+        self.rewritten = 0
+        self.by_citation: dict[str, int] = {}
+
+    @property
+    def automaton(self) -> _Automaton:
+        # Compiled on first use (a few thousand patterns) to keep imports cheap
+        if self._automaton is None:
+            with self._lock:
+                if self._automaton is None:
+                    self._automaton = _Automaton(citation_patterns(self.mode))
+        return self._automaton
+
+    def _record(self, canonical: str):
+        with self._lock:
+            self.rewritten += 1
+            self.by_citation[canonical] = self.by_citation.get(canonical, 0) + 1
+
+    def stream(self, count: bool = True) -> CitationStream:
+        """Incremental rewriter; count=False for display-only copies of output"""
+        return CitationStream(self, count)
+
+    def rewrite(self, text: str) -> str:
+        if self.mode == "off" or not text:
+            return text
+        stream = self.stream()
+        return stream.feed(text) + stream.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            top = sorted(self.by_citation.items(), key=lambda item: -item[1])[:10]
+            return {"mode": self.mode, "rewritten": self.rewritten, "top": dict(top)}
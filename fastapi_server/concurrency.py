@@ -0,0 +1,70 @@
+"""
+Bounded concurrency for upstream model calls.
+
+Every request that reaches the model holds a slot for the whole upstream round
+trip. Once all slots are busy, up to `max_waiting` callers queue for a slot;
+anything beyond that is rejected immediately with UpstreamBusy so the server
+sheds load instead of piling up unbounded waiters.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+
+
+class UpstreamBusy(Exception):
+    """Raised when the upstream wait queue is full or the wait timed out"""
+
+
+class UpstreamLimiter:
+    def __init__(self, max_concurrent: int, max_waiting: int, wait_timeout: Optional[float] = None):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max(0, max_waiting)
+        self.wait_timeout = wait_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+        # Counters (only touched from the event loop, so no locking needed)
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one upstream slot for the duration of the `async with` block"""
+        if self.in_flight + self.waiting >= self.max_concurrent + self.max_waiting:
+            self.rejected += 1
+            raise UpstreamBusy(f"Upstream queue is full ({self.waiting} waiting)")
+
+        self.waiting += 1
+        try:
+            if self.wait_timeout:
+                await asyncio.wait_for(self._semaphore.acquire(), self.wait_timeout)
+            else:
+                await self._semaphore.acquire()
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise UpstreamBusy(f"Timed out after {self.wait_timeout}s waiting for an upstream slot")
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_waiting": self.max_waiting,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
@@ -0,0 +1,155 @@
+"""
+Token-budgeted conversation context for multi-turn threads.
+
+The most recent turns of a thread are sent to the model verbatim; older turns
+are folded into a short extractive rolling summary that is stored in the
+thread state, so each message is summarized once rather than on every
+request. How much history a model gets is set by its ContextBudget: the
+history must fit in what is left of the context window after the fixed prompt
+and the generation allowance, and never exceeds `max_history_tokens` (a
+latency cap - every prompt token adds prefill time).
+"""
+import math
+import re
+from typing import Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """Cheap token estimate; LLaMA-family tokenizers average ~4 chars/token on English"""
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+
+def _message_text(message) -> str:
+    return message.content if hasattr(message, "content") else str(message)
+
+
+def _is_user(message) -> bool:
+    return getattr(message, "type", None) == "human"
+
+
+def _first_sentence(text: str, limit: int) -> str:
+    text = _WHITESPACE.sub(" ", text).strip()
+    text = _SENTENCE_END.split(text, maxsplit=1)[0]
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+class ContextBudget:
+    def __init__(self, name: str, context_window: int, max_new_tokens: int, max_history_tokens: int):
+        self.name = name
+        self.context_window = context_window
+        self.max_new_tokens = max_new_tokens
+        self.max_history_tokens = max_history_tokens
+
+    def available(self, fixed_tokens: int) -> int:
+        """History tokens that fit next to a prompt of `fixed_tokens`"""
+        room = self.context_window - self.max_new_tokens - fixed_tokens
+        return max(0, min(room, self.max_history_tokens))
+
+
+class ConversationContext:
+    """History selected for one model: optional summary plus verbatim turns"""
+
+    def __init__(self, summary: str, messages: list):
+        self.summary = summary
+        self.messages = messages
+
+    def as_base_prompt(self) -> str:
+        """History in the ### User / ### Assistant format used for base models"""
+        parts = []
+        if self.summary:
+            parts.append(f"### Earlier in this conversation:\n{self.summary}\n\n")
+        for message in self.messages:
+            role = "User" if _is_user(message) else "Assistant"
+            parts.append(f"### {role}:\n{_message_text(message)}\n\n")
+        return "".join(parts)
+
+    def as_chat_messages(self) -> list:
+        """History as chat messages for chat-format models"""
+        messages = []
+        if self.summary:
+            messages.append(HumanMessage(content=f"Summary of our earlier conversation:\n{self.summary}"))
+            messages.append(AIMessage(content="Understood."))
+        for message in self.messages:
+            cls = HumanMessage if _is_user(message) else AIMessage
+            messages.append(cls(content=_message_text(message)))
+        return messages
+
+
+class ContextBuilder:
+    def __init__(self, recent_turns: int = 3, summary_tokens: int = 200, chars_per_token: float = 4.0):
+        self.recent_messages = max(0, recent_turns) * 2
+        self.summary_tokens = summary_tokens
+        self.chars_per_token = chars_per_token
+
+    def tokens(self, text: str) -> int:
+        return estimate_tokens(text, self.chars_per_token)
+
+    def split(self, history: list) -> tuple[list, list]:
+        """(older, recent) - older turns are summarized, recent ones kept verbatim"""
+        if len(history) <= self.recent_messages:
+            return [], list(history)
+        cut = len(history) - self.recent_messages
+        return list(history[:cut]), list(history[cut:])
+
+    def fold(self, summary: str, summarized_upto: Optional[str], older: list) -> tuple[str, Optional[str]]:
+        """
+        Extend the rolling summary with older messages not yet summarized.
+        Returns the new summary and the id of the last message it covers.
+        """
+        start = 0
+        if summarized_upto:
+            for i, message in enumerate(older):
+                if getattr(message, "id", None) == summarized_upto:
+                    start = i + 1
+                    break
+        new = older[start:]
+        if not new:
+            return summary, summarized_upto
+
+        lines = summary.splitlines() if summary else []
+        for message in new:
+            if _is_user(message):
+                lines.append(f"- User asked: {_first_sentence(_message_text(message), 200)}")
+            else:
+                lines.append(f"  Answer: {_first_sentence(_message_text(message), 240)}")
+
+        # Keep the newest lines that fit the summary budget
+        kept, used = [], 0
+        for line in reversed(lines):
+            cost = self.tokens(line) + 1
+            if used + cost > self.summary_tokens:
+                break
+            kept.append(line)
+            used += cost
+        kept.reverse()
+        # Never start the summary on a dangling answer line
+        while kept and not kept[0].startswith("- "):
+            kept.pop(0)
+        return "\n".join(kept), getattr(new[-1], "id", None)
+
+    def select(self, summary: str, recent: list, budget: ContextBudget, fixed_tokens: int) -> ConversationContext:
+        """Fit the summary and the newest verbatim turns into the model's budget"""
+        available = budget.available(fixed_tokens)
+        summary_cost = self.tokens(summary)
+        if summary_cost > available:
+            summary, summary_cost = "", 0
+        remaining = available - summary_cost
+
+        chosen = []
+        # Walk back from the newest message; whole turns only, so the model
+        # never sees an answer without its question
+        i = len(recent)
+        while i > 0:
+            start = i - 2 if i >= 2 and _is_user(recent[i - 2]) else i - 1
+            cost = sum(self.tokens(_message_text(m)) + 4 for m in recent[start:i])
+            if cost > remaining:
+                break
+            chosen[:0] = recent[start:i]
+            remaining -= cost
+            i = start
+        return ConversationContext(summary, chosen)
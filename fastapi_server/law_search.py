@@ -0,0 +1,241 @@
+"""
+Full-text search over the statute corpus (data/laws.json).
+
+Sections are ranked with BM25 over three weighted fields: the section
+number (plus act code, so "bns 303" works), the title and the summary.
+Query terms that are not in the vocabulary are expanded to the vocabulary
+terms they prefix ("cheat" -> "cheating") and, failing that, to terms one
+edit away ("thfet" -> "theft") using a deletion index.
+
+The index is a sorted vocabulary plus flat postings arrays (doc ids and
+field-weighted term frequencies, addressed by per-term offsets). It is
+written to a single binary file next to the corpus and reused as long as
+the corpus fingerprint matches, so workers don't re-tokenize on startup.
+"""
+import bisect
+import hashlib
+import json
+import math
+import os
+import re
+import struct
+import threading
+from array import array
+from typing import Optional
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Field weights applied to term frequencies before BM25 saturation
+FIELD_WEIGHTS = {"section": 3.0, "title": 2.0, "summary": 1.0}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Weight of expanded query terms relative to an exact match
+PREFIX_WEIGHT = 0.8
+TYPO_WEIGHT = 0.6
+MAX_PREFIX_EXPANSIONS = 20
+MIN_PREFIX_LEN = 2
+MIN_TYPO_LEN = 4
+
+_MAGIC = b"LAWIDX1\n"
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall((text or "").lower())
+
+
+def load_law_corpus(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def corpus_fingerprint(docs: list[dict]) -> str:
+    payload = json.dumps(docs, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()
+
+
+def _doc_fields(doc: dict) -> dict:
+    return {
+        "section": f"{doc.get('act_code') or ''} {doc.get('section') or ''}",
+        "title": doc.get("title") or "",
+        "summary": doc.get("summary") or "",
+    }
+
+
+def _deletes(term: str) -> set[str]:
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+class LawSearchIndex:
+    def __init__(self, fingerprint: str, vocab: list[str], acts: list[str],
+                 offsets: array, doc_ids: array, weights: array, doc_len: array):
+        self.fingerprint = fingerprint
+        self.vocab = vocab
+        self.acts = acts
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.doc_len = doc_len
+        self.n_docs = len(doc_len)
+        self.avg_len = (sum(doc_len) / self.n_docs) if self.n_docs else 0.0
+        self._term_ids = {t: i for i, t in enumerate(vocab)}
+        self._delete_index: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    # ---------- Build / persist ----------
+    @classmethod
+    def build(cls, docs: list[dict]) -> "LawSearchIndex":
+        postings: dict[str, dict[int, float]] = {}
+        doc_len = array("f")
+        for doc_id, doc in enumerate(docs):
+            length = 0.0
+            for field, text in _doc_fields(doc).items():
+                weight = FIELD_WEIGHTS[field]
+                for term in tokenize(text):
+                    per_doc = postings.setdefault(term, {})
+                    per_doc[doc_id] = per_doc.get(doc_id, 0.0) + weight
+                    length += weight
+            doc_len.append(length)
+
+        vocab = sorted(postings)
+        offsets = array("I", [0])
+        doc_ids = array("I")
+        weights = array("f")
+        for term in vocab:
+            for doc_id, tf in sorted(postings[term].items()):
+                doc_ids.append(doc_id)
+                weights.append(tf)
+            offsets.append(len(doc_ids))
+
+        acts = [(doc.get("act_code") or "").lower() for doc in docs]
+        return cls(corpus_fingerprint(docs), vocab, acts, offsets, doc_ids, weights, doc_len)
+
+    def save(self, path: str):
+        header = json.dumps({
+            "fingerprint": self.fingerprint,
+            "vocab": self.vocab,
+            "acts": self.acts,
+            "postings": len(self.doc_ids),
+        }, ensure_ascii=False).encode("utf-8")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            for arr in (self.offsets, self.doc_ids, self.weights, self.doc_len):
+                f.write(arr.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LawSearchIndex":
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(_MAGIC):
+            raise ValueError(f"{path} is not a law search index")
+        pos = len(_MAGIC)
+        (header_len,) = struct.unpack_from("<I", data, pos)
+        pos += 4
+        header = json.loads(data[pos:pos + header_len].decode("utf-8"))
+        pos += header_len
+
+        def take(typecode: str, count: int) -> array:
+            nonlocal pos
+            arr = array(typecode)
+            size = arr.itemsize * count
+            arr.frombytes(data[pos:pos + size])
+            pos += size
+            return arr
+
+        n_terms = len(header["vocab"])
+        n_postings = header["postings"]
+        offsets = take("I", n_terms + 1)
+        doc_ids = take("I", n_postings)
+        weights = take("f", n_postings)
+        doc_len = take("f", len(header["acts"]))
+        return cls(header["fingerprint"], header["vocab"], header["acts"],
+                   offsets, doc_ids, weights, doc_len)
+
+    @classmethod
+    def open(cls, docs: list[dict], path: Optional[str] = None) -> "LawSearchIndex":
+        """Load the index at `path` if it was built from `docs`, else rebuild it"""
+        if path and os.path.exists(path):
+            try:
+                index = cls.load(path)
+                if index.fingerprint == corpus_fingerprint(docs):
+                    return index
+            except (OSError, ValueError, KeyError, struct.error) as e:
+                print(f"Law index at {path} is unreadable, rebuilding: {e}")
+        index = cls.build(docs)
+        if path:
+            try:
+                index.save(path)
+            except OSError as e:
+                # Read-only deployments (e.g. serverless) keep it in memory
+                print(f"Could not write law index to {path}: {e}")
+        return index
+
+    # ---------- Query expansion ----------
+    def _prefix_terms(self, prefix: str) -> list[int]:
+        start = bisect.bisect_left(self.vocab, prefix)
+        found = []
+        for term_id in range(start, len(self.vocab)):
+            if not self.vocab[term_id].startswith(prefix) or len(found) >= MAX_PREFIX_EXPANSIONS:
+                break
+            found.append(term_id)
+        return found
+
+    def _typo_terms(self, term: str) -> list[int]:
+        with self._lock:
+            if self._delete_index is None:
+                index: dict[str, list[int]] = {}
+                for term_id, word in enumerate(self.vocab):
+                    if len(word) < MIN_TYPO_LEN - 1:
+                        continue
+                    for key in _deletes(word) | {word}:
+                        index.setdefault(key, []).append(term_id)
+                self._delete_index = index
+        # Deletion neighbourhoods of the query and the vocabulary intersect
+        # for insertions, deletions and substitutions (edit distance 1)
+        found = set()
+        for key in _deletes(term) | {term}:
+            found.update(self._delete_index.get(key, ()))
+        return sorted(found)
+
+    def expand(self, token: str, is_last: bool) -> list[tuple[int, float]]:
+        """Vocabulary terms (and weights) a query token should match"""
+        exact = self._term_ids.get(token)
+        matches = [(exact, 1.0)] if exact is not None else []
+        # The last token may be incomplete (search-as-you-type)
+        if (exact is None or is_last) and len(token) >= MIN_PREFIX_LEN:
+            matches += [(t, PREFIX_WEIGHT) for t in self._prefix_terms(token) if t != exact]
+        if not matches and len(token) >= MIN_TYPO_LEN:
+            matches = [(t, TYPO_WEIGHT) for t in self._typo_terms(token)]
+        return matches
+
+    # ---------- Scoring ----------
+    def search(self, query: str, act: Optional[str] = None) -> list[tuple[int, float]]:
+        """Return (doc index, score) pairs, best first"""
+        tokens = tokenize(query)
+        act = act.lower() if act else None
+        scores: dict[int, float] = {}
+        for position, token in enumerate(tokens):
+            # A document scores a token once, through its best-matching term
+            best: dict[int, float] = {}
+            for term_id, weight in self.expand(token, position == len(tokens) - 1):
+                start, end = self.offsets[term_id], self.offsets[term_id + 1]
+                df = end - start
+                idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+                for i in range(start, end):
+                    doc_id = self.doc_ids[i]
+                    if act and self.acts[doc_id] != act:
+                        continue
+                    tf = self.weights[i]
+                    norm = K1 * (1 - B + B * self.doc_len[doc_id] / self.avg_len)
+                    score = weight * idf * tf * (K1 + 1) / (tf + norm)
+                    if score > best.get(doc_id, 0.0):
+                        best[doc_id] = score
+            for doc_id, score in best.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
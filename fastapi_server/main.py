@@ -1,25 +1,63 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response
+from contextlib import asynccontextmanager
 from pydantic import BaseModel, Field
 import os
+import sys
+import json
+import asyncio
+import importlib
 from dotenv import load_dotenv
 import pathlib
 import traceback
-from typing import Optional, Annotated, List
-from langchain_huggingface import HuggingFaceEndpoint, ChatHuggingFace
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_core.runnables import RunnableConfig
-from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph.message import add_messages
-from typing_extensions import TypedDict
+import uuid
+import time
+import threading
+from typing import Optional
+
+# Make sibling modules importable whether this file is loaded as `main`
+# (uvicorn from this folder) or as `fastapi_server.main` (api/index.py)
+sys.path.append(str(pathlib.Path(__file__).parent))
+
+from concurrency import UpstreamBusy
+from law_search import LawSearchIndex, load_law_corpus
+from statutes import SectionStore
+from rendered import RenderedResponses
+from metrics import CONTENT_TYPE, REGISTRY, STAGE_SECONDS, MetricsMiddleware
 
 # Load .env from the root directory
 env_path = pathlib.Path(__file__).parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
-app = FastAPI()
+def get_pipeline():
+    """
+    The model/graph pipeline (pipeline.py), built on first use.
+    Python's import lock makes concurrent first calls build it only once.
+    """
+    return importlib.import_module("pipeline")
+
+async def load_pipeline():
+    # The first import takes seconds; keep it off the event loop
+    if "pipeline" in sys.modules:
+        return sys.modules["pipeline"]
+    return await asyncio.to_thread(get_pipeline)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Long-running servers can build the pipeline before taking traffic
+    if os.getenv("PRELOAD_PIPELINE", "").lower() in ("1", "true", "yes"):
+        await load_pipeline()
+    yield
+    # Persist cache state that is only written periodically
+    if "pipeline" in sys.modules:
+        sys.modules["pipeline"].semantic_cache.save()
+        sys.modules["pipeline"].answer_cache.flush()
+    # Pooled upstream connections (see providers.py)
+    if "providers" in sys.modules:
+        await sys.modules["providers"].aclose_shared_client()
+
+app = FastAPI(lifespan=lifespan)
 
 # Middleware
 app.add_middleware(
@@ -29,116 +67,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Per-route latency and in-flight requests for /metrics
+app.add_middleware(MetricsMiddleware)
 
 # Hugging Face Configuration
 HF_TOKEN = os.getenv("HF_TOKEN")
-MODEL_ID = os.getenv("HF_MODEL_ID", "AdaptLLM/law-LLM")
 
 if not HF_TOKEN:
     print("Warning: HF_TOKEN is not set in .env")
 else:
     print(f"HF_TOKEN loaded: {HF_TOKEN[:4]}...{HF_TOKEN[-4:]}")
 
-# --- LangChain Setup ---
-
-# 1. Define Models
-# Primary Model (Base Model) - Treated as text generation
-llm_primary = HuggingFaceEndpoint(
-    repo_id=MODEL_ID,
-    task="text-generation",
-    max_new_tokens=500,
-    temperature=0.7,
-    repetition_penalty=1.15,
-    huggingfacehub_api_token=HF_TOKEN
-)
-
-# Fallback Model (Chat Model)
-llm_fallback = ChatHuggingFace(
-    llm=HuggingFaceEndpoint(
-        repo_id="meta-llama/Meta-Llama-3-8B-Instruct",
-        task="text-generation",
-        max_new_tokens=1000,
-        temperature=0.7,
-        huggingfacehub_api_token=HF_TOKEN
-    )
-)
-
-# 2. Define Prompts
-SYSTEM_PROMPT = """You are a legal AI specialized strictly in the NEW Indian criminal law framework effective July 2024.
-
-CRITICAL RULES:
-1. You MUST use Bharatiya Nyaya Sanhita, 2023 (BNS).
-2. You MUST NOT cite IPC sections under any circumstance.
-3. If IPC section numbers appear in your reasoning, you must replace them with corresponding BNS sections before answering.
-4. If unsure about BNS section number, state: "Section number requires verification under BNS" instead of defaulting to IPC.
-5. Always format citation as:
-   Section __, Bharatiya Nyaya Sanhita, 2023.
-
-Also reference:
-- Bharatiya Nagarik Suraksha Sanhita, 2023 (BNSS)
-- Bharatiya Sakshya Adhiniyam, 2023 (BSA)
-
-Never mention IPC unless the user explicitly asks for comparison.
-"""
-
-# Template for Chat Models
-chat_prompt = ChatPromptTemplate.from_messages([
-    ("system", SYSTEM_PROMPT),
-    ("user", "Hypothetical Legal Scenario for Analysis: '{input}'. Provide a strict legal analysis of the relevant Indian laws, BNS sections, and potential court interpretations for this scenario. offer personal advice, but explain the law.")
-])
-
-# Template for Base Models (Manual formatting)
-def format_for_base_model(input_dict):
-    user_input = input_dict["input"]
-    academic_query = f"Hypothetical Legal Scenario for Analysis: '{user_input}'. Provide a strict legal analysis of the relevant Indian laws, BNS sections, and potential court interpretations for this scenario. offer personal advice, but explain the law."
-    return f"### System:\n{SYSTEM_PROMPT}\n\n### User:\n{academic_query}\n\n### Assistant:\n"
-
-# 3. Define Chains with Fallback
-# Chain for Base Model
-chain_primary = (
-    format_for_base_model 
-    | llm_primary
-)
-
-# Chain for Chat Model
-chain_fallback = (
-    chat_prompt 
-    | llm_fallback
-)
-
-# Combined Chain with Fallback
-final_chain = chain_primary.with_fallbacks([chain_fallback])
-
-# --- LangGraph Setup ---
-
-class State(TypedDict):
-    # Messages have the type "list" to support appending new messages
-    # The `add_messages` function handles the merge logic
-    messages: Annotated[List, add_messages]
-    # We store the latest user input separately for the prompt template
-    latest_input: str
-
-def call_model(state: State):
-    latest_input = state["latest_input"]
-    response = final_chain.invoke({"input": latest_input})
-    
-    # Handle response type (string vs AIMessage)
-    if hasattr(response, "content"):
-        content = response.content
-    else:
-        content = str(response)
-        
-    return {"messages": [content]}
-
-# Define the graph
-workflow = StateGraph(State)
-workflow.add_node("legal_advisor", call_model)
-workflow.add_edge(START, "legal_advisor")
-workflow.add_edge("legal_advisor", END)
-
-# Add memory for statefulness
-memory = MemorySaver()
-app_graph = workflow.compile(checkpointer=memory)
 
 class ChatRequest(BaseModel):
     message: str
@@ -148,126 +87,204 @@ class ChatRequest(BaseModel):
 def ping():
     return {"message": "ping pong from FastAPI"}
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics: pipeline stage latencies, fallbacks, upstream errors, sizes"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/api/stats")
+def pipeline_stats():
+    """Runtime counters for the legal advice pipeline"""
+    # Don't build the pipeline just to report on it
+    if "pipeline" not in sys.modules:
+        return {"pipeline_loaded": False, "browse": browse_responses.stats()}
+    return {"pipeline_loaded": True, "browse": browse_responses.stats(), **sys.modules["pipeline"].stats()}
+
 # ---------- Browse Laws Backend ----------
 class LawItem(BaseModel):
     id: str
     title: str
     act: str
+    act_code: str | None = None
     section: str | None = None
     summary: str
+    references: list[str] = []
 
-LAW_ITEMS: list[LawItem] = [
-    LawItem(
-        id="ipc-302",
-        title="Murder",
-        act="Indian Penal Code (IPC)",
-        section="Section 302",
-        summary="Punishment for murder. Death or imprisonment for life, and fine.",
-    ),
-    LawItem(
-        id="ipc-304",
-        title="Culpable Homicide Not Amounting to Murder",
-        act="Indian Penal Code (IPC)",
-        section="Section 304",
-        summary="Punishment varies based on intention/knowledge. Imprisonment up to life or up to 10 years and fine.",
-    ),
-    LawItem(
-        id="ipc-379",
-        title="Theft",
-        act="Indian Penal Code (IPC)",
-        section="Section 379",
-        summary="Punishment for theft. Imprisonment up to 3 years, or fine, or both.",
-    ),
-    LawItem(
-        id="ipc-323",
-        title="Voluntarily Causing Hurt",
-        act="Indian Penal Code (IPC)",
-        section="Section 323",
-        summary="Imprisonment up to 1 year, or fine up to ₹1,000, or both, except in cases under Section 334.",
-    ),
-    LawItem(
-        id="crpc-fir",
-        title="First Information Report (FIR)",
-        act="Criminal Procedure Code (CrPC)",
-        section="Section 154",
-        summary="Information relating to cognizable offence recorded by police. Initiates investigation.",
-    ),
-    LawItem(
-        id="evidence-act-65b",
-        title="Admissibility of Electronic Records",
-        act="Indian Evidence Act",
-        section="Section 65B",
-        summary="Electronic records are admissible subject to certificate and conditions.",
-    ),
-    LawItem(
-        id="contract-73",
-        title="Compensation for Loss or Damage",
-        act="Indian Contract Act",
-        section="Section 73",
-        summary="Damages for breach of contract—loss naturally arising or which parties knew would likely result.",
-    ),
-]
+# Statute corpus; the search index over it is built on the first search
+LAW_DATA_PATH = os.getenv("LAW_DATA_PATH") or str(pathlib.Path(__file__).parent / "data" / "laws.json")
+LAW_INDEX_PATH = os.getenv("LAW_INDEX_PATH") or str(pathlib.Path(LAW_DATA_PATH).with_suffix(".idx"))
 
-@app.get("/api/browse/laws")
-def browse_laws(page: int = 1, limit: int = 10):
+LAW_ITEMS: list[LawItem] = [LawItem(**doc) for doc in load_law_corpus(LAW_DATA_PATH)]
+LAW_RECORDS: list[dict] = [item.dict() for item in LAW_ITEMS]
+
+# (act code, section) -> record, plus cross-references in both directions
+SECTION_STORE = SectionStore(LAW_RECORDS)
+
+# Browse data only changes on deploy: responses are rendered to JSON once per
+# distinct request and revalidated by ETag, so repeat requests are a dict
+# lookup (or a 304) and CDN/browser caches can serve them
+browse_responses = RenderedResponses(
+    max_entries=int(os.getenv("BROWSE_CACHE_MAX_ENTRIES", "2048")),
+    cache_control=os.getenv("BROWSE_CACHE_CONTROL", "public, max-age=300, s-maxage=86400"),
+)
+MAX_RELATED_HOPS = 3
+
+_law_index: Optional[LawSearchIndex] = None
+_law_index_lock = threading.Lock()
+
+def get_law_index() -> LawSearchIndex:
+    global _law_index
+    with _law_index_lock:
+        if _law_index is None:
+            _law_index = LawSearchIndex.open(LAW_RECORDS, LAW_INDEX_PATH)
+        return _law_index
+
+def _page_args(page: int, limit: int) -> tuple[int, int]:
     if page < 1:
         page = 1
     if limit < 1:
         limit = 10
-    start = (page - 1) * limit
-    end = start + limit
-    items = LAW_ITEMS[start:end]
-    return {
-        "items": [item.dict() for item in items],
-        "total": len(LAW_ITEMS),
-        "page": page,
-        "limit": limit,
-    }
+    return page, limit
 
-@app.post("/api/legal-advice")
-async def get_legal_advice(request: ChatRequest):
+@app.get("/api/browse/laws")
+def browse_laws(request: Request, page: int = 1, limit: int = 10):
+    page, limit = _page_args(page, limit)
+
+    def render():
+        start = (page - 1) * limit
+        end = start + limit
+        return {
+            "items": LAW_RECORDS[start:end],
+            "total": len(LAW_RECORDS),
+            "page": page,
+            "limit": limit,
+        }
+
+    return browse_responses.respond(request, ("laws", page, limit), render)
+
+@app.get("/api/browse/laws/search")
+async def search_laws(request: Request, q: str = "", act: Optional[str] = None, page: int = 1, limit: int = 10):
+    """
+    Ranked full-text search over section numbers, titles and summaries.
+    `act` filters by act code (BNS, BNSS, BSA, IPC, CrPC, ...).
+    """
+    page, limit = _page_args(page, limit)
+    index = None
+    if q.strip():
+        index = _law_index or await asyncio.to_thread(get_law_index)
+
+    def render():
+        if index is None:
+            # No query: the (optionally filtered) corpus in its natural order
+            hits = [(i, None) for i, record in enumerate(LAW_RECORDS)
+                    if not act or (record["act_code"] or "").lower() == act.lower()]
+        else:
+            hits = index.search(q, act=act)
+        start = (page - 1) * limit
+        return {
+            "items": [{**LAW_RECORDS[i], "score": score} for i, score in hits[start:start + limit]],
+            "total": len(hits),
+            "page": page,
+            "limit": limit,
+            "query": q,
+        }
+
+    key = ("search", q, (act or "").lower(), page, limit)
+    return browse_responses.respond(request, key, render)
+
+def _section_position(act: str, section: str) -> int:
+    position = SECTION_STORE.position(act, section)
+    if position is None:
+        raise HTTPException(status_code=404, detail=f"Section {section} of {act} was not found.")
+    return position
+
+@app.get("/api/browse/laws/{act}/{section}")
+def get_law_section(request: Request, act: str, section: str):
+    """Direct lookup, e.g. /api/browse/laws/BNS/103, with its cross-references"""
+    position = _section_position(act, section)
+    return browse_responses.respond(request, ("section", position), lambda: {
+        "item": SECTION_STORE.records[position],
+        "references": SECTION_STORE.references(position),
+        "referenced_by": SECTION_STORE.referenced_by(position),
+    })
+
+@app.get("/api/browse/laws/{act}/{section}/related")
+def get_related_sections(request: Request, act: str, section: str, hops: int = 1):
+    """Sections within `hops` cross-references of a section, nearest first"""
+    position = _section_position(act, section)
+    hops = min(max(hops, 1), MAX_RELATED_HOPS)
+    return browse_responses.respond(request, ("related", position, hops), lambda: {
+        "item": SECTION_STORE.records[position],
+        "hops": hops,
+        "related": [{**record, "distance": distance}
+                    for record, distance in SECTION_STORE.neighborhood(position, hops)],
+    })
+
+def _require_hf_token():
     if not HF_TOKEN:
         raise HTTPException(
             status_code=500, 
             detail="Configuration Error: HF_TOKEN is missing in .env file. Please add your Hugging Face API token to the .env file in the project root."
         )
 
+def _graph_call_args(request: ChatRequest):
+    # Determine thread_id. Anonymous requests get their own generated thread,
+    # returned in the response so the client can continue the conversation.
+    thread_id = request.thread_id or f"anon-{uuid.uuid4().hex}"
+
+    config = {"configurable": {"thread_id": thread_id}}
+
+    # We pass the input message. The graph state handles the rest.
+    input_state = {
+        "messages": [("user", request.message)],
+        "latest_input": request.message
+    }
+    return input_state, config
+
+def _thread_id(config: dict) -> str:
+    return config["configurable"]["thread_id"]
+
+def _model_error_detail(e: Exception) -> str:
+    # Catch specific errors related to Hugging Face auth or empty responses
+    if "StopIteration" in str(e) or isinstance(e, StopIteration):
+        return "Model returned no response. This is often caused by an invalid or missing HF_TOKEN, or the model is gated/inaccessible."
+    return f"Model Invocation Failed: {str(e)}"
+
+def _message_text(message) -> str:
+    return message.content if hasattr(message, "content") else str(message)
+
+@app.post("/api/legal-advice")
+async def get_legal_advice(request: ChatRequest):
+    _require_hf_token()
+    return await _legal_advice(request)
+
+async def _legal_advice(request: ChatRequest) -> dict:
+    """One graph run; failures are raised as HTTPException"""
     try:
         print(f"Received request: {request.message}")
         
-        # Determine thread_id (use provided one or default to a stateless one if needed, 
-        # but to support statefulness we really need a persistent ID. 
-        # If user doesn't provide one, we generate a random one for this request only)
-        thread_id = request.thread_id or "default_thread"
-        
-        config = {"configurable": {"thread_id": thread_id}}
-        
-        # Invoke the graph
-        # We pass the input message. The graph state handles the rest.
-        input_state = {
-            "messages": [("user", request.message)],
-            "latest_input": request.message
-        }
+        input_state, config = _graph_call_args(request)
         
-        # Stream the output or invoke directly. Since we want a single response:
+        # Invoke the graph. Since we want a single response:
         try:
-            result = await app_graph.ainvoke(input_state, config=config)
+            pipeline = await load_pipeline()
+            with STAGE_SECONDS.time("graph"):
+                result = await pipeline.app_graph.ainvoke(input_state, config=config)
+        except UpstreamBusy as e:
+            print(f"Upstream busy: {e}")
+            raise HTTPException(status_code=503, detail=f"Server is busy, please retry shortly. {e}", headers={"Retry-After": "5"})
         except (RuntimeError, StopIteration) as e:
-            # Catch specific errors related to Hugging Face auth or empty responses
             print(f"Model Invocation Error: {e}")
             traceback.print_exc()
-            if "StopIteration" in str(e) or isinstance(e, StopIteration):
-                raise HTTPException(status_code=500, detail="Model returned no response. This is often caused by an invalid or missing HF_TOKEN, or the model is gated/inaccessible.")
-            raise HTTPException(status_code=500, detail=f"Model Invocation Failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=_model_error_detail(e))
 
         # Extract the last message content
         if "messages" not in result or not result["messages"]:
              raise HTTPException(status_code=500, detail="Model returned an empty message list.")
 
-        last_message = result["messages"][-1]
-        response_text = last_message.content if hasattr(last_message, "content") else str(last_message)
+        response_text = _message_text(result["messages"][-1])
         
-        return {"response": response_text}
+        return {"response": response_text, "thread_id": _thread_id(config)}
 
     except HTTPException:
         raise
@@ -276,6 +293,231 @@ async def get_legal_advice(request: ChatRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+# ---------- Streaming Legal Advice ----------
+# Token events emitted by the model runs inside the legal_advisor node.
+# Base models (primary) emit on_llm_stream, chat models (fallback) on_chat_model_stream.
+STREAM_TOKEN_EVENTS = {"on_llm_stream", "on_chat_model_stream"}
+# Custom event dispatched by the model router (router.ROUTER_EVENT) when a
+# backend fails or wins; token events carry metadata["model_backend"]
+ROUTER_EVENT = "model_router"
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _chunk_text(chunk) -> str:
+    if chunk is None:
+        return ""
+    if hasattr(chunk, "content"):
+        return chunk.content if isinstance(chunk.content, str) else ""
+    if hasattr(chunk, "text"):
+        return chunk.text or ""
+    return str(chunk)
+
+async def _stream_legal_advice(input_state: dict, config: dict):
+    """
+    Yield Server-Sent Events for one graph run.
+
+    Events:
+      token - {"text": ...} incremental model output, with old IPC/CrPC/
+              Evidence Act citations rewritten as they stream; a cached
+              or coalesced answer arrives as a single token event
+      reset - {"reason": ...} discard tokens received so far; the backend
+              being streamed failed ("fallback") or a hedged call to the
+              other backend finished first ("hedge"). Tokens that follow
+              belong to the new backend's answer.
+      done  - {"response": ..., "thread_id": ...} the complete message as
+              stored in the thread
+      error - {"detail": ...}
+    """
+    # Tokens per backend; with hedging two backends can generate at once.
+    # The first one to produce a token is streamed live, the rest buffered.
+    buffers = {}
+    # Per-backend citation rewriters; the node rewrites the stored message
+    # with the same table, so the tokens add up to the "done" response
+    rewriters = {}
+    active = None
+    # Whether the client holds the current answer's tokens. A cache hit or a
+    # request coalesced onto another's model call streams none, so the
+    # answer is sent as one token event before "done".
+    streamed = False
+    try:
+        pipeline = await load_pipeline()
+        app_graph = pipeline.app_graph
+        async for event in app_graph.astream_events(input_state, config=config, version="v2"):
+            kind = event["event"]
+            metadata = event.get("metadata", {})
+
+            if kind == "on_custom_event" and event.get("name") == ROUTER_EVENT:
+                backend = event["data"]["backend"]
+                if event["data"]["type"] == "failed":
+                    buffers.pop(backend, None)
+                    rewriters.pop(backend, None)
+                    if backend == active:
+                        active = None
+                        yield _sse("reset", {"reason": "fallback"})
+                        streamed = False
+                        if buffers:
+                            active = next(iter(buffers))
+                            yield _sse("token", {"text": "".join(buffers[active])})
+                            streamed = True
+                elif backend != active:
+                    if active is not None:
+                        yield _sse("reset", {"reason": "hedge"})
+                        streamed = False
+                    active = backend
+                    if buffers.get(backend):
+                        yield _sse("token", {"text": "".join(buffers[backend])})
+                        streamed = True
+                continue
+
+            if kind not in STREAM_TOKEN_EVENTS:
+                continue
+            if metadata.get("langgraph_node") != "legal_advisor":
+                continue
+            text = _chunk_text(event["data"].get("chunk"))
+            if not text:
+                continue
+            backend = metadata.get("model_backend", "")
+            if backend not in rewriters:
+                rewriters[backend] = pipeline.citation_rewriter.stream(count=False)
+            text = rewriters[backend].feed(text)
+            buffers.setdefault(backend, []).append(text)
+            if active is None:
+                active = backend
+            if backend == active and text:
+                yield _sse("token", {"text": text})
+                streamed = True
+
+        # Text held back in case it was the start of a citation
+        if active in rewriters:
+            tail = rewriters[active].flush()
+            if tail:
+                yield _sse("token", {"text": tail})
+                streamed = True
+
+        # The checkpoint holds the complete message written by the node
+        snapshot = await app_graph.aget_state(config)
+        messages = snapshot.values.get("messages") or []
+        if not messages:
+            yield _sse("error", {"detail": "Model returned an empty message list."})
+            return
+        response = _message_text(messages[-1])
+        if not streamed and response:
+            yield _sse("token", {"text": response})
+        yield _sse("done", {"response": response, "thread_id": _thread_id(config)})
+    except UpstreamBusy as e:
+        print(f"Upstream busy: {e}")
+        yield _sse("error", {"detail": f"Server is busy, please retry shortly. {e}"})
+    except (RuntimeError, StopIteration) as e:
+        print(f"Model Invocation Error: {e}")
+        traceback.print_exc()
+        yield _sse("error", {"detail": _model_error_detail(e)})
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        traceback.print_exc()
+        yield _sse("error", {"detail": str(e)})
+
+@app.post("/api/legal-advice/stream")
+async def stream_legal_advice(request: ChatRequest):
+    """Same as /api/legal-advice, but streams the answer as Server-Sent Events"""
+    _require_hf_token()
+
+    print(f"Received streaming request: {request.message}")
+    input_state, config = _graph_call_args(request)
+
+    return StreamingResponse(
+        _stream_legal_advice(input_state, config),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ---------- Batch Legal Advice ----------
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+class BatchRequest(BaseModel):
+    items: list[ChatRequest]
+    # Parallel graph runs for this batch (capped at BATCH_MAX_CONCURRENCY)
+    concurrency: Optional[int] = None
+
+def _ndjson(data: dict) -> str:
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+async def _batch_item(index: int, item: ChatRequest, slots: asyncio.Semaphore, thread_locks: dict) -> dict:
+    start = time.perf_counter()
+    result = {"index": index}
+    try:
+        async with slots:
+            result["queued_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            # Items sharing a thread run one after another, in request order
+            lock = thread_locks.get(item.thread_id)
+            if lock is None:
+                result.update(await _legal_advice(item))
+            else:
+                async with lock:
+                    result.update(await _legal_advice(item))
+        result.update(status="ok", status_code=200)
+    except HTTPException as e:
+        result.update(status="error", status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        result.update(status="error", status_code=500, detail=str(e))
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+async def _stream_batch(batch: BatchRequest, concurrency: int):
+    """
+    Yield one NDJSON line per item as it completes, then a summary line:
+      {"index", "status": "ok"|"error", "status_code", "response"|"detail",
+       "thread_id", "queued_ms", "elapsed_ms"}
+      {"done": true, "total", "ok", "errors", "elapsed_ms"}
+    """
+    start = time.perf_counter()
+    slots = asyncio.Semaphore(concurrency)
+    thread_locks = {item.thread_id: asyncio.Lock() for item in batch.items if item.thread_id}
+    # Tasks are created in request order, so same-thread items queue on
+    # their lock in that order
+    tasks = [
+        asyncio.create_task(_batch_item(i, item, slots, thread_locks))
+        for i, item in enumerate(batch.items)
+    ]
+    ok = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            ok += result["status"] == "ok"
+            yield _ndjson(result)
+        yield _ndjson({
+            "done": True,
+            "total": len(tasks),
+            "ok": ok,
+            "errors": len(tasks) - ok,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        })
+    finally:
+        # Client went away: don't keep generating answers nobody will read
+        for task in tasks:
+            task.cancel()
+
+@app.post("/api/legal-advice/batch")
+async def batch_legal_advice(batch: BatchRequest):
+    """
+    Run many questions through the pipeline with bounded concurrency.
+    Results stream back as NDJSON in completion order.
+    """
+    _require_hf_token()
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="Batch has no items.")
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch has {len(batch.items)} items; the limit is {BATCH_MAX_ITEMS}.")
+    concurrency = min(max(batch.concurrency or BATCH_MAX_CONCURRENCY, 1), BATCH_MAX_CONCURRENCY)
+
+    print(f"Received batch of {len(batch.items)} requests (concurrency {concurrency})")
+    return StreamingResponse(
+        _stream_batch(batch, concurrency),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/api/demo")
 def demo():
     return {"message": "Hello from FastAPI server"}
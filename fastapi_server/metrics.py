@@ -0,0 +1,298 @@
+"""
+Process-local metrics in the Prometheus text exposition format.
+
+Both services (fastapi_server and admin-backend) import this module and
+serve `REGISTRY.render()` at /metrics. Instrumentation on the request path
+is a dict lookup, a bisect and a couple of float additions under a small
+lock, so it can stay on for every request.
+
+Metrics shared by the pipeline modules are defined at the bottom of this
+file; `MetricsMiddleware` adds per-route HTTP latency and an in-flight gauge.
+"""
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+# Latency buckets (seconds) wide enough for both browse lookups and LLM calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+SIZE_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        # In the 0.0.4 text format a counter's family is named like its sample
+        family = f"{self.name}_total" if self.kind == "counter" else self.name
+        lines = [f"# HELP {family} {self.help}", f"# TYPE {family} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}_total{_labels(self.labelnames, k)} {_number(v.value)}"
+                for k, v in list(self._children.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), function: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labelnames)
+        # Read at scrape time instead of being updated on the hot path
+        self.function = function
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def _samples(self) -> list[str]:
+        if self.function is not None:
+            return [f"{self.name} {_number(self.function())}"]
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v.value)}"
+                for k, v in list(self._children.items())]
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "lock")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self, *labels):
+        """Context manager observing the elapsed seconds of its block"""
+        return self.labels(*labels).time()
+
+    def timed(self, *labels):
+        """Decorator form of time() for sync functions"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.time(*labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            with child.lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        # Get-or-create, so modules imported by both services can declare
+        # the same metric
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = (), function=None) -> Gauge:
+        return self.register(Gauge(name, help, labelnames, function))
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ---------- Shared pipeline metrics ----------
+STAGE_SECONDS = REGISTRY.histogram(
+    "legally_stage_duration_seconds",
+    "Time spent in each legal advice pipeline stage",
+    ["stage"],
+)
+FALLBACKS = REGISTRY.counter(
+    "legally_fallback_triggers",
+    "Times a request moved past the primary model, by reason (error, hedge, circuit_open)",
+    ["reason"],
+)
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "legally_upstream_errors",
+    "Failed upstream model calls by backend and exception type",
+    ["backend", "type"],
+)
+RESPONSE_CHARS = REGISTRY.histogram(
+    "legally_response_chars",
+    "Length of generated legal advice answers in characters",
+    buckets=SIZE_BUCKETS,
+)
+RESPONSE_TOKENS = REGISTRY.histogram(
+    "legally_response_tokens",
+    "Estimated length of generated legal advice answers in tokens",
+    buckets=SIZE_BUCKETS,
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "legally_http_request_duration_seconds",
+    "HTTP request latency by route, including streamed bodies",
+    ["handler", "method", "status"],
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "legally_http_requests_in_flight",
+    "HTTP requests currently being served",
+)
+
+
+def observe_response(text: str):
+    RESPONSE_CHARS.observe(len(text))
+    # Same ~4 characters per token heuristic as context.estimate_tokens
+    RESPONSE_TOKENS.observe(max(1, len(text) // 4) if text else 0)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency per route template and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            # Route templates, not raw paths, keep label cardinality bounded
+            handler = getattr(route, "path", None) or "unmatched"
+            HTTP_SECONDS.labels(handler, scope.get("method", ""), status["code"]).observe(time.perf_counter() - start)
@@ -0,0 +1,389 @@
+"""
+LangChain/LangGraph pipeline behind /api/legal-advice.
+
+Importing this module builds the model providers, chains, caches,
+checkpointer and compiled graph. main.py imports it on first use (see
+get_pipeline) so cold starts and endpoints that never touch the model - ping,
+browse - don't pay for LangChain/LangGraph imports or model construction.
+"""
+import os
+import time
+import asyncio
+import pathlib
+from typing import Optional, Annotated, List
+from dotenv import load_dotenv
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import AIMessage, RemoveMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import add_messages
+from typing_extensions import TypedDict
+
+from concurrency import UpstreamLimiter
+from answer_cache import AnswerCache, prompt_version
+from semantic_cache import SemanticCache
+from checkpoint import build_checkpointer
+from context import ContextBudget, ContextBuilder
+from router import Backend, ModelRouter
+from singleflight import SingleFlight
+from citations import CitationRewriter
+from law_search import load_law_corpus
+from retrieval import DEFAULT_ACTS, StatuteRetriever, format_sections, select_sections
+from metrics import REGISTRY, STAGE_SECONDS, observe_response
+from providers import hf_chat, hf_text_generation
+from provider_models import ProviderChatModel, ProviderLLM
+
+# Load .env from the root directory (main.py has usually done this already)
+env_path = pathlib.Path(__file__).parent.parent / ".env"
+load_dotenv(dotenv_path=env_path)
+
+# Hugging Face Configuration
+HF_TOKEN = os.getenv("HF_TOKEN")
+MODEL_ID = os.getenv("HF_MODEL_ID", "AdaptLLM/law-LLM")
+FALLBACK_MODEL_ID = "meta-llama/Meta-Llama-3-8B-Instruct"
+PRIMARY_MAX_NEW_TOKENS = 500
+FALLBACK_MAX_NEW_TOKENS = 1000
+# Serve the models from a dedicated (TGI-compatible) endpoint instead of the
+# Hugging Face router, e.g. the stub server used by benchmarks/load_test.py
+HF_ENDPOINT_URL = os.getenv("HF_ENDPOINT_URL")
+HF_FALLBACK_ENDPOINT_URL = os.getenv("HF_FALLBACK_ENDPOINT_URL") or HF_ENDPOINT_URL
+# Per-request upstream limits (seconds between bytes / attempts after the first).
+# Kept short on purpose: the router falls back or hedges on top of these.
+HF_TIMEOUT = float(os.getenv("HF_TIMEOUT", "120"))
+HF_RETRIES = int(os.getenv("HF_RETRIES", "1"))
+
+# --- LangChain Setup ---
+
+# 1. Define Models
+# Both go through the shared async provider layer (providers.py): pooled
+# keep-alive connections, timeouts and retries with backoff.
+# Primary Model (Base Model) - Treated as text generation
+llm_primary = ProviderLLM(
+    provider=hf_text_generation(
+        MODEL_ID,
+        HF_TOKEN,
+        HF_ENDPOINT_URL,
+        timeout=HF_TIMEOUT,
+        retries=HF_RETRIES,
+        defaults={"max_new_tokens": PRIMARY_MAX_NEW_TOKENS, "temperature": 0.7, "repetition_penalty": 1.15},
+    ),
+    # Generate through the streaming API so tokens reach callbacks
+    # (and /api/legal-advice/stream) as soon as they are produced
+    streaming=True,
+)
+
+# Fallback Model (Chat Model)
+llm_fallback = ProviderChatModel(
+    provider=hf_chat(
+        FALLBACK_MODEL_ID,
+        HF_TOKEN,
+        HF_FALLBACK_ENDPOINT_URL,
+        timeout=HF_TIMEOUT,
+        retries=HF_RETRIES,
+        defaults={"max_tokens": FALLBACK_MAX_NEW_TOKENS, "temperature": 0.7},
+    )
+)
+
+# 2. Define Prompts
+SYSTEM_PROMPT = """You are a legal AI specialized strictly in the NEW Indian criminal law framework effective July 2024.
+
+CRITICAL RULES:
+1. You MUST use Bharatiya Nyaya Sanhita, 2023 (BNS).
+2. You MUST NOT cite IPC sections under any circumstance.
+3. If IPC section numbers appear in your reasoning, you must replace them with corresponding BNS sections before answering.
+4. If unsure about BNS section number, state: "Section number requires verification under BNS" instead of defaulting to IPC.
+5. Always format citation as:
+   Section __, Bharatiya Nyaya Sanhita, 2023.
+
+Also reference:
+- Bharatiya Nagarik Suraksha Sanhita, 2023 (BNSS)
+- Bharatiya Sakshya Adhiniyam, 2023 (BSA)
+
+Never mention IPC unless the user explicitly asks for comparison.
+"""
+
+# Introduces the statute sections retrieved for the question
+STATUTES_HEADER = "Relevant sections from the statute database (cite these where they apply):"
+
+USER_PROMPT_TEMPLATE = "Hypothetical Legal Scenario for Analysis: '{input}'. Provide a strict legal analysis of the relevant Indian laws, BNS sections, and potential court interpretations for this scenario. offer personal advice, but explain the law."
+
+# Template for Chat Models
+chat_prompt = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT),
+    MessagesPlaceholder("history", optional=True),
+    MessagesPlaceholder("statutes", optional=True),
+    ("user", USER_PROMPT_TEMPLATE)
+])
+
+# Template for Base Models (Manual formatting)
+def format_for_base_model(input_dict):
+    academic_query = USER_PROMPT_TEMPLATE.format(input=input_dict["input"])
+    history = input_dict.get("history_text", "")
+    statutes = input_dict.get("statutes_text", "")
+    return f"### System:\n{SYSTEM_PROMPT}\n\n{history}{statutes}### User:\n{academic_query}\n\n### Assistant:\n"
+
+# 3. Define Chains with Fallback
+# Chain for Base Model
+chain_primary = (
+    format_for_base_model 
+    | llm_primary
+)
+
+# Chain for Chat Model
+chain_fallback = (
+    chat_prompt 
+    | llm_fallback
+)
+
+# Combined chain: routes to the primary with the fallback behind it, skips a
+# backend whose circuit is open and hedges slow primary calls (see router.py)
+def _router_backend(name: str, runnable) -> Backend:
+    return Backend(
+        name,
+        runnable,
+        window=int(os.getenv("ROUTER_WINDOW", "100")),
+        min_samples=int(os.getenv("ROUTER_MIN_SAMPLES", "20")),
+        failure_threshold=int(os.getenv("ROUTER_FAILURE_THRESHOLD", "5")),
+        error_rate_threshold=float(os.getenv("ROUTER_ERROR_RATE", "0.5")),
+        open_seconds=float(os.getenv("ROUTER_OPEN_SECONDS", "30")),
+    )
+
+final_chain = ModelRouter(
+    [_router_backend("primary", chain_primary), _router_backend("fallback", chain_fallback)],
+    hedge=os.getenv("ROUTER_HEDGE", "1").lower() in ("1", "true", "yes"),
+    hedge_quantile=float(os.getenv("ROUTER_HEDGE_QUANTILE", "0.95")),
+    hedge_initial_delay=float(os.getenv("ROUTER_HEDGE_INITIAL_DELAY", "15")),
+    hedge_min_delay=float(os.getenv("ROUTER_HEDGE_MIN_DELAY", "1")),
+)
+
+# Statute sections retrieved for each question and put into the prompt.
+# STATUTE_INDEX_DIR holds the memory-mapped index from build_statute_index.py;
+# without it the corpus is embedded in memory when the pipeline is built.
+STATUTE_INDEX_DIR = os.getenv("STATUTE_INDEX_DIR") or str(pathlib.Path(__file__).parent / "data" / "statute_index")
+LAW_DATA_PATH = os.getenv("LAW_DATA_PATH") or str(pathlib.Path(__file__).parent / "data" / "laws.json")
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "3"))
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0.15"))
+statute_retriever = StatuteRetriever.open(
+    STATUTE_INDEX_DIR,
+    select_sections(load_law_corpus(LAW_DATA_PATH), os.getenv("RETRIEVAL_ACTS", DEFAULT_ACTS)),
+)
+
+# Cap on concurrent upstream model calls. Requests beyond the cap wait in a
+# bounded queue; once that is full they are rejected with 503.
+upstream_limiter = UpstreamLimiter(
+    max_concurrent=int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+    max_waiting=int(os.getenv("LLM_MAX_QUEUE", "256")),
+    wait_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "30")),
+)
+
+# Exact-match answer cache in front of final_chain. Keys include the model IDs
+# and a fingerprint of the prompts, so prompt or model changes start cold.
+# Set ANSWER_CACHE_PATH to a SQLite file to persist/share it across workers.
+PROMPT_VERSION = prompt_version(SYSTEM_PROMPT, USER_PROMPT_TEMPLATE, STATUTES_HEADER, statute_retriever.fingerprint)
+answer_cache = AnswerCache(
+    namespace=f"{MODEL_ID}|{FALLBACK_MODEL_ID}|{PROMPT_VERSION}",
+    max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2048")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "86400")),
+    path=os.getenv("ANSWER_CACHE_PATH") or None,
+)
+
+# Near-duplicate cache behind the exact one: paraphrased questions whose
+# hashed embedding is within SEMANTIC_CACHE_THRESHOLD cosine similarity of a
+# cached question, with the same negations and numbers, reuse its answer.
+# SEMANTIC_CACHE_DIR persists the vectors as a matrix each worker maps
+# copy-on-write (see semantic_cache.py).
+semantic_cache = SemanticCache(
+    namespace=answer_cache.namespace,
+    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "4096")),
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9")),
+    dim=int(os.getenv("SEMANTIC_CACHE_DIM", "1024")),
+    path=os.getenv("SEMANTIC_CACHE_DIR") or None,
+)
+
+# Identical first-turn questions that arrive while one is already being
+# generated share that generation instead of each calling the model
+inflight = SingleFlight()
+
+# Scrape-time gauges for the upstream limiter (the hot path stays untouched)
+REGISTRY.gauge("legally_upstream_in_flight", "Upstream model calls holding a slot",
+               function=lambda: upstream_limiter.in_flight)
+REGISTRY.gauge("legally_upstream_waiting", "Requests queued for an upstream slot",
+               function=lambda: upstream_limiter.waiting)
+
+# Old IPC/CrPC/Evidence Act citations in answers are rewritten to their
+# BNS/BNSS/BSA equivalents (CITATION_REWRITE=rewrite|flag|off)
+citation_rewriter = CitationRewriter(os.getenv("CITATION_REWRITE", "rewrite"))
+# Compile the matcher now rather than on the first answer
+citation_rewriter.automaton
+
+# --- LangGraph Setup ---
+
+class State(TypedDict):
+    # Messages have the type "list" to support appending new messages
+    # The `add_messages` function handles the merge logic
+    messages: Annotated[List, add_messages]
+    # We store the latest user input separately for the prompt template
+    latest_input: str
+    # Rolling summary of turns that fell out of the verbatim context window,
+    # and the id of the last message folded into it
+    summary: str
+    summarized_upto: Optional[str]
+    # Ids of the statute sections retrieved for latest_input
+    statutes: List[str]
+
+# Thread history sent with each request: recent turns verbatim, older turns as
+# a rolling summary, sized separately for each model's window and format
+context_builder = ContextBuilder(
+    recent_turns=int(os.getenv("CONTEXT_RECENT_TURNS", "3")),
+    summary_tokens=int(os.getenv("CONTEXT_SUMMARY_TOKENS", "200")),
+)
+PRIMARY_BUDGET = ContextBudget(
+    "primary",
+    context_window=int(os.getenv("PRIMARY_CONTEXT_WINDOW", "2048")),
+    max_new_tokens=PRIMARY_MAX_NEW_TOKENS,
+    max_history_tokens=int(os.getenv("PRIMARY_HISTORY_TOKENS", "600")),
+)
+FALLBACK_BUDGET = ContextBudget(
+    "fallback",
+    context_window=int(os.getenv("FALLBACK_CONTEXT_WINDOW", "8192")),
+    max_new_tokens=FALLBACK_MAX_NEW_TOKENS,
+    max_history_tokens=int(os.getenv("FALLBACK_HISTORY_TOKENS", "2000")),
+)
+
+def build_chain_input(latest_input: str, summary: str, recent: list, statutes: Optional[list] = None) -> dict:
+    """Inputs for final_chain: the question, retrieved sections and history for both prompt formats"""
+    statutes_block = f"{STATUTES_HEADER}\n{format_sections(statutes)}" if statutes else ""
+    fixed_tokens = context_builder.tokens(
+        SYSTEM_PROMPT + statutes_block + USER_PROMPT_TEMPLATE.format(input=latest_input)
+    )
+    primary = context_builder.select(summary, recent, PRIMARY_BUDGET, fixed_tokens)
+    fallback = context_builder.select(summary, recent, FALLBACK_BUDGET, fixed_tokens)
+    return {
+        "input": latest_input,
+        "history_text": primary.as_base_prompt(),
+        "history": fallback.as_chat_messages(),
+        "statutes_text": f"### Relevant Sections:\n{statutes_block}\n\n" if statutes_block else "",
+        "statutes": [SystemMessage(content=statutes_block)] if statutes_block else [],
+    }
+
+# Per-thread history cap: once a thread holds more than this many messages the
+# oldest ones are removed from its state (and from future checkpoints)
+MAX_THREAD_MESSAGES = int(os.getenv("CHECKPOINT_MAX_MESSAGES", "40"))
+
+def _trim_history(messages: list) -> list:
+    # +1 for the reply being added by this step
+    excess = len(messages) + 1 - MAX_THREAD_MESSAGES
+    if excess <= 0:
+        return []
+    return [RemoveMessage(id=m.id) for m in messages[:excess]]
+
+async def retrieve_statutes(state: State):
+    # Scoring a large memory-mapped index takes a few ms of CPU; keep it off the loop
+    with STAGE_SECONDS.time("retrieval"):
+        hits = await asyncio.to_thread(
+            statute_retriever.search, state["latest_input"], RETRIEVAL_TOP_K, RETRIEVAL_MIN_SCORE
+        )
+    return {"statutes": [record["id"] for record, _ in hits]}
+
+def _cached_answer(message: str) -> Optional[str]:
+    cached = answer_cache.get(message)
+    if cached is None:
+        cached = semantic_cache.get(message)
+    return cached
+
+def _store_answer(message: str, answer: str):
+    answer_cache.set(message, answer)
+    semantic_cache.set(message, answer)
+
+async def call_model(state: State, config: RunnableConfig):
+    latest_input = state["latest_input"]
+    # Everything before the message that was just added for this request
+    history = state["messages"][:-1]
+
+    # Cached answers are only valid when there is no earlier context
+    if not history:
+        with STAGE_SECONDS.time("cache_lookup"):
+            # SQLite reads and the similarity scan block; keep them off the loop
+            cached = await asyncio.to_thread(_cached_answer, latest_input)
+        if cached is not None:
+            # Entries written before the rewriter existed get rewritten too
+            cached = citation_rewriter.rewrite(cached)
+            return {"messages": _trim_history(state["messages"]) + [AIMessage(content=cached)]}
+
+    with STAGE_SECONDS.time("prompt_build"):
+        older, recent = context_builder.split(history)
+        summary, summarized_upto = context_builder.fold(
+            state.get("summary") or "", state.get("summarized_upto"), older
+        )
+        statutes = [statute_retriever.get(i) for i in state.get("statutes") or []]
+        chain_input = build_chain_input(latest_input, summary, recent, [r for r in statutes if r])
+
+    async def generate() -> str:
+        # Async all the way down: waiting on Hugging Face holds a slot, not a thread.
+        # Pass the run config through so streaming callbacks see the model tokens.
+        queued_at = time.perf_counter()
+        async with upstream_limiter.slot():
+            STAGE_SECONDS.labels("upstream_queue").observe(time.perf_counter() - queued_at)
+            response = await final_chain.ainvoke(chain_input, config=config)
+
+        # Handle response type (string vs AIMessage)
+        if hasattr(response, "content"):
+            content = response.content
+        else:
+            content = str(response)
+        with STAGE_SECONDS.time("postprocess"):
+            content = citation_rewriter.rewrite(content)
+        observe_response(content)
+
+        if not history:
+            # Commits (and the periodic semantic cache save) write to disk
+            await asyncio.to_thread(_store_answer, latest_input, content)
+        return content
+
+    if history:
+        content = await generate()
+    else:
+        # Without history the prompt depends only on the question, so
+        # concurrent identical questions can share one upstream call
+        content = await inflight.do(answer_cache.key(latest_input), generate)
+
+    return {
+        # Stored as an AI message so history replays with the right roles
+        "messages": _trim_history(state["messages"]) + [AIMessage(content=content)],
+        "summary": summary,
+        "summarized_upto": summarized_upto,
+    }
+
+# Define the graph
+workflow = StateGraph(State)
+workflow.add_node("retrieve_statutes", retrieve_statutes)
+workflow.add_node("legal_advisor", call_model)
+workflow.add_edge(START, "retrieve_statutes")
+workflow.add_edge("retrieve_statutes", "legal_advisor")
+workflow.add_edge("legal_advisor", END)
+
+# Add memory for statefulness. Thread state is bounded (checkpoints per
+# thread, idle TTL, thread count) and can live in a local SQLite file that
+# survives restarts and is shared by workers (CHECKPOINT_BACKEND=sqlite).
+memory = build_checkpointer(
+    backend=os.getenv("CHECKPOINT_BACKEND", "memory"),
+    path=os.getenv("CHECKPOINT_PATH") or None,
+    max_checkpoints=int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "6")),
+    idle_ttl=float(os.getenv("CHECKPOINT_THREAD_TTL", "86400")),
+    max_threads=int(os.getenv("CHECKPOINT_MAX_THREADS", "10000")),
+)
+app_graph = workflow.compile(checkpointer=memory)
+
+
+def stats() -> dict:
+    """Runtime counters for the pipeline components"""
+    return {
+        "upstream": upstream_limiter.stats(),
+        "router": final_chain.state(),
+        "coalescing": inflight.stats(),
+        "answer_cache": answer_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "citations": citation_rewriter.stats(),
+        "retrieval": statute_retriever.stats(),
+        "checkpoints": memory.stats(),
+    }
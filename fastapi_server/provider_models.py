@@ -0,0 +1,96 @@
+"""
+LangChain adapters over providers.py for the pipeline's chains.
+
+ProviderLLM wraps a provider as a text-completion LLM (the base model's
+"### System/User/Assistant" prompt) and ProviderChatModel as a chat model.
+Both stream through the provider and report each token to the callback
+manager, so astream_events - and /api/legal-advice/stream - see
+on_llm_stream / on_chat_model_stream events as tokens arrive.
+
+The pipeline only calls these asynchronously; the sync methods run the
+async ones on a temporary event loop for completeness.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel, LLM
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult, GenerationChunk
+from pydantic import ConfigDict
+
+from providers import Provider
+
+ROLES = {"human": "user", "ai": "assistant", "system": "system", "tool": "tool"}
+
+
+def to_provider_messages(messages: list[BaseMessage]) -> list[dict]:
+    return [
+        {"role": ROLES.get(m.type, "user"), "content": m.content if isinstance(m.content, str) else str(m.content)}
+        for m in messages
+    ]
+
+
+class ProviderLLM(LLM):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    provider: Provider
+    # Generate through the streaming API so tokens reach callbacks as they arrive
+    streaming: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "legally-provider"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"provider": self.provider.name, "url": self.provider.url}
+
+    def _call(self, prompt: str, stop: Optional[list[str]] = None,
+              run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        return asyncio.run(self.provider.complete(prompt, stop=stop, **kwargs))
+
+    async def _acall(self, prompt: str, stop: Optional[list[str]] = None,
+                     run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        if not self.streaming:
+            return await self.provider.complete(prompt, stop=stop, **kwargs)
+        return "".join([chunk.text async for chunk in self._astream(prompt, stop, run_manager, **kwargs)])
+
+    async def _astream(self, prompt: str, stop: Optional[list[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        async for text in self.provider.stream(prompt, stop=stop, **kwargs):
+            chunk = GenerationChunk(text=text)
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+
+class ProviderChatModel(BaseChatModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    provider: Provider
+
+    @property
+    def _llm_type(self) -> str:
+        return "legally-provider-chat"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"provider": self.provider.name, "url": self.provider.url, "model": self.provider.model}
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        return asyncio.run(self._agenerate(messages, stop, **kwargs))
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        text = await self.provider.complete(to_provider_messages(messages), stop=stop, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _astream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        async for text in self.provider.stream(to_provider_messages(messages), stop=stop, **kwargs):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
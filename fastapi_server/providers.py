@@ -0,0 +1,267 @@
+"""
+Async LLM providers shared by fastapi_server and admin-backend.
+
+Every provider takes the same input - a prompt string or a list of
+{"role", "content"} messages - and exposes
+
+    await provider.complete(prompt, **params) -> str
+    async for text in provider.stream(prompt, **params): ...
+
+so a prompt can be sent to Hugging Face, Groq or the local stub server
+(benchmarks/stub_llm.py) without changing the caller. Two wire formats
+cover all of them:
+
+  ChatCompletionsProvider   OpenAI-style /chat/completions (Groq, the
+                            Hugging Face router, TGI's /v1 API, the stub)
+  TextGenerationProvider    Hugging Face text-generation (TGI) for base
+                            models that take a raw prompt
+
+Requests go through one pooled keep-alive httpx.AsyncClient per event loop,
+so calls reuse TCP/TLS connections instead of opening one per request.
+Each provider has its own timeouts and retries: connection errors,
+timeouts and 408/425/429/5xx responses are retried with exponential
+backoff and full jitter (honouring Retry-After). A stream is only retried
+before its first token arrives; after that the error is raised.
+"""
+import asyncio
+import json
+import os
+import random
+import weakref
+from typing import AsyncIterator, Optional, Union
+
+import httpx
+
+from metrics import REGISTRY
+
+Prompt = Union[str, list]
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+HF_ROUTER_URL = "https://router.huggingface.co"
+GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "legally_upstream_retries",
+    "Upstream model requests retried after a transient failure, by provider",
+    ["provider"],
+)
+
+
+class ProviderError(RuntimeError):
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+# ---------- Shared connection pool ----------
+# httpx clients are bound to the event loop that opened their connections,
+# so there is one client per loop (in practice: the server's loop)
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "30")),
+)
+
+
+def shared_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(limits=POOL_LIMITS, headers={"User-Agent": "legally-llm-client"})
+        _clients[loop] = client
+    return client
+
+
+async def aclose_shared_client():
+    """Close this loop's pooled connections (call on server shutdown)"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+def messages_to_prompt(messages: list) -> str:
+    """Flatten chat messages for a base model, in the pipeline's ### format"""
+    parts = [f"### {m['role'].capitalize()}:\n{m['content']}\n\n" for m in messages]
+    return "".join(parts) + "### Assistant:\n"
+
+
+class Provider:
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        timeout: float = 60,
+        connect_timeout: float = 5,
+        retries: int = 2,
+        backoff: float = 0.5,
+        max_backoff: float = 8,
+        defaults: Optional[dict] = None,
+    ):
+        self.name = name
+        self.url = url
+        self.api_key = api_key
+        self.model = model
+        # Read/write timeouts apply between bytes, so long streams are fine
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.defaults = dict(defaults or {})
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r}, {self.url!r}, model={self.model!r})"
+
+    def _headers(self) -> dict:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def payload(self, prompt: Prompt, params: dict, stream: bool) -> dict:
+        raise NotImplementedError
+
+    def parse(self, body) -> str:
+        raise NotImplementedError
+
+    def parse_chunk(self, chunk: dict) -> str:
+        raise NotImplementedError
+
+    def _delay(self, attempt: int, error: ProviderError) -> float:
+        if error.retry_after is not None:
+            return min(error.retry_after, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def _send(self, payload: dict, stream: bool) -> httpx.Response:
+        """POST with retries; returns a successful (possibly unread) response"""
+        client = shared_client()
+        attempt = 0
+        while True:
+            try:
+                request = client.build_request("POST", self.url, json=payload, headers=self._headers(), timeout=self.timeout)
+                response = await client.send(request, stream=stream)
+            except httpx.TransportError as e:  # includes timeouts
+                error = ProviderError(f"{self.name} request failed: {type(e).__name__}: {e}", retryable=True)
+                error.__cause__ = e
+            else:
+                if response.status_code < 400:
+                    return response
+                body = (await response.aread()).decode("utf-8", errors="replace")[:500]
+                await response.aclose()
+                error = ProviderError(
+                    f"{self.name} API error: {response.status_code} {body}".strip(),
+                    status=response.status_code,
+                    retryable=response.status_code in RETRYABLE_STATUS,
+                    retry_after=_retry_after(response),
+                )
+            if attempt >= self.retries or not error.retryable:
+                raise error
+            delay = self._delay(attempt, error)
+            print(f"{error}; retrying in {delay:.2f}s ({attempt + 1}/{self.retries})")
+            UPSTREAM_RETRIES.labels(self.name).inc()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def complete(self, prompt: Prompt, **params) -> str:
+        response = await self._send(self.payload(prompt, params, stream=False), stream=False)
+        try:
+            return self.parse(response.json())
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise ProviderError(f"{self.name} returned an unexpected response: {e}") from e
+
+    async def stream(self, prompt: Prompt, **params) -> AsyncIterator[str]:
+        response = await self._send(self.payload(prompt, params, stream=True), stream=True)
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    continue
+                if isinstance(chunk, dict) and chunk.get("error"):
+                    raise ProviderError(f"{self.name} stream error: {chunk['error']}")
+                text = self.parse_chunk(chunk)
+                if text:
+                    yield text
+        except httpx.TransportError as e:
+            raise ProviderError(f"{self.name} stream interrupted: {type(e).__name__}: {e}") from e
+        finally:
+            await response.aclose()
+
+
+class ChatCompletionsProvider(Provider):
+    """OpenAI-compatible chat completions"""
+
+    def payload(self, prompt: Prompt, params: dict, stream: bool) -> dict:
+        messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+        payload = {**self.defaults, **{k: v for k, v in params.items() if v is not None}}
+        payload.update({"messages": messages, "stream": stream})
+        if self.model:
+            payload["model"] = self.model
+        return payload
+
+    def parse(self, body) -> str:
+        return body["choices"][0]["message"]["content"] or ""
+
+    def parse_chunk(self, chunk: dict) -> str:
+        choices = chunk.get("choices") or [{}]
+        return (choices[0].get("delta") or {}).get("content") or ""
+
+
+class TextGenerationProvider(Provider):
+    """Hugging Face text-generation (TGI) with a raw prompt"""
+
+    def payload(self, prompt: Prompt, params: dict, stream: bool) -> dict:
+        parameters = {**self.defaults, **{k: v for k, v in params.items() if v is not None}}
+        if "max_tokens" in parameters:
+            parameters["max_new_tokens"] = parameters.pop("max_tokens")
+        parameters.setdefault("return_full_text", False)
+        inputs = prompt if isinstance(prompt, str) else messages_to_prompt(prompt)
+        return {"inputs": inputs, "parameters": parameters, "stream": stream}
+
+    def parse(self, body) -> str:
+        if isinstance(body, list):
+            body = body[0]
+        return body["generated_text"]
+
+    def parse_chunk(self, chunk: dict) -> str:
+        token = chunk.get("token") or {}
+        return "" if token.get("special") else token.get("text") or ""
+
+
+# ---------- Constructors for the configured upstreams ----------
+def hf_text_generation(model_id: str, token: Optional[str], endpoint_url: Optional[str] = None, **kwargs) -> TextGenerationProvider:
+    """A Hugging Face model served for text-generation, or a dedicated TGI endpoint"""
+    url = endpoint_url or f"{HF_ROUTER_URL}/hf-inference/models/{model_id}"
+    return TextGenerationProvider(f"hf:{model_id}", url, api_key=token, **kwargs)
+
+
+def hf_chat(model_id: str, token: Optional[str], endpoint_url: Optional[str] = None, **kwargs) -> ChatCompletionsProvider:
+    """A Hugging Face chat model via the router's (or a TGI endpoint's) OpenAI API"""
+    if endpoint_url:
+        return ChatCompletionsProvider(f"hf:{model_id}", endpoint_url.rstrip("/") + "/v1/chat/completions",
+                                       api_key=token, model="tgi", **kwargs)
+    return ChatCompletionsProvider(f"hf:{model_id}", f"{HF_ROUTER_URL}/v1/chat/completions",
+                                   api_key=token, model=model_id, **kwargs)
+
+
+def groq_chat(model: str, api_key: Optional[str], url: str = GROQ_API_URL, **kwargs) -> ChatCompletionsProvider:
+    return ChatCompletionsProvider("groq", url, api_key=api_key, model=model, **kwargs)
@@ -0,0 +1,87 @@
+"""
+Pre-rendered JSON responses for endpoints whose data only changes on deploy.
+
+The first request for a given key (e.g. a browse page or a search query)
+renders the payload to JSON bytes once; later requests reuse the bytes and
+their strong ETag. Requests whose If-None-Match matches get an empty
+304 Not Modified, and every response carries Cache-Control so browsers and
+the CDN can absorb repeat traffic without reaching a worker.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from fastapi import Request, Response
+
+
+def render_json(payload: Any) -> bytes:
+    # Same encoding as FastAPI's JSONResponse
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison, so W/"x" matches "x" """
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class RenderedResponses:
+    def __init__(self, max_entries: int = 2048, cache_control: str = "public, max-age=300"):
+        self.max_entries = max(1, max_entries)
+        self.cache_control = cache_control
+        self._entries: "OrderedDict[Hashable, tuple[bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+        self.not_modified = 0
+
+    def rendered(self, key: Hashable, render: Callable[[], Any]) -> tuple[bytes, str]:
+        """(body, etag) for key, rendering the payload on first use"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        # Rendering happens outside the lock; a concurrent first request for
+        # the same key just renders the same bytes twice
+        body = render_json(render())
+        entry = (body, strong_etag(body))
+        with self._lock:
+            self.renders += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def respond(self, request: Request, key: Hashable, render: Callable[[], Any]) -> Response:
+        body, etag = self.rendered(key, render)
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "renders": self.renders,
+                "not_modified": self.not_modified,
+            }
@@ -0,0 +1,173 @@
+"""
+Statute retrieval for the legal advice prompt.
+
+Sections of the statute corpus are embedded with the same CPU hashing
+embedder as the semantic cache and stored as one L2-normalised float32
+matrix (`vectors.npy`) plus a JSON sidecar with the section records
+(`sections.json`). The matrix is memory-mapped read-only, so workers share
+the OS page cache instead of each holding a copy, and a query is a
+matrix-vector product followed by an argpartition top-k.
+
+The index is produced offline by build_statute_index.py. When it is
+missing, StatuteRetriever.open() embeds the corpus in memory instead.
+"""
+import hashlib
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+from semantic_cache import HashingEmbedder
+
+VECTORS_FILE = "vectors.npy"
+SECTIONS_FILE = "sections.json"
+
+# Acts indexed by default: the prompt should only ever point the model at
+# the current criminal statutes, not the repealed ones
+DEFAULT_ACTS = "BNS,BNSS,BSA"
+RECORD_FIELDS = ("id", "act", "act_code", "section", "title", "summary")
+
+# Rows scored per matrix product in search_batch; bounds the score buffer
+# to BATCH_ROWS x len(queries) floats for very large indexes
+BATCH_ROWS = 65536
+
+
+def select_sections(corpus: list[dict], acts: str = DEFAULT_ACTS) -> list[dict]:
+    """Corpus records for the given comma-separated act codes ("" = all)"""
+    wanted = {a.strip().lower() for a in acts.split(",") if a.strip()}
+    return [
+        {field: doc.get(field) for field in RECORD_FIELDS}
+        for doc in corpus
+        if not wanted or (doc.get("act_code") or "").lower() in wanted
+    ]
+
+
+def section_text(record: dict) -> str:
+    """Text embedded for a section: citation, title and summary"""
+    return " ".join(filter(None, [
+        record.get("act_code"), record.get("section"), record.get("title"), record.get("summary"),
+    ]))
+
+
+def section_citation(record: dict) -> str:
+    return " ".join(filter(None, [record.get("section"), record.get("act_code")]))
+
+
+def embed_sections(records: list[dict], dim: int) -> np.ndarray:
+    embedder = HashingEmbedder(dim)
+    matrix = np.zeros((len(records), dim), dtype=np.float32)
+    for row, record in enumerate(records):
+        matrix[row] = embedder.embed(section_text(record))
+    return matrix
+
+
+def records_fingerprint(records: list[dict], dim: int) -> str:
+    payload = json.dumps({"dim": dim, "records": records}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def write_index(path: str, records: list[dict], matrix: np.ndarray):
+    """Write a matrix and its records in the layout StatuteRetriever.load() reads"""
+    os.makedirs(path, exist_ok=True)
+    dim = matrix.shape[1]
+    np.save(os.path.join(path, VECTORS_FILE), matrix.astype(np.float32, copy=False))
+    with open(os.path.join(path, SECTIONS_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "dim": dim,
+            "fingerprint": records_fingerprint(records, dim),
+            "records": records,
+        }, f, ensure_ascii=False)
+
+
+class StatuteRetriever:
+    def __init__(self, records: list[dict], matrix: np.ndarray, fingerprint: str):
+        self.records = records
+        self.matrix = matrix
+        self.fingerprint = fingerprint
+        self.embedder = HashingEmbedder(matrix.shape[1])
+        self._by_id = {record.get("id"): record for record in records}
+
+    @classmethod
+    def load(cls, path: str) -> "StatuteRetriever":
+        with open(os.path.join(path, SECTIONS_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        matrix = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        if matrix.shape != (len(meta["records"]), meta["dim"]):
+            raise ValueError(f"Statute index at {path} has mismatched vectors and records")
+        return cls(meta["records"], matrix, meta["fingerprint"])
+
+    @classmethod
+    def open(cls, path: Optional[str], corpus: list[dict], dim: int = 1024) -> "StatuteRetriever":
+        """The prebuilt index at `path` if it was built from `corpus` at `dim`, else an in-memory one"""
+        fingerprint = records_fingerprint(corpus, dim)
+        if path and os.path.exists(os.path.join(path, SECTIONS_FILE)):
+            try:
+                retriever = cls.load(path)
+                if retriever.fingerprint == fingerprint:
+                    return retriever
+                print(f"Statute index at {path} is stale (corpus or dim changed since it was built); "
+                      f"embedding corpus in memory, rerun build_statute_index.py")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Statute index at {path} could not be loaded ({e}); embedding corpus in memory")
+        matrix = embed_sections(corpus, dim)
+        return cls(corpus, matrix, fingerprint)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, record_id: str) -> Optional[dict]:
+        return self._by_id.get(record_id)
+
+    def stats(self) -> dict:
+        return {
+            "sections": len(self.records),
+            "dim": self.matrix.shape[1],
+            "memory_mapped": isinstance(self.matrix, np.memmap),
+            "fingerprint": self.fingerprint[:12],
+        }
+
+    def search_batch(self, queries: list[str], k: int = 3, min_score: float = 0.0) -> list[list[tuple[dict, float]]]:
+        """Top-k (record, cosine score) per query, best first"""
+        if not queries or not len(self.records):
+            return [[] for _ in queries]
+        q = np.stack([self.embedder.embed(query) for query in queries])  # (n_queries, dim)
+        k = min(k, len(self.records))
+
+        # Running top-k per query over blocks of rows of the (memory-mapped) matrix
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self.records), BATCH_ROWS):
+            block = np.asarray(self.matrix[start:start + BATCH_ROWS])
+            scores = q @ block.T  # (n_queries, rows)
+            kk = min(k, scores.shape[1])
+            top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+            best_rows = np.concatenate([best_rows, top + start], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        results = []
+        for i in range(len(queries)):
+            hits = []
+            for j in order[i]:
+                score = float(best_scores[i, j])
+                if score < min_score:
+                    break
+                hits.append((self.records[int(best_rows[i, j])], score))
+            results.append(hits)
+        return results
+
+    def search(self, query: str, k: int = 3, min_score: float = 0.0) -> list[tuple[dict, float]]:
+        return self.search_batch([query], k, min_score)[0]
+
+
+def format_sections(records: list[dict]) -> str:
+    """Prompt block listing retrieved sections, one per line"""
+    return "\n".join(
+        f"- {section_citation(r)}: {r.get('title', '')}. {r.get('summary', '')}".strip()
+        for r in records
+    )
@@ -0,0 +1,294 @@
+"""
+Latency-aware routing between the primary and fallback model chains.
+
+Replaces `chain_primary.with_fallbacks([chain_fallback])`. For each backend
+the router keeps a rolling window of latencies and outcomes and a circuit
+breaker:
+
+  closed    - normal operation
+  open      - too many recent failures; the backend is skipped for
+              `open_seconds`
+  half_open - after the cool-down one probe request is let through; success
+              closes the circuit, failure opens it again
+
+Requests go to the first backend whose circuit allows it. If that backend
+fails, the next one is tried (plain fallback). With hedging enabled, when the
+backend has not answered by its p95 latency (or `hedge_initial_delay` until
+enough samples exist) the next backend is started as well and whichever
+finishes first wins; the other call is cancelled.
+
+Each call runs with `metadata["model_backend"]` set to the backend name, and
+the router dispatches a "model_router" custom event when a backend fails or
+wins, so streaming consumers can tell which tokens belong to the answer.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from langchain_core.callbacks.manager import adispatch_custom_event
+
+from metrics import FALLBACKS, STAGE_SECONDS, UPSTREAM_ERRORS
+
+ROUTER_EVENT = "model_router"
+
+
+class Backend:
+    def __init__(
+        self,
+        name: str,
+        runnable,
+        window: int = 100,
+        min_samples: int = 20,
+        failure_threshold: int = 5,
+        error_rate_threshold: float = 0.5,
+        open_seconds: float = 30,
+    ):
+        self.name = name
+        self.runnable = runnable
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.open_seconds = open_seconds
+
+        self.latencies = deque(maxlen=window)  # seconds, successful calls only
+        self.outcomes = deque(maxlen=window)  # True = success
+
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.cancelled = 0
+        self.in_flight = 0
+        self.hedges_started = 0
+        self.wins = 0
+        self.times_opened = 0
+
+    # --- circuit breaker ---
+
+    def allow(self, now: float) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and now - self.opened_at >= self.open_seconds:
+            self.state = "half_open"
+        return self.state == "half_open" and not self.probe_in_flight
+
+    def begin_call(self):
+        self.calls += 1
+        self.in_flight += 1
+        if self.state == "half_open":
+            self.probe_in_flight = True
+
+    def _open(self, now: float):
+        if self.state != "open":
+            self.times_opened += 1
+        self.state = "open"
+        self.opened_at = now
+        self.probe_in_flight = False
+
+    def error_rate(self) -> Optional[float]:
+        if not self.outcomes:
+            return None
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def record_success(self, latency: float):
+        self.successes += 1
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        if self.state != "closed":
+            self.state = "closed"
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        now = time.monotonic()
+        self.failures += 1
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        if self.state == "half_open":
+            self._open(now)
+            return
+        rate = self.error_rate()
+        if self.consecutive_failures >= self.failure_threshold or (
+            len(self.outcomes) >= self.min_samples and rate is not None and rate >= self.error_rate_threshold
+        ):
+            self._open(now)
+
+    def record_cancel(self, elapsed: float):
+        # A hedged call that lost: it took at least `elapsed`, so keep that as a
+        # lower-bound sample; otherwise a slow backend's p95 would never rise
+        self.cancelled += 1
+        self.latencies.append(elapsed)
+        if self.state == "half_open":
+            self.probe_in_flight = False
+
+    # --- latency ---
+
+    def latency_quantile(self, q: float) -> Optional[float]:
+        if len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> dict:
+        p50 = self.latency_quantile(0.5)
+        p95 = self.latency_quantile(0.95)
+        rate = self.error_rate()
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+            "in_flight": self.in_flight,
+            "wins": self.wins,
+            "hedges_started": self.hedges_started,
+            "times_opened": self.times_opened,
+            "consecutive_failures": self.consecutive_failures,
+            "error_rate": round(rate, 4) if rate is not None else None,
+            "latency_p50_s": round(p50, 3) if p50 is not None else None,
+            "latency_p95_s": round(p95, 3) if p95 is not None else None,
+            "samples": len(self.latencies),
+        }
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        backends: list,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        hedge_initial_delay: Optional[float] = 15.0,
+        hedge_min_delay: float = 1.0,
+    ):
+        if not backends:
+            raise ValueError("ModelRouter needs at least one backend")
+        self.backends = backends
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_initial_delay = hedge_initial_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.requests = 0
+        self.fallbacks = 0
+        self.all_open = 0
+
+    def hedge_delay(self, backend: Backend) -> Optional[float]:
+        if not self.hedge:
+            return None
+        quantile = backend.latency_quantile(self.hedge_quantile)
+        delay = quantile if quantile is not None else self.hedge_initial_delay
+        if delay is None:
+            return None
+        return max(self.hedge_min_delay, delay)
+
+    async def _emit(self, config, kind: str, backend: Backend):
+        if config is None:
+            return
+        try:
+            await adispatch_custom_event(ROUTER_EVENT, {"type": kind, "backend": backend.name}, config=config)
+        except RuntimeError:
+            pass  # not running inside a traced run
+
+    def _config_for(self, backend: Backend, config):
+        config = dict(config or {})
+        config["metadata"] = {**config.get("metadata", {}), "model_backend": backend.name}
+        return config
+
+    async def _call(self, backend: Backend, input, config):
+        start = time.monotonic()
+        backend.begin_call()
+        try:
+            result = await backend.runnable.ainvoke(input, config=self._config_for(backend, config))
+        except asyncio.CancelledError:
+            backend.record_cancel(time.monotonic() - start)
+            raise
+        except Exception as e:
+            backend.record_failure()
+            UPSTREAM_ERRORS.labels(backend.name, type(e).__name__).inc()
+            STAGE_SECONDS.labels(f"model_{backend.name}").observe(time.monotonic() - start)
+            raise
+        finally:
+            backend.in_flight -= 1
+        elapsed = time.monotonic() - start
+        backend.record_success(elapsed)
+        STAGE_SECONDS.labels(f"model_{backend.name}").observe(elapsed)
+        return result
+
+    async def ainvoke(self, input, config=None):
+        self.requests += 1
+        now = time.monotonic()
+        candidates = [b for b in self.backends if b.allow(now)]
+        if not candidates:
+            # Every circuit is open: trying is still better than failing outright
+            self.all_open += 1
+            candidates = list(self.backends)
+        elif candidates[0] is not self.backends[0]:
+            FALLBACKS.labels("circuit_open").inc()
+
+        queue = deque(candidates)
+        pending = {}
+        last_error = None
+
+        def start(backend: Backend):
+            pending[asyncio.ensure_future(self._call(backend, input, config))] = backend
+
+        first = queue.popleft()
+        start(first)
+        deadline = self.hedge_delay(first) if queue else None
+
+        try:
+            while pending:
+                timeout = deadline if (deadline is not None and queue) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Still no answer at the deadline: hedge with the next backend
+                    backend = queue.popleft()
+                    backend.hedges_started += 1
+                    FALLBACKS.labels("hedge").inc()
+                    start(backend)
+                    deadline = None
+                    continue
+
+                for task in done:
+                    backend = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        last_error = e
+                        print(f"Model backend '{backend.name}' failed: {type(e).__name__}: {e}")
+                        await self._emit(config, "failed", backend)
+                        continue
+                    backend.wins += 1
+                    if backend is not first:
+                        self.fallbacks += 1
+                    await self._emit(config, "selected", backend)
+                    return result
+
+                if not pending and queue:
+                    # Everything in flight failed: fall back to the next backend
+                    backend = queue.popleft()
+                    FALLBACKS.labels("error").inc()
+                    start(backend)
+                    deadline = self.hedge_delay(backend) if queue else None
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        raise last_error
+
+    def state(self) -> dict:
+        return {
+            "hedging": self.hedge,
+            "requests": self.requests,
+            "fallbacks": self.fallbacks,
+            "all_circuits_open": self.all_open,
+            "backends": {
+                b.name: {**b.snapshot(), "hedge_delay_s": self.hedge_delay(b)} for b in self.backends
+            },
+        }
@@ -0,0 +1,257 @@
+"""
+Semantic (near-duplicate) answer cache for the legal advice pipeline.
+
+Questions are embedded on the CPU with a signed feature-hashing vectorizer
+(word unigrams/bigrams plus character trigrams), so no model download or GPU
+is needed. Cached question vectors live in one fixed-size float32 matrix and
+lookups are a single matrix-vector product followed by an argmax.
+
+A hit also needs the same negations and numbers as the cached question:
+"can police not arrest without warrant" embeds within 0.93 of the
+question without "not", and "section 302" close to "section 304", but
+their answers differ. Each row's guard (see `guard()`) is derived from its
+question, so it needs no storage of its own.
+
+The matrix is bounded by `max_entries` rows; when full, the least recently
+used row is overwritten. With a `path`, the matrix is saved as a .npy file
+with the questions/answers in a JSON sidecar, so a restarted worker maps
+the existing vectors instead of rebuilding them.
+
+Every worker process has its own cache. The saved matrix is mapped
+copy-on-write: workers share its pages until they write a row, and their
+writes never reach the file or each other. save() replaces both files
+together under an exclusive lock (`.lock` next to them), and loading
+takes a shared one, so the files always hold one worker's consistent
+snapshot: whichever saved last.
+"""
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single worker
+    fcntl = None
+
+import numpy as np
+
+from answer_cache import normalize_message
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Function words carry no meaning for matching legal questions and would
+# otherwise dominate short queries ("what is the punishment for theft")
+STOPWORDS = frozenset("""
+a an and are as at be by can could do does for from how i if in into is it me
+my of on or please should tell the this to under what when where which who
+why will with would you your india indian law laws
+""".split())
+
+# Words that flip a question's meaning; "n't" and "cannot" are read as "not"
+NEGATIONS = frozenset(
+    "not no never nor neither none nothing nobody without except unless".split()
+)
+_CONTRACTED_NOT = re.compile(r"n[’']t\b")
+
+
+def guard(text: str) -> tuple:
+    """Negations and numbers in a question, which a cached answer's question must share"""
+    text = _CONTRACTED_NOT.sub(" not", normalize_message(text))
+    tokens = ["not" if t == "cannot" else t for t in _TOKEN.findall(text)]
+    return tuple(sorted({t for t in tokens if t in NEGATIONS or any(c.isdigit() for c in t)}))
+
+
+class HashingEmbedder:
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _features(self, text: str):
+        tokens = [t for t in _TOKEN.findall(normalize_message(text)) if t not in STOPWORDS]
+        for token in tokens:
+            yield "w:" + token, 1.0
+            padded = f"<{token}>"
+            for i in range(len(padded) - 2):
+                yield "c:" + padded[i:i + 3], 0.5
+        for first, second in zip(tokens, tokens[1:]):
+            yield f"b:{first} {second}", 0.75
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            # crc32 is stable across processes (unlike hash()), which the
+            # persisted matrix depends on
+            h = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dim] += sign * weight
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+@contextmanager
+def _file_lock(path: str, exclusive: bool):
+    with open(path, "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield  # closing the file releases the lock
+
+
+class SemanticCache:
+    VECTORS_FILE = "vectors.npy"
+    ENTRIES_FILE = "entries.json"
+    LOCK_FILE = ".lock"
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 4096,
+        threshold: float = 0.9,
+        dim: int = 1024,
+        path: Optional[str] = None,
+        save_every: int = 16,
+    ):
+        self.namespace = namespace
+        self.max_entries = max(1, max_entries)
+        self.threshold = threshold
+        self.enabled = max_entries > 0
+        self.embedder = HashingEmbedder(dim)
+        self.path = path
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._unsaved = 0
+
+        self.count = 0
+        self.questions: list[str] = []
+        self.answers: list[str] = []
+        self.guards: list[tuple] = []
+        self.last_used = np.zeros(self.max_entries, dtype=np.float64)
+        self.vectors = self._open_vectors()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # --- persistence ---
+
+    def _open_vectors(self) -> np.ndarray:
+        shape = (self.max_entries, self.embedder.dim)
+        if not self.path:
+            return np.zeros(shape, dtype=np.float32)
+
+        os.makedirs(self.path, exist_ok=True)
+        vectors_path = os.path.join(self.path, self.VECTORS_FILE)
+        entries_path = os.path.join(self.path, self.ENTRIES_FILE)
+
+        if os.path.exists(vectors_path) and os.path.exists(entries_path):
+            try:
+                with _file_lock(os.path.join(self.path, self.LOCK_FILE), exclusive=False):
+                    with open(entries_path, "r", encoding="utf-8") as f:
+                        meta = json.load(f)
+                    # Copy-on-write: rows this worker sets stay private to it
+                    vectors = np.load(vectors_path, mmap_mode="c")
+                if meta.get("namespace") == self.namespace and vectors.shape == shape:
+                    self.questions = meta["questions"]
+                    self.answers = meta["answers"]
+                    self.guards = [guard(q) for q in self.questions]
+                    self.count = len(self.answers)
+                    self.last_used[:self.count] = meta["last_used"]
+                    return vectors
+                print("Semantic cache on disk is for a different model/prompt/shape; starting empty")
+            except Exception as e:
+                print(f"Semantic cache could not be loaded ({e}); starting empty")
+
+        return np.zeros(shape, dtype=np.float32)
+
+    def save(self):
+        """Replace the files with this worker's entries"""
+        if not self.path or not self.enabled:
+            return
+        with self._lock:
+            meta = {
+                "namespace": self.namespace,
+                "questions": self.questions,
+                "answers": self.answers,
+                "last_used": self.last_used[:self.count].tolist(),
+            }
+            vectors_path = os.path.join(self.path, self.VECTORS_FILE)
+            entries_path = os.path.join(self.path, self.ENTRIES_FILE)
+            with _file_lock(os.path.join(self.path, self.LOCK_FILE), exclusive=True):
+                # New files, renamed into place: mappings of the old ones
+                # (this worker's and others') stay valid
+                with open(vectors_path + ".tmp", "wb") as f:
+                    np.save(f, self.vectors)
+                with open(entries_path + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump(meta, f, ensure_ascii=False)
+                os.replace(vectors_path + ".tmp", vectors_path)
+                os.replace(entries_path + ".tmp", entries_path)
+            self._unsaved = 0
+
+    # --- lookups ---
+
+    def get(self, message: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        query = self.embedder.embed(message)
+        with self._lock:
+            if self.count == 0 or not query.any():
+                self.misses += 1
+                return None
+            scores = self.vectors[:self.count] @ query
+            close = np.flatnonzero(scores >= self.threshold)
+            required = guard(message)
+            # The closest question with the same negations and numbers
+            for row in close[np.argsort(-scores[close])]:
+                if self.guards[row] == required:
+                    self.last_used[row] = time.time()
+                    self.hits += 1
+                    return self.answers[row]
+            self.misses += 1
+            return None
+
+    def set(self, message: str, answer: str):
+        if not self.enabled or not answer:
+            return
+        vector = self.embedder.embed(message)
+        if not vector.any():
+            return
+        with self._lock:
+            if self.count < self.max_entries:
+                slot = self.count
+                self.count += 1
+                self.questions.append(message)
+                self.answers.append(answer)
+                self.guards.append(guard(message))
+            else:
+                slot = int(np.argmin(self.last_used))
+                self.questions[slot] = message
+                self.answers[slot] = answer
+                self.guards[slot] = guard(message)
+                self.evictions += 1
+            self.vectors[slot] = vector
+            self.last_used[slot] = time.time()
+            self._unsaved += 1
+            should_save = self._unsaved >= self.save_every
+        if should_save:
+            self.save()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "persistent": bool(self.path),
+            "entries": self.count,
+            "max_entries": self.max_entries,
+            "dim": self.embedder.dim,
+            "matrix_bytes": int(self.vectors.nbytes),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
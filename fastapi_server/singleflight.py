@@ -0,0 +1,51 @@
+"""
+Single-flight coalescing of identical in-flight async calls.
+
+The first caller for a key (the leader) starts the work as its own task;
+callers that arrive with the same key while it is running (followers) await
+the same task instead of starting their own. Everyone gets the same result or
+the same exception. The task is shielded, so a caller that disconnects does
+not cancel the work for the others. Nothing is kept once the task finishes -
+this is not a cache.
+
+Used by both fastapi_server (pipeline.call_model) and admin-backend
+(get_legal_advice).
+"""
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t, key=key: self._finished(key, t))
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        total = self.leaders + self.followers
+        return {
+            "in_flight": len(self._calls),
+            "upstream_calls": self.leaders,
+            "coalesced_requests": self.followers,
+            "coalescing_ratio": round(self.followers / total, 4) if total else 0.0,
+        }
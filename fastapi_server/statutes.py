@@ -0,0 +1,83 @@
+"""
+Keyed section store and cross-reference graph over the statute corpus.
+
+Records are addressed by (act code, section number), both normalised, so
+"BNS 103", ("bns", "Section 103") and ("BNS", "103(2)") all resolve to the
+same entry. Cross-references come from each record's `references` list
+("BNS 101", "BSA 118", ...) and are indexed in both directions when the
+store is built; neighbourhood queries walk that adjacency breadth-first.
+"""
+import re
+from collections import deque
+from typing import Iterable, Optional
+
+_SECTION = re.compile(r"(\d+[a-z]*)")
+
+
+def section_key(act: str, section: str) -> tuple[str, str]:
+    """Normalise an (act, section) pair; sub-sections map to their section"""
+    act = (act or "").strip().lower()
+    match = _SECTION.search((section or "").lower())
+    return act, match.group(1) if match else ""
+
+
+def parse_citation(citation: str) -> tuple[str, str]:
+    """'BNS 103' -> ('bns', '103')"""
+    act, _, section = citation.strip().partition(" ")
+    return section_key(act, section)
+
+
+class SectionStore:
+    def __init__(self, records: Iterable[dict]):
+        self.records: list[dict] = list(records)
+        self._by_key: dict[tuple[str, str], int] = {}
+        for position, record in enumerate(self.records):
+            key = section_key(record.get("act_code") or "", record.get("section") or "")
+            if key[1]:
+                self._by_key.setdefault(key, position)
+
+        # Adjacency as record positions; references to sections that are
+        # not in the corpus are dropped
+        self._outgoing: list[tuple[int, ...]] = []
+        incoming: list[list[int]] = [[] for _ in self.records]
+        for position, record in enumerate(self.records):
+            targets = []
+            for citation in record.get("references") or ():
+                target = self._by_key.get(parse_citation(citation))
+                if target is not None and target != position and target not in targets:
+                    targets.append(target)
+                    incoming[target].append(position)
+            self._outgoing.append(tuple(targets))
+        self._incoming: list[tuple[int, ...]] = [tuple(sources) for sources in incoming]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def position(self, act: str, section: str) -> Optional[int]:
+        return self._by_key.get(section_key(act, section))
+
+    def get(self, act: str, section: str) -> Optional[dict]:
+        position = self.position(act, section)
+        return None if position is None else self.records[position]
+
+    def references(self, position: int) -> list[dict]:
+        return [self.records[i] for i in self._outgoing[position]]
+
+    def referenced_by(self, position: int) -> list[dict]:
+        return [self.records[i] for i in self._incoming[position]]
+
+    def neighborhood(self, position: int, hops: int) -> list[tuple[dict, int]]:
+        """Records within `hops` references (either direction), nearest first"""
+        distance = {position: 0}
+        queue = deque([position])
+        found = []
+        while queue:
+            current = queue.popleft()
+            if distance[current] >= hops:
+                continue
+            for neighbor in self._outgoing[current] + self._incoming[current]:
+                if neighbor not in distance:
+                    distance[neighbor] = distance[current] + 1
+                    found.append((self.records[neighbor], distance[neighbor]))
+                    queue.append(neighbor)
+        return found
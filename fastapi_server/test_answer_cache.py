@@ -0,0 +1,61 @@
+import sqlite3
+
+from answer_cache import AnswerCache, SqliteBackend, normalize_message
+
+
+def last_used(path: str, key: str) -> float:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT last_used FROM answers WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_normalized_questions_share_an_entry():
+    assert normalize_message("  What IS   bail? ") == "what is bail"
+    cache = AnswerCache("ns")
+    cache.set("What is bail?", "Release pending trial.")
+    assert cache.get("what is BAIL") == "Release pending trial."
+    assert AnswerCache("other-ns").get("What is bail?") is None
+
+
+def test_sqlite_expired_entries_miss(tmp_path):
+    cache = AnswerCache("ns", ttl_seconds=-1, path=str(tmp_path / "answers.db"))
+    cache.set("What is bail?", "Release pending trial.")
+    assert cache.get("What is bail?") is None
+
+
+def test_sqlite_hits_do_not_write_until_flushed(tmp_path):
+    path = str(tmp_path / "answers.db")
+    cache = AnswerCache("ns", path=path)
+    cache.set("What is bail?", "Release pending trial.")
+    key = cache.key("What is bail?")
+    stored = last_used(path, key)
+
+    assert cache.get("What is bail?") == "Release pending trial."
+    assert not cache.backend._conn.in_transaction
+    assert last_used(path, key) == stored
+
+    cache.flush()
+    assert last_used(path, key) > stored
+
+
+def test_sqlite_touches_are_written_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(SqliteBackend, "TOUCH_BATCH", 3)
+    path = str(tmp_path / "answers.db")
+    cache = AnswerCache("ns", path=path)
+    for i in range(3):
+        cache.set(f"question {i}", f"answer {i}")
+    stored = {i: last_used(path, cache.key(f"question {i}")) for i in range(3)}
+    for i in range(3):
+        cache.get(f"question {i}")
+    assert all(last_used(path, cache.key(f"question {i}")) > stored[i] for i in range(3))
+
+
+def test_sqlite_eviction_sees_unflushed_hits(tmp_path):
+    cache = AnswerCache("ns", max_entries=2, path=str(tmp_path / "answers.db"))
+    cache.set("oldest", "a")
+    cache.set("newer", "b")
+    # Only recorded in memory, but the next set() writes it before evicting
+    assert cache.get("oldest") == "a"
+    cache.set("newest", "c")
+    assert cache.get("oldest") == "a"
+    assert cache.get("newer") is None
+    assert cache.stats()["evictions"] == 1
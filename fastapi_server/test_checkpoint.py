@@ -0,0 +1,107 @@
+import asyncio
+import time
+from typing import Annotated, TypedDict
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+from checkpoint import build_checkpointer
+
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+
+
+def echo(state: State):
+    return {"messages": [AIMessage(content=f"re: {state['messages'][-1].content}")]}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def saver(request, tmp_path):
+    def make(**limits):
+        return build_checkpointer(request.param, str(tmp_path / "checkpoints.sqlite"), **limits)
+    return make
+
+
+def graph(checkpointer):
+    workflow = StateGraph(State)
+    workflow.add_node("echo", echo)
+    workflow.add_edge(START, "echo")
+    workflow.add_edge("echo", END)
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def turn(app, thread_id: str, message: str = "q"):
+    app.invoke({"messages": [HumanMessage(content=message)]}, {"configurable": {"thread_id": thread_id}})
+
+
+def config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def test_old_checkpoints_are_pruned_and_latest_has_the_whole_thread(saver):
+    checkpointer = saver(max_checkpoints=3, sweep_interval=3600)
+    app = graph(checkpointer)
+    for i in range(10):
+        turn(app, "t1", f"q{i}")
+    assert len(list(checkpointer.list(config("t1")))) == 3
+    messages = app.get_state(config("t1")).values["messages"]
+    assert [m.content for m in messages[-2:]] == ["q9", "re: q9"] and len(messages) == 20
+    assert checkpointer.stats()["pruned_checkpoints"] > 0
+
+
+def test_idle_threads_are_evicted(saver):
+    checkpointer = saver(idle_ttl=0.1, sweep_interval=3600)
+    app = graph(checkpointer)
+    turn(app, "old")
+    time.sleep(0.15)
+    turn(app, "new")
+    assert checkpointer.sweep() == 1
+    assert checkpointer.get_tuple(config("old")) is None
+    assert checkpointer.get_tuple(config("new")) is not None
+    assert checkpointer.stats()["threads"] == 1
+
+
+def test_least_recently_used_threads_go_over_max_threads(saver):
+    checkpointer = saver(max_threads=2, sweep_interval=3600)
+    app = graph(checkpointer)
+    for thread_id in ("a", "b", "c"):
+        turn(app, thread_id)
+        time.sleep(0.01)
+    turn(app, "a")  # used again: now the most recent
+    assert checkpointer.sweep() == 1
+    assert [t for t in "abc" if checkpointer.get_tuple(config(t))] == ["a", "c"]
+    assert checkpointer.stats()["evicted_threads"] == 1
+
+
+def test_writes_sweep_once_the_interval_has_passed(saver):
+    checkpointer = saver(idle_ttl=0.05, sweep_interval=0.05)
+    app = graph(checkpointer)
+    turn(app, "old")
+    time.sleep(0.1)
+    turn(app, "new")
+    assert checkpointer.get_tuple(config("old")) is None
+
+
+def test_thread_messages_stay_within_the_limit(monkeypatch):
+    import pipeline
+
+    class Model:
+        async def ainvoke(self, chain_input, config=None):
+            return AIMessage(content="answer")
+
+    monkeypatch.setattr(pipeline, "MAX_THREAD_MESSAGES", 6)
+    monkeypatch.setattr(pipeline, "final_chain", Model())
+    monkeypatch.setattr(pipeline, "_cached_answer", lambda message: None)
+    monkeypatch.setattr(pipeline, "_store_answer", lambda message, answer: None)
+
+    thread = config(f"trim-{time.time_ns()}")
+    for i in range(10):
+        state = {"messages": [HumanMessage(content=f"question {i}")], "latest_input": f"question {i}"}
+        asyncio.run(pipeline.app_graph.ainvoke(state, thread))
+        messages = pipeline.app_graph.get_state(thread).values["messages"]
+        assert len(messages) <= 6
+    assert [m.content for m in messages[-2:]] == ["question 9", "answer"]
+    assert [m.content for m in messages[::2]] == ["question 7", "question 8", "question 9"]
@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from citations import NEARBY, CitationRewriter
+
+FRAGMENTS = [
+    "Section 302 IPC", "section 302 of the Indian Penal Code, 1860", "u/s 498A IPC", "IPC 420", "S. 41 CrPC",
+    "Section 65B of the Evidence Act", "Section 103 of BNS", "Section 318(4) BNS", "Section 304A IPC",
+    "Section  379\nIPC", "Section 302 IPCs", "IPC 3020", "xSection 302 IPC", "Section 30", "IPC", "Cr.P.C.",
+    " is now ", ", ", ". ", "\n\n", "the accused may be charged under ", "bail", " (", ")", "a" * 60,
+]
+
+# Compiling the automaton takes a moment; tests that don't look at the counters share one
+REWRITER = CitationRewriter()
+
+
+def chunked(rewriter: CitationRewriter, text: str, rng: random.Random) -> str:
+    stream, out, i = rewriter.stream(), [], 0
+    while i < len(text):
+        n = rng.choice([1, 1, 2, 3, 7, 20, 200])
+        out.append(stream.feed(text[i:i + n]))
+        i += n
+    return "".join(out) + stream.flush()
+
+
+@pytest.mark.parametrize("mode", ["rewrite", "flag"])
+def test_streaming_matches_one_shot_under_random_chunking(mode):
+    rng = random.Random(7)
+    one_shot, streamed = CitationRewriter(mode), CitationRewriter(mode)
+    for _ in range(300):
+        text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randrange(1, 12)))
+        assert chunked(streamed, text, rng) == one_shot.rewrite(text), text
+    assert streamed.stats() == one_shot.stats()
+    assert one_shot.stats()["rewritten"] > 50
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Under Section 302 IPC, murder", "Under Section 103 BNS, murder"),
+    # The longest spelling wins over the shorter ones inside it
+    ("section 302 of the Indian Penal Code, 1860 applies", "Section 103 BNS applies"),
+    ("Section 304A IPC and Section 304 IPC", "Section 106 BNS and Section 105 BNS"),
+    ("u/s 498A of the I.P.C.", "Section 85 BNS"),
+    ("Section  379\nIPC.", "Section 303(2) BNS."),
+    # Letters or digits on either side: not a citation
+    ("Section 302 IPCs", "Section 302 IPCs"),
+    ("IPC 3020", "IPC 3020"),
+    ("xSection 302 IPC", "xSection 302 IPC"),
+    ("Section 30", "Section 30"),
+])
+def test_spellings_and_boundaries(text, expected):
+    assert REWRITER.rewrite(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "Section 302 IPC is now Section 103 of BNS.",
+    "Section 103 BNS (formerly Section 302 IPC) applies.",
+    "IPC 420 has become Section 318(4) of the Bharatiya Nyaya Sanhita.",
+])
+def test_comparisons_with_the_new_section_are_left_alone(text):
+    rewritten = REWRITER.stats()["rewritten"]
+    assert REWRITER.rewrite(text) == text
+    assert REWRITER.stats()["rewritten"] == rewritten
+
+
+def test_only_the_compared_citation_is_kept():
+    text = "Section 302 IPC and Section 420 IPC; Section 302 IPC is now Section 103 BNS."
+    assert REWRITER.rewrite(text) == \
+        "Section 302 IPC and Section 318(4) BNS; Section 302 IPC is now Section 103 BNS."
+
+
+def test_a_distant_mention_does_not_keep_a_citation():
+    text = "Section 302 IPC applies." + " " * NEARBY + "See also Section 103 BNS."
+    assert REWRITER.rewrite(text).startswith("Section 103 BNS applies.")
+
+
+def test_flag_and_off_modes():
+    assert CitationRewriter("flag").rewrite("Under Section 302 IPC.") == "Under Section 302 IPC [now Section 103 BNS]."
+    off = CitationRewriter("off")
+    stream = off.stream()
+    assert stream.feed("Section 302 IPC") + stream.flush() == "Section 302 IPC"
+    with pytest.raises(ValueError):
+        CitationRewriter("replace")
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from concurrency import UpstreamBusy, UpstreamLimiter
+
+
+async def hold(limiter: UpstreamLimiter, seconds: float, peak: list):
+    async with limiter.slot():
+        peak[0] = max(peak[0], limiter.in_flight)
+        await asyncio.sleep(seconds)
+
+
+def test_at_most_max_concurrent_calls_hold_a_slot():
+    async def main():
+        limiter, peak = UpstreamLimiter(max_concurrent=2, max_waiting=10), [0]
+        await asyncio.gather(*(hold(limiter, 0.02, peak) for _ in range(6)))
+        return limiter, peak[0]
+
+    limiter, peak = asyncio.run(main())
+    assert peak == 2
+    assert limiter.stats() == {"max_concurrent": 2, "max_waiting": 10, "in_flight": 0, "waiting": 0,
+                               "completed": 6, "rejected": 0, "timed_out": 0}
+
+
+def test_callers_past_the_wait_queue_are_rejected_immediately():
+    async def main():
+        limiter, peak = UpstreamLimiter(max_concurrent=1, max_waiting=2), [0]
+        results = await asyncio.gather(*(hold(limiter, 0.05, peak) for _ in range(5)), return_exceptions=True)
+        return limiter, results
+
+    limiter, results = asyncio.run(main())
+    assert [isinstance(r, UpstreamBusy) for r in results] == [False, False, False, True, True]
+    assert limiter.rejected == 2 and limiter.completed == 3
+
+
+def test_waiting_too_long_for_a_slot_is_busy():
+    async def main():
+        limiter, peak = UpstreamLimiter(max_concurrent=1, max_waiting=5, wait_timeout=0.02), [0]
+        results = await asyncio.gather(hold(limiter, 0.1, peak), hold(limiter, 0, peak), return_exceptions=True)
+        return limiter, results
+
+    limiter, results = asyncio.run(main())
+    assert results[0] is None and isinstance(results[1], UpstreamBusy)
+    assert limiter.timed_out == 1 and limiter.waiting == 0
+
+
+def test_slot_is_released_when_the_call_fails():
+    async def main():
+        limiter = UpstreamLimiter(max_concurrent=1, max_waiting=0)
+        with pytest.raises(ValueError):
+            async with limiter.slot():
+                raise ValueError("upstream error")
+        async with limiter.slot():
+            pass
+        return limiter
+
+    limiter = asyncio.run(main())
+    assert limiter.in_flight == 0 and limiter.completed == 2
+
+
+def test_at_least_one_slot_is_required():
+    with pytest.raises(ValueError):
+        UpstreamLimiter(max_concurrent=0, max_waiting=1)
@@ -0,0 +1,74 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from context import ContextBudget, ContextBuilder, estimate_tokens
+
+
+def thread(turns: int, size: int = 40) -> list:
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"question {i}. " + "q" * size, id=f"h{i}"))
+        messages.append(AIMessage(content=f"answer {i}. " + "a" * size, id=f"a{i}"))
+    return messages
+
+
+def test_budget_leaves_room_for_the_prompt_and_generation():
+    budget = ContextBudget("primary", context_window=4096, max_new_tokens=512, max_history_tokens=1000)
+    assert budget.available(100) == 1000
+    assert budget.available(3000) == 584
+    assert budget.available(5000) == 0
+
+
+def test_recent_turns_are_kept_and_older_ones_summarized():
+    builder = ContextBuilder(recent_turns=2)
+    older, recent = builder.split(thread(5))
+    assert [m.id for m in recent] == ["h3", "a3", "h4", "a4"] and len(older) == 6
+
+    summary, upto = builder.fold("", None, older)
+    assert upto == "a2"
+    assert summary.splitlines()[0] == "- User asked: question 0."
+    assert summary.splitlines()[1] == "  Answer: answer 0."
+
+
+def test_each_message_is_summarized_once():
+    builder = ContextBuilder(recent_turns=1)
+    summary, upto = builder.fold("", None, thread(2))
+    again, upto_again = builder.fold(summary, upto, thread(2))
+    assert (again, upto_again) == (summary, upto)
+    extended, _ = builder.fold(summary, upto, thread(3))
+    assert extended.startswith(summary) and extended.endswith("answer 2.")
+
+
+def test_summary_keeps_the_newest_lines_within_its_budget():
+    builder = ContextBuilder(summary_tokens=20)
+    summary, _ = builder.fold("", None, thread(10))
+    assert sum(estimate_tokens(line) + 1 for line in summary.splitlines()) <= 20
+    assert summary.startswith("- User asked: question 9.")
+
+
+def test_only_whole_newest_turns_that_fit_are_selected():
+    builder = ContextBuilder()
+    recent = thread(3, size=200)
+    turn_cost = sum(builder.tokens(m.content) + 4 for m in recent[:2])
+    budget = ContextBudget("primary", context_window=10_000, max_new_tokens=0, max_history_tokens=2 * turn_cost + 1)
+    context = builder.select("", recent, budget, fixed_tokens=0)
+    assert [m.id for m in context.messages] == ["h1", "a1", "h2", "a2"]
+
+
+def test_summary_is_dropped_when_it_does_not_fit():
+    builder = ContextBuilder()
+    budget = ContextBudget("fallback", context_window=100, max_new_tokens=0, max_history_tokens=5)
+    context = builder.select("- User asked: " + "x" * 100, [], budget, fixed_tokens=0)
+    assert context.summary == "" and context.messages == []
+
+
+def test_history_formats():
+    builder = ContextBuilder()
+    budget = ContextBudget("primary", context_window=10_000, max_new_tokens=0, max_history_tokens=10_000)
+    context = builder.select("- User asked: earlier", thread(1, size=0), budget, fixed_tokens=0)
+    assert context.as_base_prompt() == (
+        "### Earlier in this conversation:\n- User asked: earlier\n\n"
+        "### User:\nquestion 0. \n\n### Assistant:\nanswer 0. \n\n"
+    )
+    chat = context.as_chat_messages()
+    assert [m.type for m in chat] == ["human", "ai", "human", "ai"]
+    assert chat[0].content.endswith("- User asked: earlier")
@@ -0,0 +1,96 @@
+import pytest
+
+from law_search import LawSearchIndex
+
+DOCS = [
+    {"act_code": "BNS", "section": "Section 303", "title": "Theft",
+     "summary": "Defines theft and punishes it with imprisonment up to three years."},
+    {"act_code": "BNS", "section": "Section 305", "title": "Theft in a dwelling house",
+     "summary": "Theft in a building used as a dwelling; imprisonment up to seven years."},
+    {"act_code": "IPC", "section": "Section 379", "title": "Theft",
+     "summary": "Punishment for theft."},
+    {"act_code": "BNS", "section": "Section 318", "title": "Cheating",
+     "summary": "Cheating and dishonestly inducing delivery of property."},
+    {"act_code": "BNS", "section": "Section 103", "title": "Murder",
+     "summary": "Punishment for murder: death or imprisonment for life."},
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return LawSearchIndex.build(DOCS)
+
+
+def ids(hits) -> list[int]:
+    return [doc_id for doc_id, _ in hits]
+
+
+def test_title_matches_rank_above_summary_only_matches(index):
+    hits = index.search("murder")
+    assert ids(hits) == [4]
+    ranked = ids(index.search("theft"))
+    # Short "Theft" sections first; the dwelling-house one has theft in a longer title
+    assert set(ranked[:2]) == {0, 2} and ranked[2] == 1
+    scores = [score for _, score in index.search("theft")]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_section_numbers_and_act_codes_are_searchable(index):
+    assert ids(index.search("bns 303"))[0] == 0
+    assert ids(index.search("379"))[0] == 2
+
+
+def test_act_filter(index):
+    assert ids(index.search("theft", act="IPC")) == [2]
+    assert set(ids(index.search("theft", act="bns"))) == {0, 1}
+
+
+def test_every_query_token_adds_to_the_score(index):
+    both = dict(index.search("theft dwelling"))
+    assert ids(index.search("theft dwelling"))[0] == 1
+    assert both[1] > dict(index.search("theft"))[1]
+
+
+def test_prefixes_expand_to_vocabulary_terms(index):
+    # The last token is treated as incomplete (search-as-you-type)
+    assert ids(index.search("cheat")) == [3]
+    assert ids(index.search("mur")) == [4]
+    # Expanded terms score below an exact match
+    assert dict(index.search("cheat"))[3] < dict(index.search("cheating"))[3]
+
+
+@pytest.mark.parametrize("typo, expected", [
+    ("thfet", {0, 1, 2}),   # transposition: one deletion from each side meets
+    ("theftt", {0, 1, 2}),  # insertion
+    ("murdr", {4}),         # deletion
+    ("murdet", {4}),        # substitution
+])
+def test_typos_one_edit_away_still_match(index, typo, expected):
+    assert set(ids(index.search(typo))) == expected
+    exact = "theft" if 0 in expected else "murder"
+    assert max(s for _, s in index.search(typo)) < max(s for _, s in index.search(exact))
+
+
+def test_short_or_distant_tokens_do_not_match(index):
+    assert index.search("xyz") == []
+    assert index.search("thxxt") == []
+    assert index.search("") == []
+
+
+def test_saved_index_is_reused_until_the_corpus_changes(index, tmp_path):
+    path = str(tmp_path / "laws.idx")
+    built = LawSearchIndex.open(DOCS, path)
+    loaded = LawSearchIndex.open(DOCS, path)
+    assert loaded.fingerprint == built.fingerprint == index.fingerprint
+    assert loaded.search("thfet dwelling") == pytest.approx(index.search("thfet dwelling"))
+
+    changed = DOCS + [{"act_code": "BNS", "section": "Section 304", "title": "Snatching", "summary": ""}]
+    rebuilt = LawSearchIndex.open(changed, path)
+    assert rebuilt.fingerprint != built.fingerprint and ids(rebuilt.search("snatching")) == [5]
+    assert LawSearchIndex.load(path).fingerprint == rebuilt.fingerprint
+
+
+def test_unreadable_index_file_is_rebuilt(tmp_path):
+    path = tmp_path / "laws.idx"
+    path.write_bytes(b"not an index")
+    assert ids(LawSearchIndex.open(DOCS, str(path)).search("murder")) == [4]
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from rendered import RenderedResponses, etag_matches
+
+
+@pytest.fixture
+def served():
+    """(client, responses, renders) for an app serving /items/{n} through RenderedResponses"""
+    app = FastAPI()
+    responses = RenderedResponses(max_entries=2, cache_control="public, max-age=60")
+    renders = []
+
+    @app.get("/items/{n}")
+    def item(request: Request, n: int):
+        def render():
+            renders.append(n)
+            return {"n": n, "name": "धारा"}
+        return responses.respond(request, ("item", n), render)
+
+    return TestClient(app), responses, renders
+
+
+def test_body_is_rendered_once_and_carries_etag_and_cache_control(served):
+    client, responses, renders = served
+    first, second = client.get("/items/1"), client.get("/items/1")
+    assert first.status_code == second.status_code == 200
+    assert first.json() == {"n": 1, "name": "धारा"}
+    assert first.content == second.content
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["etag"].startswith('"') and first.headers["cache-control"] == "public, max-age=60"
+    assert first.headers["content-type"] == "application/json"
+    assert renders == [1]
+    assert responses.stats() == {"entries": 1, "hits": 1, "renders": 1, "not_modified": 0}
+
+
+def test_matching_if_none_match_gets_an_empty_304(served):
+    client, responses, _ = served
+    etag = client.get("/items/1").headers["etag"]
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get("/items/1", headers={"If-None-Match": header})
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["etag"] == etag and response.headers["cache-control"] == "public, max-age=60"
+    assert responses.stats()["not_modified"] == 4
+
+
+def test_stale_etag_gets_the_full_body(served):
+    client, _, _ = served
+    etag = client.get("/items/1").headers["etag"]
+    response = client.get("/items/2", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.json()["n"] == 2
+    assert response.headers["etag"] != etag
+
+
+def test_least_recently_used_entries_are_dropped(served):
+    client, responses, renders = served
+    for n in (1, 2, 1, 3, 1, 2):
+        client.get(f"/items/{n}")
+    # 2 was the least recently used when 3 came in, so it is rendered again
+    assert renders == [1, 2, 3, 2]
+    assert responses.stats()["entries"] == 2
+
+
+def test_body_matches_fastapi_json_encoding():
+    responses = RenderedResponses()
+    body, etag = responses.rendered("k", lambda: {"a": [1, 2.5, None], "b": "ü"})
+    assert body == b'{"a":[1,2.5,null],"b":"\xc3\xbc"}'
+    assert json.loads(body) == {"a": [1, 2.5, None], "b": "ü"}
+    assert responses.rendered("k", lambda: {"different": True}) == (body, etag)
+
+
+def test_etag_comparison_is_weak():
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches(' "x" ,"abc"', '"abc"')
+    assert not etag_matches('"abcd"', '"abc"')
+    assert not etag_matches('abc', '"abc"')
@@ -0,0 +1,62 @@
+import numpy as np
+
+from law_search import LawSearchIndex
+from retrieval import StatuteRetriever, embed_sections, select_sections, write_index
+
+CORPUS = [
+    {"id": "bns-103", "act": "Bharatiya Nyaya Sanhita", "act_code": "BNS", "section": "Section 103",
+     "title": "Murder", "summary": "Punishment for murder."},
+    {"id": "bns-303", "act": "Bharatiya Nyaya Sanhita", "act_code": "BNS", "section": "Section 303",
+     "title": "Theft", "summary": "Punishment for theft of movable property."},
+    {"id": "bnss-35", "act": "Bharatiya Nagarik Suraksha Sanhita", "act_code": "BNSS", "section": "Section 35",
+     "title": "Arrest without warrant", "summary": "When police may arrest without warrant."},
+]
+
+
+def built_index(tmp_path, records, dim=64) -> str:
+    path = str(tmp_path / "statute_index")
+    write_index(path, records, embed_sections(records, dim))
+    return path
+
+
+def test_open_uses_matching_prebuilt_index(tmp_path):
+    records = select_sections(CORPUS)
+    retriever = StatuteRetriever.open(built_index(tmp_path, records), records, dim=64)
+    assert retriever.stats()["memory_mapped"]
+    assert retriever.search("theft of property", k=1)[0][0]["id"] == "bns-303"
+
+
+def test_open_ignores_index_built_from_another_corpus(tmp_path):
+    path = built_index(tmp_path, select_sections(CORPUS))
+    edited = select_sections([{**CORPUS[0], "summary": "Punishment for murder, amended."}] + CORPUS[1:])
+    retriever = StatuteRetriever.open(path, edited, dim=64)
+    assert not retriever.stats()["memory_mapped"]
+    assert retriever.get("bns-103")["summary"] == "Punishment for murder, amended."
+
+
+def test_open_ignores_index_built_for_another_dim(tmp_path):
+    records = select_sections(CORPUS)
+    retriever = StatuteRetriever.open(built_index(tmp_path, records, dim=64), records, dim=128)
+    assert not retriever.stats()["memory_mapped"]
+    assert retriever.stats()["dim"] == 128
+
+
+def test_open_without_index_embeds_in_memory(tmp_path):
+    records = select_sections(CORPUS)
+    retriever = StatuteRetriever.open(str(tmp_path / "missing"), records, dim=64)
+    assert isinstance(retriever.matrix, np.ndarray) and not retriever.stats()["memory_mapped"]
+    assert len(retriever) == len(records)
+
+
+def test_law_search_index_rebuilds_for_changed_corpus(tmp_path):
+    path = str(tmp_path / "laws.idx")
+    first = LawSearchIndex.open(CORPUS, path)
+    assert LawSearchIndex.open(CORPUS, path).fingerprint == first.fingerprint
+
+    edited = CORPUS + [{"id": "bsa-57", "act_code": "BSA", "section": "Section 57",
+                        "title": "Primary evidence", "summary": "Documents themselves."}]
+    rebuilt = LawSearchIndex.open(edited, path)
+    assert rebuilt.fingerprint != first.fingerprint
+    assert [doc for doc, _ in rebuilt.search("primary evidence")][0] == 3
+    # The rebuilt index was saved over the stale one
+    assert LawSearchIndex.load(path).fingerprint == rebuilt.fingerprint
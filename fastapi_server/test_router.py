@@ -0,0 +1,165 @@
+import asyncio
+import time
+
+import pytest
+
+from router import Backend, ModelRouter
+
+
+class FakeModel:
+    """Answers after `delay` seconds, or raises if `fail` is set"""
+
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+        self.backends_seen = []
+
+    async def ainvoke(self, input, config=None):
+        self.calls += 1
+        self.backends_seen.append(config["metadata"]["model_backend"])
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        return f"{self.name}: {input}"
+
+
+def router(*models: FakeModel, **kwargs) -> ModelRouter:
+    backend_kwargs = {k: kwargs.pop(k) for k in ("failure_threshold", "min_samples", "open_seconds") if k in kwargs}
+    kwargs.setdefault("hedge", False)
+    return ModelRouter([Backend(m.name, m, **backend_kwargs) for m in models], **kwargs)
+
+
+def ask(r: ModelRouter, message: str = "q"):
+    return asyncio.run(r.ainvoke(message))
+
+
+def test_primary_answers_with_its_backend_name():
+    primary, fallback = FakeModel("primary"), FakeModel("fallback")
+    r = router(primary, fallback)
+    assert ask(r) == "primary: q"
+    assert primary.backends_seen == ["primary"] and fallback.calls == 0
+
+
+def test_failure_falls_back_to_the_next_backend():
+    primary, fallback = FakeModel("primary", fail=True), FakeModel("fallback")
+    r = router(primary, fallback)
+    assert ask(r) == "fallback: q"
+    assert r.fallbacks == 1
+    assert r.backends[0].snapshot()["failures"] == 1
+
+
+def test_every_backend_failing_raises_the_last_error():
+    r = router(FakeModel("primary", fail=True), FakeModel("fallback", fail=True))
+    with pytest.raises(ConnectionError, match="fallback is down"):
+        ask(r)
+    assert [b.failures for b in r.backends] == [1, 1]
+
+
+def test_circuit_opens_then_half_open_probe_closes_it():
+    primary, fallback = FakeModel("primary", fail=True), FakeModel("fallback")
+    r = router(primary, fallback, failure_threshold=3, open_seconds=0.05)
+    for _ in range(3):
+        ask(r)
+    assert r.backends[0].state == "open"
+
+    # While open the primary is skipped entirely
+    assert ask(r) == "fallback: q"
+    assert primary.calls == 3
+
+    # After the cool-down one probe goes through; success closes the circuit
+    time.sleep(0.06)
+    primary.fail = False
+    assert ask(r) == "primary: q"
+    assert r.backends[0].state == "closed"
+    assert r.backends[0].times_opened == 1
+
+
+def test_failed_probe_opens_the_circuit_again():
+    primary = FakeModel("primary", fail=True)
+    r = router(primary, FakeModel("fallback"), failure_threshold=2, open_seconds=0.05)
+    ask(r), ask(r)
+    time.sleep(0.06)
+    backend = r.backends[0]
+    assert backend.allow(time.monotonic()) and backend.state == "half_open"
+    ask(r)
+    assert backend.state == "open" and backend.times_opened == 2 and not backend.probe_in_flight
+
+
+def test_half_open_lets_one_probe_through_at_a_time():
+    backend = Backend("primary", FakeModel("primary"), open_seconds=0)
+    backend._open(time.monotonic())
+    now = time.monotonic()
+    assert backend.allow(now)
+    backend.begin_call()
+    assert not backend.allow(now)
+    backend.record_success(0.1)
+    assert backend.state == "closed" and backend.allow(now)
+
+
+def test_error_rate_opens_the_circuit_once_there_are_enough_samples():
+    backend = Backend("primary", FakeModel("primary"), min_samples=10, failure_threshold=100,
+                      error_rate_threshold=0.5)
+    for i in range(9):
+        backend.record_success(0.1) if i % 2 else backend.record_failure()
+    assert backend.state == "closed"  # 5 of 9 failed, but too few samples
+    backend.record_failure()
+    assert backend.state == "open"
+
+
+def test_all_circuits_open_still_tries_every_backend():
+    primary, fallback = FakeModel("primary", fail=True), FakeModel("fallback", fail=True)
+    r = router(primary, fallback, failure_threshold=1, open_seconds=60)
+    with pytest.raises(ConnectionError):
+        ask(r)
+    fallback.fail = False
+    assert ask(r) == "fallback: q"
+    assert r.all_open == 1 and primary.calls == 2
+
+
+def test_slow_primary_is_hedged_after_the_initial_delay():
+    primary, fallback = FakeModel("primary", delay=1.0), FakeModel("fallback", delay=0.01)
+    r = router(primary, fallback, hedge=True, hedge_initial_delay=0.05, hedge_min_delay=0.01)
+    start = time.perf_counter()
+    assert ask(r) == "fallback: q"
+    elapsed = time.perf_counter() - start
+    assert 0.05 <= elapsed < 0.5
+    # The losing call is cancelled and kept as a lower-bound latency sample
+    assert primary.cancelled == 1
+    assert r.backends[0].cancelled == 1 and r.backends[0].latencies[-1] >= 0.05
+    assert r.backends[1].hedges_started == 1 and r.fallbacks == 1
+
+
+def test_fast_primary_is_not_hedged():
+    primary, fallback = FakeModel("primary", delay=0.01), FakeModel("fallback")
+    r = router(primary, fallback, hedge=True, hedge_initial_delay=0.2, hedge_min_delay=0.01)
+    assert ask(r) == "primary: q"
+    assert fallback.calls == 0
+
+
+def test_hedge_delay_follows_the_latency_quantile():
+    backend = Backend("primary", FakeModel("primary"), min_samples=20)
+    r = ModelRouter([backend, Backend("fallback", FakeModel("fallback"))], hedge_initial_delay=15.0,
+                    hedge_min_delay=0.5)
+    assert r.hedge_delay(backend) == 15.0
+    for i in range(100):
+        backend.record_success(i / 10)
+    assert r.hedge_delay(backend) == pytest.approx(9.5)
+    backend.latencies.clear()
+    for _ in range(20):
+        backend.record_success(0.01)
+    assert r.hedge_delay(backend) == 0.5  # never below hedge_min_delay
+    assert ModelRouter([backend], hedge=False).hedge_delay(backend) is None
+
+
+def test_hedged_failure_still_waits_for_the_other_call():
+    primary, fallback = FakeModel("primary", delay=0.1), FakeModel("fallback", fail=True)
+    r = router(primary, fallback, hedge=True, hedge_initial_delay=0.02, hedge_min_delay=0.01)
+    assert ask(r) == "primary: q"
+    assert r.backends[1].failures == 1 and r.fallbacks == 0
@@ -0,0 +1,82 @@
+import numpy as np
+
+from semantic_cache import HashingEmbedder, SemanticCache, guard
+
+
+def cache(path, **kwargs) -> SemanticCache:
+    return SemanticCache("test", max_entries=kwargs.pop("max_entries", 8), dim=256, path=str(path), **kwargs)
+
+
+def test_hit_for_near_duplicate_and_miss_otherwise(tmp_path):
+    c = cache(tmp_path)
+    c.set("What is the punishment for theft?", "Up to three years.")
+    assert c.get("what is the punishment for theft") == "Up to three years."
+    assert c.get("How do I register a company?") is None
+
+
+def test_negated_or_renumbered_question_misses(tmp_path):
+    c = cache(tmp_path)
+    c.set("can police arrest without warrant", "Yes, for cognizable offences.")
+    c.set("What is the punishment under section 302?", "Death or life imprisonment.")
+    embedder = HashingEmbedder(256)
+    negated = "can police not arrest without warrant"
+    assert embedder.embed(negated) @ embedder.embed("can police arrest without warrant") >= c.threshold
+    assert c.get(negated) is None
+    assert c.get("Can't police arrest without warrant?") is None
+    assert guard("police cannot arrest") == guard("police can't arrest") == ("not",)
+    assert c.get("What is the punishment under section 304?") is None
+    assert c.get("can police arrest without warrant?") == "Yes, for cognizable offences."
+    assert guard("Police can't arrest, without a warrant, after 6 pm") == ("6", "not", "without")
+
+
+def test_workers_sharing_a_directory_keep_their_own_rows(tmp_path):
+    seed = cache(tmp_path)
+    seed.set("What is the punishment for murder?", "Death or life imprisonment.")
+    seed.save()
+
+    # Two workers map the same file and both append to row 1
+    first, second = cache(tmp_path), cache(tmp_path)
+    first.set("What is the punishment for theft?", "Up to three years.")
+    second.set("How is a divorce filed?", "By petition to the family court.")
+    assert first.get("What is the punishment for theft?") == "Up to three years."
+    assert first.get("How is a divorce filed?") is None
+    assert second.get("How is a divorce filed?") == "By petition to the family court."
+    assert second.get("What is the punishment for theft?") is None
+
+    # Saving one worker's entries doesn't change what the other sees
+    first.save()
+    assert second.get("How is a divorce filed?") == "By petition to the family court."
+    assert second.get("What is the punishment for theft?") is None
+
+
+def test_restart_loads_last_saved_snapshot(tmp_path):
+    first, second = cache(tmp_path), cache(tmp_path)
+    first.set("What is the punishment for theft?", "Up to three years.")
+    second.set("How is a divorce filed?", "By petition to the family court.")
+    first.save()
+    second.save()
+
+    restarted = cache(tmp_path)
+    assert restarted.count == 1
+    assert restarted.get("How is a divorce filed?") == "By petition to the family court."
+    assert restarted.get("What is the punishment for theft?") is None
+    assert np.allclose(np.linalg.norm(restarted.vectors[:restarted.count], axis=1), 1.0)
+
+
+def test_unsaved_rows_never_reach_the_file(tmp_path):
+    seed = cache(tmp_path)
+    seed.set("What is the punishment for theft?", "Up to three years.")
+    seed.save()
+    before = (tmp_path / SemanticCache.VECTORS_FILE).read_bytes()
+
+    worker = cache(tmp_path)
+    worker.set("How is a divorce filed?", "By petition to the family court.")
+    assert (tmp_path / SemanticCache.VECTORS_FILE).read_bytes() == before
+
+
+def test_different_namespace_starts_empty(tmp_path):
+    seed = cache(tmp_path)
+    seed.set("What is the punishment for theft?", "Up to three years.")
+    seed.save()
+    other = SemanticCache("other", max_entries=8, dim=256, path=str(tmp_path))
+    assert other.count == 0 and other.get("What is the punishment for theft?") is None
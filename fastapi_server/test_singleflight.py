@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+class Upstream:
+    def __init__(self, delay: float = 0.05, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("upstream is down")
+        return f"answer {call}"
+
+
+def test_concurrent_callers_share_one_call():
+    flight, upstream = SingleFlight(), Upstream()
+
+    async def main():
+        return await asyncio.gather(*(flight.do("q", upstream) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["answer 1"] * 5
+    assert upstream.calls == 1
+    assert flight.stats() == {"in_flight": 0, "upstream_calls": 1, "coalesced_requests": 4,
+                              "coalescing_ratio": 0.8}
+
+
+def test_different_keys_are_not_coalesced():
+    flight, upstream = SingleFlight(), Upstream()
+
+    async def main():
+        return await asyncio.gather(flight.do("a", upstream), flight.do("b", upstream))
+
+    assert asyncio.run(main()) == ["answer 1", "answer 2"]
+    assert flight.stats()["coalesced_requests"] == 0
+
+
+def test_nothing_is_kept_once_the_call_finishes():
+    flight, upstream = SingleFlight(), Upstream(delay=0)
+
+    async def main():
+        return [await flight.do("q", upstream), await flight.do("q", upstream)]
+
+    assert asyncio.run(main()) == ["answer 1", "answer 2"]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_every_caller_gets_the_exception():
+    flight, upstream = SingleFlight(), Upstream(fail=True)
+
+    async def main():
+        return await asyncio.gather(*(flight.do("q", upstream) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ConnectionError) for r in results) and upstream.calls == 1
+
+
+def test_a_cancelled_caller_does_not_cancel_the_call_for_the_others():
+    flight, upstream = SingleFlight(), Upstream(delay=0.1)
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("q", upstream))
+        follower = asyncio.ensure_future(flight.do("q", upstream))
+        await asyncio.sleep(0.02)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "answer 1"
+    assert upstream.calls == 1
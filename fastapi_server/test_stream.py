@@ -0,0 +1,70 @@
+import asyncio
+import json
+import time
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+import main
+import pipeline
+
+ANSWER = "File a complaint at the nearest police station under Section 303 BNS."
+
+
+class SlowModel(GenericFakeChatModel):
+    """Takes the prompt dict like final_chain; streams ANSWER word by word after a short delay"""
+
+    calls: int = 0
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.1)
+        return await super().ainvoke(input["input"], config=config, **kwargs)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = SlowModel(messages=iter([AIMessage(content=ANSWER)] * 10))
+    monkeypatch.setattr(pipeline, "final_chain", model)
+    monkeypatch.setattr(pipeline, "_cached_answer", lambda message: None)
+    monkeypatch.setattr(pipeline, "_store_answer", lambda message, answer: None)
+    return model
+
+
+async def collect(message: str) -> list[tuple[str, dict]]:
+    input_state = {"messages": [("user", message)], "latest_input": message}
+    config = {"configurable": {"thread_id": f"stream-{time.time_ns()}"}}
+    events = []
+    async for chunk in main._stream_legal_advice(input_state, config):
+        event, data = chunk.strip().split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def tokens(events: list) -> list[str]:
+    return [data["text"] for event, data in events if event == "token"]
+
+
+def test_streamed_tokens_add_up_to_the_answer(model):
+    events = asyncio.run(collect("What do I do about a theft?"))
+    assert len(tokens(events)) > 1
+    assert "".join(tokens(events)) == ANSWER
+    assert events[-1] == ("done", {"response": ANSWER, "thread_id": events[-1][1]["thread_id"]})
+
+
+def test_cache_hit_sends_the_answer_as_one_token(model, monkeypatch):
+    monkeypatch.setattr(pipeline, "_cached_answer", lambda message: ANSWER)
+    events = asyncio.run(collect("What do I do about a theft?"))
+    assert [event for event, _ in events] == ["token", "done"]
+    assert tokens(events) == [ANSWER] and model.calls == 0
+
+
+def test_coalesced_request_gets_the_whole_answer(model):
+    async def both():
+        return await asyncio.gather(collect("Is cheque bounce a crime?"), collect("Is cheque bounce a crime?"))
+
+    leader, follower = sorted(asyncio.run(both()), key=lambda events: -len(tokens(events)))
+    assert model.calls == 1
+    assert len(tokens(leader)) > 1 and tokens(follower) == [ANSWER]
+    assert "".join(tokens(leader)) == ANSWER == follower[-1][1]["response"]